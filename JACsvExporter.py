@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Exports work items of one type to a CSV file, one line per item, for spreadsheets
+    and for re-import.  Items are written as they are read, so large exports don't
+    need to fit in memory.
+
+    Usage:  python JACsvExporter.py <type> [programId] [column ...]
+    e.g.    python JACsvExporter.py stories 12 id title state effortPoints
+            python JACsvExporter.py stories id title
+    The argument after the type is the Program ID if it is a number, and the first column
+    otherwise.  Writes <type>.csv (or <type>_<programId>.csv).  The default columns for each type
+    are in csvexport.COLUMNS.
+"""
+
+import sys
+import common
+import cfg
+import csvexport
+
+####################################################################################################################################################################################
+def main():
+####################################################################################################################################################################################
+# MAIN
+
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    which = sys.argv[1]
+    programId = None
+    columns = sys.argv[2:]
+    if columns and columns[0].isdigit():
+        programId = int(columns.pop(0))
+    if not columns:
+        columns = None
+
+    # Call a subfile that helps handle shared routines and variables between this file and other files like workitemparser, jathemes, etc
+    cfg.init()
+
+    # Collect api server and endpoint
+    common.CollectApiInfo()
+
+    fileName = which + ".csv"
+    if programId is not None:
+        fileName = which + "_" + str(programId) + ".csv"
+    csvexport.ExportCsv(which, fileName, columns, filterOnProgramID=programId)
+
+    pass #eof
+
+####################################################################################################################################################################################
+if __name__ == "__main__":
+    main()
+####################################################################################################################################################################################
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Runs a local daemon that keeps an authenticated connection to Jira Align, the
+    reference data (programs, releases, connector projects, etc.) and recent query
+    results warm in memory.  While it is running, the other scripts send their reads,
+    lookups and batch project fixes to it instead of going to Jira Align themselves.
+
+    Usage:  python JADaemon.py [port]
+    Stop it with Ctrl-C.
+"""
+
+import sys
+import common
+import cfg
+import client
+import daemon
+
+####################################################################################################################################################################################
+def main():
+####################################################################################################################################################################################
+# MAIN
+
+    # Call a subfile that helps handle shared routines and variables between this file and other files like workitemparser, jathemes, etc
+    cfg.init()
+
+    # Collect api server and endpoint
+    common.CollectApiInfo()
+
+    port = daemon.PORT
+    if len(sys.argv) > 1:
+        port = int(sys.argv[1])
+
+    daemon.Serve(client.GetDefault(), port)
+
+    pass #eof
+
+####################################################################################################################################################################################
+if __name__ == "__main__":
+    main()
+####################################################################################################################################################################################
@@ -3,287 +3,295 @@
 
 """ Exports data/configuration from a Jira Align instance to a JSON file,
     for backup or porting to another instance.
+
+    To extract from several instances at once and compare them, name their profiles
+    (see creds.profiles):  python JADataExtractor.py test prod
+    Each instance is crawled in its own thread with its own rate limit, its data is written
+    to files suffixed with the profile name, and each endpoint is compared across the
+    instances as soon as all of them have read it.  The comparison is saved to
+    JiraAlign_comparison.json.
+
+    Add --shard to read stories and defects one Program at a time across a pool of
+    processes (see shard.py):  python JADataExtractor.py --shard [profile ...]
+    Sharded sections are capped at shard.MAX items per Program rather than MAX in total, so
+    they can hold many more items than an unsharded export.
+
+    Add --spill to cap memory use: each item section keeps at most spill.MAX_IN_MEMORY items
+    in memory and the rest in a temporary file until it has been written (see spill.py).
+    Use --spill=N to keep at most N items of each section in memory instead.
+
+    Add --partition to read each item section several createDate ranges at a time (see
+    partition.py).  Sections read with --shard or --spill are read their own way.
 """
 
+import sys
+import threading
 import common
 import cfg
-import json
+import client
+import compare
+import compact
+import fastjson
+import partition
+import shard
+import spill
 
 # Maximum number of records to return for main data items
 MAX = 10000
 
-####################################################################################################################################################################################
-def main():
-####################################################################################################################################################################################
-# MAIN
-  
-    # Call a subfile that helps handle shared routines and variables between this file and other files like workitemparser, jathemes, etc
-    cfg.init()
-    
-    # Collect api server and endpoint. Also collect all of the instance json infomation we need into arrays with CollectUsrMenuItems
-    common.CollectApiInfo()
- 
+# Configuration sections: (key in the output file, endpoint, description for the count message)
+# Connector sections use the connector endpoint under connectors/<id>/ and are read from every connector.
+CONNECTOR_SECTIONS = [
+    ('connectorJiraBoards', 'boards', common.ExtractBoardData, "Jira Boards"),
+    ('connectorPriorities', 'priorities', common.ExtractPriorityData, "Jira Priorities"),
+    ('connectorJiraProjects', 'projects', common.ExtractProjectData, "Jira Projects"),
+]
+CONFIG_SECTIONS = [
+    ('cities', 'cities', "Cities"),
+    ('costCenters', 'CostCenters', "Cost Centers"),
+    ('divisions', 'divisions', "Divisions"),
+    # Domains/Health
+    # DomainItemRelation
+    ('domains', 'Domains', "Domains"),
+    ('GridConfigurationsCapabilities', 'GridConfigurations/capability/ColumnConfigurations', "Grid Configurations for Capabilities"),
+    ('GridConfigurationsEpics', 'GridConfigurations/epic/ColumnConfigurations', "Grid Configurations for Epics"),
+    ('GridConfigurationsFeatures', 'GridConfigurations/feature/ColumnConfigurations', "Grid Configurations for Features"),
+    ('GridConfigurationsThemes', 'GridConfigurations/theme/ColumnConfigurations', "Grid Configurations for Themes"),
+    ('GridConfigurationsDependencies', 'GridConfigurations/dependency/ColumnConfigurations', "Grid Configurations for Dependencies"),
+    ('products', 'products', "Products"),
+    ('programs', 'programs', "Programs"),
+    ('users', 'users', "Users"),
+    ('iterations', 'iterations', "Iterations"),
+    ('anchorsprints', 'AnchorSprints', "Anchor Sprints"),
+    ('snapshots', 'snapshots', "Strategic Snapshots"),
+    ('themes', 'themes', "Themes"),
+    ('goals', 'goals', "Goals"),
+    ('releases', 'releases', "Releases"),
+    ('customers', 'customers', "Customers"),
+    ('portfolio', 'portfolios', "Portfolios"),
+    ('ideas', 'ideas', "Ideas"),
+    ('keyresults', 'keyresults', "Key Results"),
+    ('milestones', 'milestones', "Milestones"),
+    ('releasevehicle', 'releasevehicles', "Release Vehicles"),
+    ('teams', 'teams', "Teams"),
+    ('risks', 'risks', "Risks"),
+    ('dependency', 'dependencies', "Dependencies"),
+    ('customhierarchies', 'CustomHierarchies', "Custom Hierarchies"),
+]
+
+# Item sections: (key in the output file, endpoint, description for the count message or None)
+ITEM_SECTIONS = [
+    ('valuestreams', 'ValueStreams', "Value Streams"),
+    ('workcodes', 'WorkCodes', "Work Codes"),
+    ('objectives', 'objectives', None),
+    ('epics', 'epics', None),
+    ('features', 'features', None),
+    ('capabilities', 'capabilities', None),
+    ('stories', 'stories', None),
+    ('defects', 'defects', None),
+    ('tasks', 'tasks', None),
+    ('themes', 'themes', None),
+    ('themegroups', 'themegroups', None),
+]
+
+def _Save(allData, fileKey, key, data, description, onSection):
+    allData[key] = data
+    if description is not None:
+        print("A total of " + str(len(data)) + " " + description + " were retrieved from Jira Align")
+    if onSection is not None:
+        onSection(fileKey, key, data)
+
+def ExtractConfiguration(aClient, onSection=None):
+    """ Read all the configuration data from the client's instance.
+
+    Args:
+        aClient: The JiraAlignClient for the instance
+        onSection: If not None, called as onSection('config', key, data) as soon as each
+                   section has been read
+
+    Returns:
+        allConfigurationData
+    """
+    def Save(allData, fileKey, key, data, description):
+        _Save(allData, fileKey, key, data, description, onSection)
+
     # Setup a single variable to contain all the configuration data
     allConfigurationData = {}
 
     # Add the Jira Align Version Number - SSO blocks this
     #allConfigurationData['_version'] = cfg.jaVersion
     #print("Jira Align Version Number: " + cfg.jaVersion)
-    
-    # Collect all Region information and save it
-    regionArray = common.ReadAllItems('regions', MAX)
-    allConfigurationData['regions'] = regionArray
-    print("A total of " + str(len(regionArray)) + " regions were retrieved from Jira Align")
 
-    # Collect all the Jira Align Connector information and save it
-    connectorJiraBoardArray = common.GetAllConnectorBoards()
-    allConfigurationData['connectorJiraBoards'] = connectorJiraBoardArray
-    print("A total of " + str(len(connectorJiraBoardArray)) + " Jira Boards were retrieved from Jira Align")
+    # Collect all Region information and save it
+    Save(allConfigurationData, 'config', 'regions', aClient.ReadAllItems('regions', MAX), "regions")
 
-    connectorPrioritiesArray = common.GetAllConnectorPriorities()
-    allConfigurationData['connectorPriorities'] = connectorPrioritiesArray
-    print("A total of " + str(len(connectorPrioritiesArray)) + " Jira Priorities were retrieved from Jira Align")
+    # Collect all the Jira Align Connector information, from every connector, and save it
+    for key, endpoint, extract, description in CONNECTOR_SECTIONS:
+        print("Collecting all Connector " + endpoint + " info...")
+        Save(allConfigurationData, 'config', key, aClient.ReadAllConnectorItems(endpoint, extract), description)
 
     #connectorProductArray = common.GetAllConnectorProducts()
-    #allConfigurationData['connectorProducts'] = connectorProductArray
-    #print("A total of " + str(len(connectorProductArray)) + " Products were retrieved from Jira Align")
-
-    connectorJiraProjectArray = common.GetAllConnectorProjects()
-    allConfigurationData['connectorJiraProjects'] = connectorJiraProjectArray
-    print("A total of " + str(len(connectorJiraProjectArray)) + " Jira Projects were retrieved from Jira Align")
-
     #connectorCustomFieldsArray = common.GetAllConnectorCustomFields()
-    #allConfigurationData['connectorCustomFields'] = connectorCustomFieldsArray
-    #print("A total of " + str(len(connectorCustomFieldsArray)) + " Custom Fields were retrieved from Jira Align")
 
     # Collect all Connector External Team Mapping information and save it
-    connectorExternalTeamMappingArray = common.ReadAllItems('Connectors/2/TeamMappings', MAX)
-    allConfigurationData['connectorExternalTeamMapping'] = connectorExternalTeamMappingArray
-    print("A total of " + str(len(connectorExternalTeamMappingArray)) + " External Team Mappings were retrieved from Jira Align")
+    def ExtractMapping(eachMapping):
+        itemDict = {}
+        common.ExtractItemData('connectorExternalTeamMapping', eachMapping, itemDict)
+        return itemDict
+    Save(allConfigurationData, 'config', 'connectorExternalTeamMapping',
+         aClient.ReadAllConnectorItems('TeamMappings', ExtractMapping), "External Team Mappings")
 
     # Collect all Country information and save it - not supported by V2 API
     #countryArray = common.ReadAllItems('countries', MAX)
-    #allConfigurationData['countries'] = countryArray
-    #print("A total of " + str(len(countryArray)) + " Countries were retrieved from Jira Align")
-
-    # Collect all City information and save it
-    cityArray = common.ReadAllItems('cities', MAX)
-    allConfigurationData['cities'] = cityArray
-    print("A total of " + str(len(cityArray)) + " Cities were retrieved from Jira Align")
-
-    # Collect all Cost Center information and save it
-    costCenterArray = common.ReadAllItems('CostCenters', MAX)
-    allConfigurationData['costCenters'] = costCenterArray
-    print("A total of " + str(len(costCenterArray)) + " Cost Centers were retrieved from Jira Align")
-
-    # Collect all Division information and save it
-    divisionArray = common.ReadAllItems('divisions', MAX)
-    allConfigurationData['divisions'] = divisionArray
-    print("A total of " + str(len(divisionArray)) + " Divisions were retrieved from Jira Align")
-
-    # Collect all Domain information and save it
-    domainArray = common.ReadAllItems('Domains', MAX)
-    allConfigurationData['domains'] = domainArray
-    print("A total of " + str(len(domainArray)) + " Domains were retrieved from Jira Align")
-    # Domains/Health
-    # DomainItemRelation
 
-    # Collect all Grid Configurations for Capabilities information and save it
-    gridConfigCapabilitiesArray = common.ReadAllItems('GridConfigurations/capability/ColumnConfigurations', MAX)
-    allConfigurationData['GridConfigurationsCapabilities'] = gridConfigCapabilitiesArray
-    print("A total of " + str(len(gridConfigCapabilitiesArray)) +\
-          " Grid Configurations for Capabilities were retrieved from Jira Align")
-
-    # Collect all Grid Configurations for Epics information and save it
-    gridConfigEpicsArray = common.ReadAllItems('GridConfigurations/epic/ColumnConfigurations', MAX)
-    allConfigurationData['GridConfigurationsEpics'] = gridConfigEpicsArray
-    print("A total of " + str(len(gridConfigEpicsArray)) +\
-          " Grid Configurations for Epics were retrieved from Jira Align")
-
-    # Collect all Grid Configurations for Features information and save it
-    gridConfigFeaturesArray = common.ReadAllItems('GridConfigurations/feature/ColumnConfigurations', MAX)
-    allConfigurationData['GridConfigurationsFeatures'] = gridConfigFeaturesArray
-    print("A total of " + str(len(gridConfigFeaturesArray)) +\
-          " Grid Configurations for Features were retrieved from Jira Align")
-
-    # Collect all Grid Configurations for Themes information and save it
-    gridConfigThemesArray = common.ReadAllItems('GridConfigurations/theme/ColumnConfigurations', MAX)
-    allConfigurationData['GridConfigurationsThemes'] = gridConfigThemesArray
-    print("A total of " + str(len(gridConfigThemesArray)) +\
-          " Grid Configurations for Themes were retrieved from Jira Align")
-
-    # Collect all Grid Configurations for Dependencies information and save it
-    gridConfigDependenciesArray = common.ReadAllItems('GridConfigurations/dependency/ColumnConfigurations', MAX)
-    allConfigurationData['GridConfigurationsDependencies'] = gridConfigDependenciesArray
-    print("A total of " + str(len(gridConfigDependenciesArray)) +\
-          " Grid Configurations for Dependencies were retrieved from Jira Align")
-
-    # Collect all Product information and save it
-    productArray = common.ReadAllItems('products', MAX)
-    allConfigurationData['products'] = productArray
-    print("A total of " + str(len(productArray)) + " Products were retrieved from Jira Align")
-
-    # Collect all Program information and save it
-    programArray = common.ReadAllItems('programs', MAX)
-    allConfigurationData['programs'] = programArray
-    print("A total of " + str(len(programArray)) + " Programs were retrieved from Jira Align")
-
-    # Collect all User information and save it
-    userArray = common.ReadAllItems('users', MAX)
-    allConfigurationData['users'] = userArray
-    print("A total of " + str(len(userArray)) + " Users were retrieved from Jira Align")
-
-    # Collect all Iteration information and save it
-    iterationArray = common.ReadAllItems('iterations', MAX)
-    allConfigurationData['iterations'] = iterationArray
-    print("A total of " + str(len(iterationArray)) + " Iterations were retrieved from Jira Align")
-
-    # Collect all Anchor Sprint information and save it
-    anchorSprintArray = common.ReadAllItems('AnchorSprints', MAX)
-    allConfigurationData['anchorsprints'] = anchorSprintArray
-    print("A total of " + str(len(anchorSprintArray)) + " Anchor Sprints were retrieved from Jira Align")
-
-    # Collect all Snapshot information and save it
-    snapshotArray = common.ReadAllItems('snapshots', MAX)
-    allConfigurationData['snapshots'] = snapshotArray
-    print("A total of " + str(len(snapshotArray)) + " Strategic Snapshots were retrieved from Jira Align")
-
-    # Collect all Theme information and save it
-    themeArray = common.ReadAllItems('themes', MAX)
-    allConfigurationData['themes'] = themeArray
-    print("A total of " + str(len(themeArray)) + " Themes were retrieved from Jira Align")
-
-    # Collect all Goal information and save it
-    goalArray = common.ReadAllItems('goals', MAX)
-    allConfigurationData['goals'] = goalArray
-    print("A total of " + str(len(goalArray)) + " Goals were retrieved from Jira Align")
-
-    # Collect all Release/PI information and save it
-    releaseArray = common.ReadAllItems('releases', MAX)
-    allConfigurationData['releases'] = releaseArray
-    print("A total of " + str(len(releaseArray)) + " Releases were retrieved from Jira Align")
-
-    # Collect all Customer information and save it
-    customerArray = common.ReadAllItems('customers', MAX)
-    allConfigurationData['customers'] = customerArray
-    print("A total of " + str(len(customerArray)) + " Customers were retrieved from Jira Align")
-
-    # Collect all Portfolio information and save it
-    portfolioArray = common.ReadAllItems('portfolios', MAX)
-    allConfigurationData['portfolio'] = portfolioArray
-    print("A total of " + str(len(portfolioArray)) + " Portfolios were retrieved from Jira Align")
-
-    # Collect all Idea information and save it
-    ideaArray = common.ReadAllItems('ideas', MAX)
-    allConfigurationData['ideas'] = ideaArray
-    print("A total of " + str(len(ideaArray)) + " Ideas were retrieved from Jira Align")
-
-    # Collect all Key Results information and save it
-    keyResultsArray = common.ReadAllItems('keyresults', MAX)
-    allConfigurationData['keyresults'] = keyResultsArray
-    print("A total of " + str(len(keyResultsArray)) + " Key Results were retrieved from Jira Align")
-
-    # Collect all Milestone information and save it
-    milestoneArray = common.ReadAllItems('milestones', MAX)
-    allConfigurationData['milestones'] = milestoneArray
-    print("A total of " + str(len(milestoneArray)) + " Milestones were retrieved from Jira Align")
-
-    # Collect all Release Vehicle information and save it
-    releaseVehicleArray = common.ReadAllItems('releasevehicles', MAX)
-    allConfigurationData['releasevehicle'] = releaseVehicleArray
-    print("A total of " + str(len(releaseVehicleArray)) + " Release Vehicles were retrieved from Jira Align")
-
-    # Collect all Teams information and save it
-    teamsArray = common.ReadAllItems('teams', MAX)
-    allConfigurationData['teams'] = teamsArray
-    print("A total of " + str(len(teamsArray)) + " Teams were retrieved from Jira Align")
-
-    # Collect all Risks information and save it
-    risksArray = common.ReadAllItems('risks', MAX)
-    allConfigurationData['risks'] = risksArray
-    print("A total of " + str(len(risksArray)) + " Risks were retrieved from Jira Align")
-
-    # Collect all Dependency information and save it
-    dependencyArray = common.ReadAllItems('dependencies', MAX)
-    allConfigurationData['dependency'] = dependencyArray
-    print("A total of " + str(len(dependencyArray)) + " Dependencies were retrieved from Jira Align")
-
-    # Collect all Custom Hierarchy information and save it
-    customHierarchiesArray = common.ReadAllItems('CustomHierarchies', MAX)
-    allConfigurationData['customhierarchies'] = customHierarchiesArray
-    print("A total of " + str(len(customHierarchiesArray)) + " Custom Hierarchies were retrieved from Jira Align")
-
-    # Save all configuration information in JSON format, pretty printed to be human readable and diffable
-    configFileName = 'JiraAlign_config_data.json'
-    print("Writing all Jira Align configuration data to: " + configFileName)
-    with open(configFileName, 'w') as outfile:
-        json.dump(allConfigurationData, outfile, indent=4, sort_keys=True)
+    # Collect all the rest of the configuration information and save it
+    for key, endpoint, description in CONFIG_SECTIONS:
+        Save(allConfigurationData, 'config', key, aClient.ReadAllItems(endpoint, MAX), description)
+
+    return allConfigurationData
+
+def ExtractItems(aClient, onSection=None, sharded=False, shardDir=shard.SHARD_DIR, maxInMemory=None,
+                 partitioned=False):
+    """ Read all the item data from the client's instance.
+
+    Args:
+        aClient: The JiraAlignClient for the instance
+        onSection: If not None, called as onSection('items', key, data) as soon as each
+                   section has been read
+        sharded: If True, the sections in shard.SECTIONS are read one Program at a time
+                 across a pool of processes
+        shardDir: Where the shard files are written when sharded
+        maxInMemory: If not None, each section is read into a spill.SpillList holding at
+                     most this many items in memory
+        partitioned: If True, each section is read in createDate ranges at once (see
+                     partition.py)
+
+    Returns:
+        allItemData
+    """
+    def Save(allData, fileKey, key, data, description):
+        _Save(allData, fileKey, key, data, description, onSection)
 
     # Setup a single variable to contain all the item data
     allItemData = {}
 
-    # Add the Jira Align Version Number
-    allItemData['_version'] = cfg.jaVersion
+    # The item sections are held until they are written, so equal values in them are made
+    # to share one object (see compact.py); the output is unchanged
+    pool = compact.ValuePool()
 
-    # Collect all Value Stream information and save it
-    valueStreamArray = common.ReadAllItems('ValueStreams', MAX)
-    allItemData['valuestreams'] = valueStreamArray
-    print("A total of " + str(len(valueStreamArray)) + " Value Streams were retrieved from Jira Align")
-
-    # Collect all Work Codes information and save it
-    workCodesArray = common.ReadAllItems('WorkCodes', MAX)
-    allItemData['workcodes'] = workCodesArray
-    print("A total of " + str(len(workCodesArray)) + " Work Codes were retrieved from Jira Align")
-
-    # Collect all Objective information and save it
-    objectiveArray = common.ReadAllItems('objectives', MAX)
-    allItemData['objectives'] = objectiveArray
-
-    # Collect selected information about all JA Epics information and save it
-    epicArray = common.ReadAllItems('epics', MAX)
-    allItemData['epics'] = epicArray
-
-    # Collect selected information about all JA Features information and save it
-    featureArray = common.ReadAllItems('features', MAX)
-    allItemData['features'] = featureArray
-
-    # Collect selected information about all JA Capabilities information and save it
-    capabilityArray = common.ReadAllItems('capabilities', MAX)
-    allItemData['capabilities'] = capabilityArray
-
-    # Collect selected information about all JA Stories information and save it
-    storyArray = common.ReadAllItems('stories', MAX)
-    allItemData['stories'] = storyArray
-
-    # Collect selected information about all JA Defects information and save it
-    defectsArray = common.ReadAllItems('defects', MAX)
-    allItemData['defects'] = defectsArray
+    # Add the Jira Align Version Number
+    Save(allItemData, 'items', '_version', aClient.jaVersion, None)
+
+    # Read the biggest sections in shards first, if asked to
+    shardedData = {}
+    if sharded:
+        programIds = [program['id'] for program in aClient.ReadAllItems('programs', MAX)]
+        shardedData = shard.ExtractSharded(aClient, programIds, shardDir=shardDir)
+
+    # Collect selected information about all JA work items and save it
+    for key, endpoint, description in ITEM_SECTIONS:
+        if key in shardedData:
+            data = compact.InternItems(shardedData.pop(key), pool)
+        elif maxInMemory is not None:
+            print("Collecting up to " + str(MAX) + " items of type " + endpoint + "...")
+            data = spill.SpillList.From(aClient.StreamItems(endpoint, MAX), maxInMemory)
+            print('Loaded ' + str(len(data)) + " items of type " + endpoint + " (" + str(data.Spilled()) + " spilled to disk)")
+        elif partitioned:
+            data = compact.InternItems(partition.ReadAllItemsPartitioned(aClient, endpoint, maxToRead=MAX), pool)
+        else:
+            data = compact.InternItems(aClient.ReadAllItems(endpoint, MAX), pool)
+        Save(allItemData, 'items', key, data, description)
+
+    return allItemData
+
+def WriteConfiguration(allConfigurationData, suffix=""):
+    """ Save all configuration information in JSON format, pretty printed to be human
+        readable and diffable.
+    """
+    configFileName = 'JiraAlign_config_data' + suffix + '.json'
+    print("Writing all Jira Align configuration data to: " + configFileName)
+    with open(configFileName, 'w') as outfile:
+        spill.WriteJson(outfile, allConfigurationData)
+
+def WriteItems(allItemData, suffix=""):
+    """ Save all item information in JSON format, pretty printed to be human readable
+        and diffable.  Written item by item, so sections that are SpillLists are never
+        loaded whole.
+    """
+    itemFileName = 'JiraAlign_item_data' + suffix + '.json'
+    print("Writing all item data to: " + itemFileName)
+    with open(itemFileName, 'w') as outfile:
+        spill.WriteJson(outfile, allItemData)
+
+def ExtractAndCompare(profileNames, sharded=False, maxInMemory=None, partitioned=False):
+    """ Extract from each of the named instance profiles in parallel, writing each one's
+        files, and compare the instances endpoint by endpoint as the data arrives.
+    """
+    comparison = compare.Comparison(profileNames)
+    errors = {}
+
+    def Crawl(profileName):
+        try:
+            aClient = client.FromProfile(profileName)
+            def OnSection(fileKey, key, data):
+                comparison.Add(profileName, fileKey + "/" + key, data)
+            WriteConfiguration(ExtractConfiguration(aClient, OnSection), "_" + profileName)
+            WriteItems(ExtractItems(aClient, OnSection, sharded, shard.SHARD_DIR + "_" + profileName, maxInMemory,
+                                    partitioned), "_" + profileName)
+            print(profileName + ": " + aClient.metrics.Summary())
+        except Exception as e:
+            errors[profileName] = str(e)
+            print(profileName + ": extraction FAILED: " + str(e))
+
+    threads = [threading.Thread(target=Crawl, args=(name,)) for name in profileNames]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = comparison.Report()
+    if errors:
+        report['_errors'] = errors
+    comparisonFileName = 'JiraAlign_comparison.json'
+    print("Writing the comparison to: " + comparisonFileName)
+    with open(comparisonFileName, 'w') as outfile:
+        fastjson.DumpPretty(report, outfile)
 
-    # Collect selected information about all JA Task information and save it
-    tasksArray = common.ReadAllItems('tasks', MAX)
-    allItemData['tasks'] = tasksArray
+####################################################################################################################################################################################
+def main():
+####################################################################################################################################################################################
+# MAIN
 
-    # Collect selected information about all JA Themes information and save it
-    themeArray = common.ReadAllItems('themes', MAX)
-    allItemData['themes'] = themeArray
+    # Call a subfile that helps handle shared routines and variables between this file and other files like workitemparser, jathemes, etc
+    cfg.init()
 
-    # Collect selected information about all JA Theme Groups information and save it
-    themeGroupsArray = common.ReadAllItems('themegroups', MAX)
-    allItemData['themegroups'] = themeGroupsArray
+    args = sys.argv[1:]
+    sharded = '--shard' in args
+    if sharded:
+        args.remove('--shard')
+    partitioned = '--partition' in args
+    if partitioned:
+        args.remove('--partition')
+    maxInMemory = None
+    for arg in list(args):
+        if (arg == '--spill') or arg.startswith('--spill='):
+            args.remove(arg)
+            maxInMemory = int(arg[len('--spill='):]) if '=' in arg else spill.MAX_IN_MEMORY
+
+    # Several instance profiles named on the command line: extract them all and compare
+    if len(args) > 0:
+        ExtractAndCompare(args, sharded, maxInMemory, partitioned)
+        return
 
-    # Save all configuration information in JSON format, pretty printed to be human readable and diffable
-    with open('JiraAlign_config_data.json', 'w') as outfile:
-        json.dump(allConfigurationData, outfile, indent=4, sort_keys=True)
+    # Collect api server and endpoint. Also collect all of the instance json infomation we need into arrays with CollectUsrMenuItems
+    common.CollectApiInfo()
 
-    # Save all item information in JSON format, pretty printed to be human readable and diffable
-    itemFileName = 'JiraAlign_item_data.json'
-    print("Writing all item data to: " + itemFileName)
-    with open(itemFileName, 'w') as outfile:
-        json.dump(allItemData, outfile, indent=4, sort_keys=True)
+    WriteConfiguration(ExtractConfiguration(client.GetDefault()))
+    WriteItems(ExtractItems(client.GetDefault(), sharded=sharded, maxInMemory=maxInMemory, partitioned=partitioned))
 
     pass #eof
 
-####################################################################################################################################################################################       
+####################################################################################################################################################################################
 if __name__ == "__main__":
-    main()     
+    main()
 ####################################################################################################################################################################################
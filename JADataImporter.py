@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Imports a JADataExtractor snapshot into another Jira Align instance.  Items are
+    created in dependency order (regions, cities, programs, teams, releases, epics,
+    capabilities, features, stories, tasks), several at a time within each tier, with
+    their references changed to the IDs of the newly created items.
+
+    Usage:  python JADataImporter.py [--dry-run] [config_data.json item_data.json [profile]]
+    With a profile (see creds.profiles) the data is loaded into that instance, otherwise
+    into the usual one.
+
+    The old -> new ID of each item is saved to JiraAlign_import_idmap.ndjson as soon as
+    it is created.  If the import is interrupted, run it again and it carries on where
+    it stopped.  The outcome of every item is written to JiraAlign_import_report.json.
+"""
+
+import sys
+import common
+import fastjson
+import cfg
+import client
+import importer
+
+# Default names of the JADataExtractor output files
+CONFIG_FILE = 'JiraAlign_config_data.json'
+ITEM_FILE = 'JiraAlign_item_data.json'
+
+####################################################################################################################################################################################
+def main():
+####################################################################################################################################################################################
+# MAIN
+
+    args = sys.argv[1:]
+    dryRun = False
+    if args and args[0] == '--dry-run':
+        dryRun = True
+        args = args[1:]
+    configFileName = args[0] if len(args) > 1 else CONFIG_FILE
+    itemFileName = args[1] if len(args) > 1 else ITEM_FILE
+    profileName = args[2] if len(args) > 2 else None
+
+    # Call a subfile that helps handle shared routines and variables between this file and other files like workitemparser, jathemes, etc
+    cfg.init()
+
+    if profileName is not None:
+        aClient = client.FromProfile(profileName)
+    else:
+        # Collect api server and endpoint
+        common.CollectApiInfo()
+        aClient = client.GetDefault()
+
+    print("Reading the snapshot from " + configFileName + " and " + itemFileName)
+    with open(configFileName, 'r', encoding='utf-8') as infile:
+        configData = fastjson.Load(infile)
+    with open(itemFileName, 'r', encoding='utf-8') as infile:
+        itemData = fastjson.Load(infile)
+
+    print("Importing into " + aClient.instanceurl + (" (dry run)" if dryRun else ""))
+    summary = importer.ImportSnapshot(aClient, configData, itemData, 'JiraAlign_import_idmap.ndjson',
+                                      'JiraAlign_import_report.json', dryRun=dryRun)
+    for key, _, _ in importer.TIERS:
+        counts = summary.get(key)
+        if counts is not None:
+            print(key + ": " + str(counts['created']) + " created, " + str(counts['skipped']) + " already done, " +
+                  str(counts['failed']) + " failed")
+    print(aClient.metrics.Summary())
+
+    pass #eof
+
+####################################################################################################################################################################################
+if __name__ == "__main__":
+    main()
+####################################################################################################################################################################################
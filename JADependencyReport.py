@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Analyzes the dependencies between Features and Epics: dependency cycles, the longest
+    dependency chains, the items the most others depend on, and dependencies that cross
+    Programs.  Works offline against the JADataExtractor output files if they are
+    present, otherwise reads the data from Jira Align.
+
+    Usage:  python JADependencyReport.py [config_data.json item_data.json]
+
+    Writes the full report to dependency_report.json.  If the instance names the ends of
+    a dependency with different fields, change the field lists at the top of depgraph.py.
+"""
+
+import os
+import sys
+import json
+import common
+import cfg
+import depgraph
+
+# Maximum number of records to return for main data items
+MAX = 100000
+
+# Default names of the JADataExtractor output files
+CONFIG_FILE = 'JiraAlign_config_data.json'
+ITEM_FILE = 'JiraAlign_item_data.json'
+
+####################################################################################################################################################################################
+def main():
+####################################################################################################################################################################################
+# MAIN
+
+    if len(sys.argv) > 2:
+        configFileName = sys.argv[1]
+        itemFileName = sys.argv[2]
+    else:
+        configFileName = CONFIG_FILE
+        itemFileName = ITEM_FILE
+
+    # Use the export files if we have them, otherwise go to Jira Align for the data
+    if os.path.exists(configFileName) and os.path.exists(itemFileName):
+        print("Reading exported data from " + configFileName + " and " + itemFileName)
+        with open(configFileName, 'r') as infile:
+            dependencies = json.load(infile)['dependency']
+        with open(itemFileName, 'r') as infile:
+            allItemData = json.load(infile)
+        itemsByType = {'features': allItemData['features'], 'epics': allItemData['epics']}
+    else:
+        cfg.init()
+        common.CollectApiInfo()
+        dependencies = common.ReadAllItems('dependencies', MAX)
+        itemsByType = {'features': common.ReadAllItems('features', MAX),
+                       'epics': common.ReadAllItems('epics', MAX)}
+    print("A total of " + str(len(dependencies)) + " Dependencies were retrieved")
+
+    graph = depgraph.DependencyGraph(dependencies, itemsByType)
+    report = graph.Report()
+    print(str(report['dependencies']) + " dependencies between " + str(report['items']) + " items, " +
+          str(len(report['unresolvedDependencyIds'])) + " could not be tied to two items")
+    print(str(len(report['cycles'])) + " dependency cycles")
+    for cycle, path in list(zip(report['cycles'], report['cyclePaths']))[:5]:
+        tmpStr = "  " + " -> ".join(which + "/" + str(id) for which, id in path + path[:1])
+        if len(cycle) > len(path):
+            tmpStr = tmpStr + " (one loop of a cycle of " + str(len(cycle)) + " items: " + \
+                     ", ".join(which + "/" + str(id) for which, id in cycle) + ")"
+        print(tmpStr)
+    if report['longestChains']:
+        longest = report['longestChains'][0]
+        print("Longest chain: " + str(longest['length']) + " items, starting at " +
+              longest['chain'][0][0] + "/" + str(longest['chain'][0][1]))
+    for entry in report['fanIn'][:5]:
+        print("  " + entry['which'] + "/" + str(entry['id']) + " is depended on by " + str(entry['dependents']) + " items")
+    print(str(report['crossProgramDependencies']) + " dependencies cross Programs")
+
+    reportFileName = 'dependency_report.json'
+    print("Writing the report to: " + reportFileName)
+    with open(reportFileName, 'w') as outfile:
+        json.dump(report, outfile, indent=4, sort_keys=True)
+
+    pass #eof
+
+####################################################################################################################################################################################
+if __name__ == "__main__":
+    main()
+####################################################################################################################################################################################
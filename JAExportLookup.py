@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Looks up items in a JADataExtractor output file (e.g. last night's backup) without
+    loading the whole file.  The first lookup in a file indexes it and saves the index
+    beside it (<file>.idx); lookups after that take milliseconds.
+
+    Usage:  python JAExportLookup.py <export file> <section> [id ...]
+    e.g.    python JAExportLookup.py JiraAlign_item_data.json stories 1234 1235
+    With no ids, lists how many items each section holds (or, for a section, their ids).
+"""
+
+import sys
+import exportindex
+import fastjson
+
+####################################################################################################################################################################################
+def main():
+####################################################################################################################################################################################
+# MAIN
+
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    fileName = sys.argv[1]
+
+    with exportindex.ExportReader(fileName) as reader:
+        if len(sys.argv) < 3:
+            for section in reader.Sections():
+                print(section + ": " + str(reader.Count(section)) + " items")
+            return
+        section = sys.argv[2]
+        if len(sys.argv) < 4:
+            print(" ".join(str(id) for id in reader.Ids(section) if id != exportindex.NO_ID))
+            return
+        for id in sys.argv[3:]:
+            item = reader.Get(section, int(id))
+            if item is None:
+                print(section + "/" + id + " is not in " + fileName)
+            else:
+                print(fastjson.DumpsPretty(item))
+
+    pass #eof
+
+####################################################################################################################################################################################
+if __name__ == "__main__":
+    main()
+####################################################################################################################################################################################
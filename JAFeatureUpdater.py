@@ -9,6 +9,8 @@
 from warnings import catch_warnings
 import common
 import cfg
+import registry
+import dateindex
 import json
 
 # Maximum number of records to return for main data items
@@ -25,13 +27,10 @@ def main():
     # Collect api server and endpoint. Also collect all of the instance json infomation we need into arrays with CollectUsrMenuItems
     common.CollectApiInfo()
  
-    # Collect all Program information and save it
-    programArray = common.ReadAllItems('programs', MAX)
-    print("A total of " + str(len(programArray)) + " Programs were retrieved from Jira Align")
-
-    # Collect all Release/PI information and save it
-    releaseArray = common.ReadAllItems('releases', MAX)
-    print("A total of " + str(len(releaseArray)) + " Releases/PIs were retrieved from Jira Align")
+    # Collect all Program and Release/PI information into the shared registry
+    reg = registry.GetRegistry()
+    print("A total of " + str(len(reg.GetItems('programs'))) + " Programs were retrieved from Jira Align")
+    print("A total of " + str(len(reg.GetItems('releases'))) + " Releases/PIs were retrieved from Jira Align")
 
     # Gather info from the user
     print("")
@@ -47,8 +46,8 @@ def main():
     # Print out the name of the Program so it can be visually verified
     print("")
     print("Verify these are correct:")
-    print(" Program to search in: " + common.get_key_info(programArray, programId))
-    print(" PI to set Features to: " + common.get_key_info(releaseArray, newPIID))
+    print(" Program to search in: " + reg.GetKeyInfo('programs', programId))
+    print(" PI to set Features to: " + reg.GetKeyInfo('releases', newPIID))
     print("")
 
     # Collect selected information about all JA Features information and save it
@@ -64,7 +63,11 @@ def main():
     # Loop through all the features, looking for ones in the Unassigned Backlog,
     # that match the requested ProgramId and stateId.
     print("Searching through the features...")  
-    for aFeature in featureArray:
+    # The rows accepted in each year range, found with two binary searches each
+    acceptedDates = dateindex.DateIndex(featureArray, 'acceptedDate')
+    acceptedIn2024 = set(acceptedDates.RowsInYears(2024, 2024))
+    acceptedIn2019To2023 = set(acceptedDates.RowsInYears(2019, 2023))
+    for row, aFeature in enumerate(featureArray):
         # If this feature is assigned to a PI, then skip it
         if 'releaseId' in aFeature:
             skippedFeatureCount = skippedFeatureCount + 1
@@ -86,15 +89,11 @@ def main():
                     print(tmpStr)
                     
                     # Count of Stories accepted in 2024
-                    if ("2024-" in aFeature['acceptedDate']):
+                    if row in acceptedIn2024:
                         matchFor2024Count = matchFor2024Count + 1
                         
                     # Only prompt for stories accepted in 2019 through 2023
-                    if ("2019" not in aFeature['acceptedDate']) and\
-                         ("2020-" not in aFeature['acceptedDate']) and\
-                         ("2021-" not in aFeature['acceptedDate']) and\
-                         ("2022-" not in aFeature['acceptedDate']) and\
-                         ("2023-" not in aFeature['acceptedDate']):
+                    if row not in acceptedIn2019To2023:
                         print("  Not accepted in 2019-2023, skipping")
                         skippedFeatureCount = skippedFeatureCount + 1
                         iteration = iteration + 1
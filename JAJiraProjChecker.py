@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Finds Features and Stories whose Jira Project is not one that the connector maps to
+    their Program, i.e. the items that JAFeatureJiraProjFixer and JAStoryJiraProjFixer
+    need to fix.  Works offline against the JADataExtractor output files if they are
+    present, otherwise reads the data from Jira Align.
+
+    Usage:  python JAJiraProjChecker.py [config_data.json item_data.json]
+
+    Writes features_project_mismatches.csv and stories_project_mismatches.csv, which can
+    be passed straight to the fixers in batch mode once any blank jiraProjectKey values
+    have been picked from the candidates column.  Items that are not in any Program can't
+    be fixed that way; they are listed in features_no_program.csv and stories_no_program.csv.
+"""
+
+import os
+import sys
+import json
+import common
+import cfg
+import projfix
+
+# Maximum number of records to return for main data items
+MAX = 100000
+
+# Default names of the JADataExtractor output files
+CONFIG_FILE = 'JiraAlign_config_data.json'
+ITEM_FILE = 'JiraAlign_item_data.json'
+
+####################################################################################################################################################################################
+def main():
+####################################################################################################################################################################################
+# MAIN
+
+    if len(sys.argv) > 2:
+        configFileName = sys.argv[1]
+        itemFileName = sys.argv[2]
+    else:
+        configFileName = CONFIG_FILE
+        itemFileName = ITEM_FILE
+
+    # Use the export files if we have them, otherwise go to Jira Align for the data
+    if os.path.exists(configFileName) and os.path.exists(itemFileName):
+        print("Reading exported data from " + configFileName + " and " + itemFileName)
+        with open(configFileName, 'r') as infile:
+            connectorProjects = json.load(infile)['connectorJiraProjects']
+        with open(itemFileName, 'r') as infile:
+            allItemData = json.load(infile)
+        itemsByType = {'features': allItemData['features'], 'stories': allItemData['stories']}
+    else:
+        cfg.init()
+        common.CollectApiInfo()
+        connectorProjects = common.GetAllConnectorProjects()
+        itemsByType = {'features': common.ReadAllItems('features', MAX),
+                       'stories': common.ReadAllItems('stories', MAX)}
+    print("A total of " + str(len(connectorProjects)) + " Jira Projects are mapped by the connector")
+
+    for which in ['features', 'stories']:
+        noProgram = []
+        mismatches = projfix.FindProjectMismatches(connectorProjects, itemsByType[which], noProgram)
+        outFileName = which + "_project_mismatches.csv"
+        projfix.WriteBatchFile(outFileName, mismatches)
+        unresolved = len([m for m in mismatches if not m['jiraProjectKey']])
+        print(str(len(mismatches)) + " of " + str(len(itemsByType[which])) + " " + which +
+              " are in a Jira Project not mapped to their Program (" + str(unresolved) +
+              " need a project picked), written to: " + outFileName)
+        if noProgram:
+            noProgramFileName = which + "_no_program.csv"
+            projfix.WriteNoProgramFile(noProgramFileName, noProgram)
+            print(str(len(noProgram)) + " " + which + " are synced to Jira but not in any Program, written to: " +
+                  noProgramFileName)
+
+    pass #eof
+
+####################################################################################################################################################################################
+if __name__ == "__main__":
+    main()
+####################################################################################################################################################################################
@@ -5,11 +5,20 @@
     Helps with Jira Align data cleanup where the wrong Jira Project was
     selected when the Story was originally created in Jira Align.
     Uses Jira Align POST calls with the Stories.
+
+    Batch mode:  python JAStoryJiraProjFixer.py <file>
+    where <file> is a CSV (or JSON list) with the columns itemId, programId and
+    jiraProjectKey.  All the Stories are read in bulk and copied in parallel, and an
+    old -> new ID mapping plus a per item report are written next to the file.
 """
 
 from warnings import catch_warnings
+import os
+import sys
 import common
 import cfg
+import projfix
+import registry
 
 # Maximum number of records to return for main data items
 MAX = 10
@@ -25,9 +34,19 @@ def main():
     # Collect api server and endpoint. Also collect all of the instance json infomation we need into arrays with CollectUsrMenuItems
     common.CollectApiInfo()
  
-    # Collect all Program information and save it
-    programArray = common.ReadAllItems('programs', MAX)
-    print("A total of " + str(len(programArray)) + " Programs were retrieved from Jira Align")
+    # Collect all Program information into the shared registry
+    reg = registry.GetRegistry()
+    print("A total of " + str(len(reg.GetItems('programs'))) + " Programs were retrieved from Jira Align")
+
+    # Batch mode: fix every item listed in the given file
+    if len(sys.argv) > 1:
+        batchFileName = sys.argv[1]
+        entries = projfix.ReadBatchFile(batchFileName)
+        print("A total of " + str(len(entries)) + " Stories were read from " + batchFileName)
+        baseName = os.path.splitext(batchFileName)[0]
+        projfix.RunBatch('stories', 'Stories', entries,
+                         baseName + "_id_mapping.json", baseName + "_report.csv")
+        return
 
     # Gather info from the user
     print("")
@@ -44,25 +63,15 @@ def main():
     print("")
     print("Verify these are correct:")
     print(" Story ID to fix:           " + str(storyID))
-    print(" Program ID of the Feature: " + str(programID))
+    print(" Program ID of the Story:   " + (reg.GetKeyInfo('programs', programID) or str(programID) + " (not found)"))
     print(" Jira Project to use:       " + jiraProjectName)
     print("")
 
     aFeature = common.ReadOneItem('stories', storyID)
 
     print("  Attempting to fix the Jira Project...")
-    header = {'Content-Type': 'application/json;odata.metadata=minimal;odata.streaming=true'}
-
-    # Create the POST data    
-    body = aFeature[0]
-    # Clear some fields
-    body.pop('id', None)
-    body.pop('createDate', None)
-    body.pop('self', None)
-    body['jiraProjectKey'] = jiraProjectName
-    # Create a copy of the Story
-    response = common.PostToJiraAlign(header, body, True, True, 
-                                        cfg.instanceurl + "/Stories")
+    # Create a copy of the Story with the new Jira Project
+    response = projfix.CopyToJiraProject('Stories', aFeature[0], jiraProjectName)
     if (response.status_code == 201):
         print("  Story successfully copied in Jira Align to ID: " + str(response.text))
 
@@ -70,7 +79,7 @@ def main():
     else:
         print("Story could not be copied")
         print(response.content)
-        print(body)
+        print(aFeature[0])
         pass
                 
     pass #eof
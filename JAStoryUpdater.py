@@ -9,6 +9,8 @@
 from warnings import catch_warnings
 import common
 import cfg
+import registry
+import itemtable
 import json
 
 # Maximum number of records to return for main data items
@@ -25,13 +27,10 @@ def main():
     # Collect api server and endpoint. Also collect all of the instance json infomation we need into arrays with CollectUsrMenuItems
     common.CollectApiInfo()
  
-    # Collect all Program information and save it
-    programArray = common.ReadAllItems('programs', MAX)
-    print("A total of " + str(len(programArray)) + " Programs were retrieved from Jira Align")
-
-    # Collect all Release/PI information and save it
-    releaseArray = common.ReadAllItems('releases', MAX)
-    print("A total of " + str(len(releaseArray)) + " Releases/PIs were retrieved from Jira Align")
+    # Collect all Program and Release/PI information into the shared registry
+    reg = registry.GetRegistry()
+    print("A total of " + str(len(reg.GetItems('programs'))) + " Programs were retrieved from Jira Align")
+    print("A total of " + str(len(reg.GetItems('releases'))) + " Releases/PIs were retrieved from Jira Align")
 
     # Gather info from the user
     print("")
@@ -47,8 +46,8 @@ def main():
     # Print out the name of the Program so it can be visually verified
     print("")
     print("Verify these are correct:")
-    print(" Program to search in: " + common.get_key_info(programArray, programId))
-    print(" PI to set Stories to: " + common.get_key_info(releaseArray, newPIID))
+    print(" Program to search in: " + reg.GetKeyInfo('programs', programId))
+    print(" PI to set Stories to: " + reg.GetKeyInfo('releases', newPIID))
     print("")
 
     # Collect selected information about all JA Stories information and save it
@@ -58,127 +57,111 @@ def main():
     successfulChangeCount = 0
     failedChangeCount = 0
     batch = True
-    matchFor2024Count = 0
-    iteration = 1
     
-    # Loop through all the stories, looking for ones in the Unassigned Backlog,
-    # that match the requested ProgramId and stateId.
+    # Look for stories in the Unassigned Backlog (not assigned to a PI) that match the
+    # requested ProgramId and stateId.  All the others are skipped.
     print("Searching through the stories...")  
-    for aStory in storyArray:
-        # If this story is assigned to a PI, then skip it
-        if 'releaseId' in aStory:
+    storyTable = itemtable.ItemTable(storyArray)
+    matches = ~storyTable.Has('releaseId') & storyTable.Eq('programId', programId) & storyTable.Eq('state', stateId)
+    skippedStoryCount = len(storyTable) - matches.Count()
+    # Count of Stories accepted in 2024
+    matchFor2024Count = (matches & storyTable.Between('acceptedDate', *itemtable.YearRange(2024, 2024))).Count()
+    # Only prompt for stories accepted in 2019 through 2023
+    wanted = storyTable.Between('acceptedDate', *itemtable.YearRange(2019, 2023))
+    wantedRows = set((matches & wanted).Rows())
+    for row in matches.Rows():
+        aStory = storyArray[row]
+        # Number the stories by their position in the full list
+        iteration = row + 1
+        tmpStr = ""
+        print("")
+        tmpStr = tmpStr + "(" + str(iteration) + ") STORY: ID=" + str(aStory['id']) +\
+            " State=" + str(aStory['state'])
+        if 'externalKey' in aStory:
+            tmpStr = tmpStr + " JIRA Key=" + aStory['externalKey']
+        tmpStr = tmpStr +\
+              " Accepted Date=" + aStory['acceptedDate'] +\
+              " Title=" + aStory['title']
+        print(tmpStr)
+        
+        if row not in wantedRows:
+            print("  Not accepted in 2019-2023, skipping")
             skippedStoryCount = skippedStoryCount + 1
-        # Else this story is NOT assigned to a PI (it's in the Unassigned Backlog)
+            continue
+        
+        # If we are NOT in batch mode, then confirm before moving the story
+        if (batch != True):
+            # Confirm that we want to move this story
+            moveStory = input("DO YOU WANT TO UPDATE THIS STORY? ")
+            if (moveStory != 'y'):
+                continue
         else:
-            # If the Program matches what we are looking for
-            if aStory['programId'] == programId:
-                # If the State of the story matches what we are looking for
-                if aStory['state'] == stateId:
-                    tmpStr = ""
-                    print("")
-                    tmpStr = tmpStr + "(" + str(iteration) + ") STORY: ID=" + str(aStory['id']) +\
-                        " State=" + str(aStory['state'])
-                    if 'externalKey' in aStory:
-                        tmpStr = tmpStr + " JIRA Key=" + aStory['externalKey']
-                    tmpStr = tmpStr +\
-                          " Accepted Date=" + aStory['acceptedDate'] +\
-                          " Title=" + aStory['title']
-                    print(tmpStr)
-                    
-                    # Count of Stories accepted in 2024
-                    if ("2024-" in aStory['acceptedDate']):
-                        matchFor2024Count = matchFor2024Count + 1
-                        
-                    # Only prompt for stories accepted in 2019 through 2023
-                    if ("2019" not in aStory['acceptedDate']) and\
-                         ("2020-" not in aStory['acceptedDate']) and\
-                         ("2021-" not in aStory['acceptedDate']) and\
-                         ("2022-" not in aStory['acceptedDate']) and\
-                         ("2023-" not in aStory['acceptedDate']):
-                        print("  Not accepted in 2019-2023, skipping")
-                        skippedStoryCount = skippedStoryCount + 1
-                        iteration = iteration + 1
-                        continue
-                    
-                    # If we are NOT in batch mode, then confirm before moving the story
-                    if (batch != True):
-                        # Confirm that we want to move this story
-                        moveStory = input("DO YOU WANT TO UPDATE THIS STORY? ")
-                        if (moveStory != 'y'):
-                            iteration = iteration + 1
-                            continue
-                    else:
-                        print("  Attempting to update the story...")
-                    
-                        header = {'Content-Type': 'application/json;odata.metadata=minimal;odata.streaming=true'}
-
-                        # Fix any invalid story point values
-                        body = []
-                        body.append({'value': 0, 'path': '/effortPoints','op': 'replace'}) # 0 is a dummy value
-
-                        # If there is a Story Point value in the Story
-                        if 'effortPoints' in aStory:
-                            body[0]['value'] = aStory['effortPoints'] # Set to original value in the item
-                        # No Story Point value in the story now, so set to zero
-                        else:
-                            aStory['effortPoints'] = 0
-                            body[0]['value'] = 0
-
-                        # Replace invalid Story Point values with valid ones
-                        if aStory['effortPoints'] == 4:
-                            body[0]['value'] = 3
-                        elif aStory['effortPoints'] == 6:
-                            body[0]['value'] = 5
-                        elif aStory['effortPoints'] == 7:
-                            body[0]['value'] = 8
-                        elif aStory['effortPoints'] == 9:
-                            body[0]['value'] = 8
-                        elif aStory['effortPoints'] == 10:
-                            body[0]['value'] = 8
-                        elif aStory['effortPoints'] == 11:
-                            body[0]['value'] = 13
-                        elif aStory['effortPoints'] == 12:
-                            body[0]['value'] = 13
-                        elif aStory['effortPoints'] == 21:
-                            body[0]['value'] = 20
-                        else:
-                            pass # Do nothing, the current value is fine
-
-                        # If the Description is missing, use the Title in it's place for
-                        # that PATCH so that it will work (since Description is a required
-                        # field in Jira Align).
-                        if ('description' not in aStory):
-                            # Create the PATCH data    
-                            body2 = {'value': 'foo', 'path': '/description','op': 'replace'}
-                            body2['value'] = aStory['title']
-                            body.append(body2)
-
-                        # Create the PATCH data to update the PI
-                        body3 = {'value': 193, 'path': '/releaseId','op': 'replace'} # 193 = placeholder number
-                        body3['value'] = newPIID # update the placeholder
-                        #print(body3)
-                        body.append(body3)
-
-                        # Update the Story in Jira Align with a PATCH
-                        url = cfg.instanceurl + "/Stories/" + str(aStory['id'])
-                        #print(url)
-                        response = common.PatchToJiraAlign(header, body, True, True, url)
-                        if (response.status_code == 204):
-                            print("  Story successfully updated in Jira Align.")
-                            successfulChangeCount = successfulChangeCount + 1
-                        else:
-                            print(response)
-                            print(response.content)
-                            print(url)
-                            print(body)
-                            failedChangeCount = failedChangeCount + 1
-                            #foo = input("FAILURE")
-
-                else:
-                    skippedStoryCount = skippedStoryCount + 1
+            print("  Attempting to update the story...")
+        
+            header = {'Content-Type': 'application/json;odata.metadata=minimal;odata.streaming=true'}
+
+            # Fix any invalid story point values
+            body = []
+            body.append({'value': 0, 'path': '/effortPoints','op': 'replace'}) # 0 is a dummy value
+
+            # If there is a Story Point value in the Story
+            if 'effortPoints' in aStory:
+                body[0]['value'] = aStory['effortPoints'] # Set to original value in the item
+            # No Story Point value in the story now, so set to zero
+            else:
+                aStory['effortPoints'] = 0
+                body[0]['value'] = 0
+
+            # Replace invalid Story Point values with valid ones
+            if aStory['effortPoints'] == 4:
+                body[0]['value'] = 3
+            elif aStory['effortPoints'] == 6:
+                body[0]['value'] = 5
+            elif aStory['effortPoints'] == 7:
+                body[0]['value'] = 8
+            elif aStory['effortPoints'] == 9:
+                body[0]['value'] = 8
+            elif aStory['effortPoints'] == 10:
+                body[0]['value'] = 8
+            elif aStory['effortPoints'] == 11:
+                body[0]['value'] = 13
+            elif aStory['effortPoints'] == 12:
+                body[0]['value'] = 13
+            elif aStory['effortPoints'] == 21:
+                body[0]['value'] = 20
             else:
-                skippedStoryCount = skippedStoryCount + 1
-        iteration = iteration + 1
+                pass # Do nothing, the current value is fine
+
+            # If the Description is missing, use the Title in it's place for
+            # that PATCH so that it will work (since Description is a required
+            # field in Jira Align).
+            if ('description' not in aStory):
+                # Create the PATCH data    
+                body2 = {'value': 'foo', 'path': '/description','op': 'replace'}
+                body2['value'] = aStory['title']
+                body.append(body2)
+
+            # Create the PATCH data to update the PI
+            body3 = {'value': 193, 'path': '/releaseId','op': 'replace'} # 193 = placeholder number
+            body3['value'] = newPIID # update the placeholder
+            #print(body3)
+            body.append(body3)
+
+            # Update the Story in Jira Align with a PATCH
+            url = cfg.instanceurl + "/Stories/" + str(aStory['id'])
+            #print(url)
+            response = common.PatchToJiraAlign(header, body, True, True, url)
+            if (response.status_code == 204):
+                print("  Story successfully updated in Jira Align.")
+                successfulChangeCount = successfulChangeCount + 1
+            else:
+                print(response)
+                print(response.content)
+                print(url)
+                print(body)
+                failedChangeCount = failedChangeCount + 1
+                #foo = input("FAILURE")
+
 
     # Output operation summary
     print("")                    
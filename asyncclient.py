@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+#
+# asyncclient.py
+#
+# asyncio versions of the request helpers, for jobs that want hundreds of GETs, POSTs and
+# PATCHes in flight from one process.  An AsyncJiraAlignClient wraps a JiraAlignClient and
+# shares its credentials, rate limiter and metrics, so sync and async requests against the
+# same instance are limited and counted together.
+#
+# If aiohttp is installed it is used for the HTTP requests.  Otherwise each request is run
+# through the sync client's pooled session in a worker thread (asyncio.to_thread).  Either
+# way, no more than MAX_IN_FLIGHT requests per client are outstanding at once, and the
+# responses have the same status_code / headers / text / content / json() as requests'.
+
+import asyncio
+import json
+import threading
+import time
+
+import cache
+import cfg
+import client
+import common
+import fastjson
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Maximum number of requests per client waiting on the server at once
+MAX_IN_FLIGHT = 100
+# Number of pages ReadAllItems asks for at once, after the first
+PAGES_IN_FLIGHT = 8
+
+class AsyncResponse:
+    """ The parts of a requests.Response the scripts use, for an aiohttp response.
+    """
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return fastjson.Loads(self.content)
+
+class AsyncJiraAlignClient:
+    """ Async requests to the instance of the given JiraAlignClient.
+
+        Use one from a single event loop at a time.  Call Close (or use "async with")
+        when done, to release the aiohttp connections.
+    """
+    def __init__(self, aClient):
+        self.client = aClient
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.Close()
+
+    async def Close(self):
+        await self._CloseSession()
+        self._semaphore = None
+        self._loop = None
+
+    async def _CloseSession(self):
+        session = self._session
+        self._session = None
+        if (session is None) or session.closed:
+            return
+        try:
+            await session.close()
+        except RuntimeError:
+            # Its loop has been closed, and its connections went with it
+            pass
+
+    async def _Setup(self):
+        # The session and semaphore belong to the running loop, so start again if it changed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            await self._CloseSession()
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+            if aiohttp is not None:
+                self._session = aiohttp.ClientSession()
+
+    async def _Request(self, method, url, use_bearer, v1auth, headers=None, data=None, verify=True):
+        await self._Setup()
+        aClient = self.client
+        if url is None:
+            # Use the default URL
+            url = aClient.instanceurl
+        async with self._semaphore:
+            delay = aClient.limiter.Reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if common.DEBUG == True:
+                print(method + " URL: " + url)
+            if self._session is None:
+                # No aiohttp, so use the sync client's session from a worker thread
+                auth = cfg.BearerAuth(aClient.jatoken) if use_bearer else v1auth
+                start = time.perf_counter()
+                result = await asyncio.to_thread(aClient.session.request, method, url, auth=auth,
+                                                 headers=headers, data=data, verify=verify)
+                aClient.metrics.Record(method, result, time.perf_counter() - start)
+                return result
+            headers = dict(headers or {})
+            auth = None
+            # Same as BearerAuth, otherwise Username/Token auth
+            if use_bearer:
+                headers["authorization"] = "Bearer " + aClient.jatoken
+            else:
+                auth = aiohttp.BasicAuth(v1auth[0] or "", v1auth[1] or "")
+            start = time.perf_counter()
+            async with self._session.request(method, url, headers=headers, data=data, auth=auth,
+                                             ssl=None if verify else False) as response:
+                result = AsyncResponse(response.status, response.headers, await response.read())
+            aClient.metrics.Record(method, result, time.perf_counter() - start)
+            return result
+
+    async def Patch(self, header, paramData, verify_flag, use_bearer, url=None):
+        """ PATCH to the instance.  See common.PatchToJiraAlign.
+        """
+        response = await self._Request('PATCH', url, use_bearer, (self.client.username, self.client.jatoken),
+                                       headers=header, data=json.dumps(paramData), verify=verify_flag)
+        await asyncio.to_thread(self.client._NoteWrite)
+        return response
+
+    async def Post(self, header, paramData, verify_flag, use_bearer, url=None):
+        """ POST to the instance.  See common.PostToJiraAlign.
+        """
+        response = await self._Request('POST', url, use_bearer, (self.client.username, self.client.jatoken),
+                                       headers=header, data=json.dumps(paramData), verify=verify_flag)
+        await asyncio.to_thread(self.client._NoteWrite)
+        return response
+
+    async def Get(self, use_bearer, url=None, header=None):
+        """ GET from the instance.  See common.GetFromJiraAlign.
+        """
+        return await self._Request('GET', url, use_bearer, (self.client.usernamev1, self.client.jatokenv1),
+                                   headers=header)
+
+    async def ReadAllItems(self, which, maxToRead, filterOnProgramID=None):
+        """ Read in all items of the given type.  See common.ReadAllItems.
+
+            After the first page, PAGES_IN_FLIGHT pages are asked for at once.  Reference
+            endpoints that are cached (see cache.TTL) go through the sync client, so they
+            share its cache.
+        """
+        aClient = self.client
+        if aClient.useCache and (filterOnProgramID is None) and cache.IsCacheable(which):
+            return await asyncio.to_thread(aClient.ReadAllItems, which, maxToRead, filterOnProgramID)
+
+        print("Collecting up to " + str(maxToRead) + " items of type " + which + "...")
+        itemArr = []
+        line_count = 0
+        skip = 0
+        pages = [await self.Get(True, aClient.ItemsUrl(which, filterOnProgramID))]
+        while pages:
+            done = False
+            for response in pages:
+                Data = response.json()
+                if Data is None:
+                    done = True
+                    break
+                for eachWorkItem in Data:
+                    if not common.KeepItem(eachWorkItem, filterOnProgramID):
+                        continue
+                    line_count += 1
+                    thisItem = {}
+                    common.ExtractItemData(which, eachWorkItem, thisItem)
+                    itemArr.append(thisItem)
+                skip += client.PAGE_SIZE
+                # Stop at the last page, or once we have as many as requested (or more)
+                if (len(Data) < client.PAGE_SIZE) or (len(itemArr) >= maxToRead):
+                    done = True
+                    break
+            if done:
+                break
+            pages = await asyncio.gather(*[self.Get(True, aClient.ItemsUrl(which, filterOnProgramID, skip + n * client.PAGE_SIZE))
+                                           for n in range(PAGES_IN_FLIGHT)])
+
+        print('Loaded ' + str(line_count) + " items of type " + which)
+        return itemArr
+
+# Async client for the default client, made when first needed, and the ones it replaced
+# that haven't been closed yet
+_default = None
+_replaced = []
+_defaultLock = threading.Lock()
+
+def GetDefault():
+    """ Return the async client for client.GetDefault(), creating it if needed.
+    """
+    global _default
+    with _defaultLock:
+        aClient = client.GetDefault()
+        if (_default is None) or (_default.client is not aClient):
+            if _default is not None:
+                _replaced.append(_default)
+            _default = AsyncJiraAlignClient(aClient)
+        return _default
+
+async def CloseDefault():
+    """ Close the default async client's connections (and those of any it replaced).
+        Call it before the event loop ends, e.g. at the end of the coroutine passed to
+        asyncio.run, or use "async with DefaultClient():".
+    """
+    global _default
+    with _defaultLock:
+        toClose = _replaced[:] + ([_default] if _default is not None else [])
+        del _replaced[:]
+        _default = None
+    for asyncClient in toClose:
+        await asyncClient.Close()
+
+class DefaultClient:
+    """ async with DefaultClient() as asyncClient: ... gives the default async client and
+        closes it at the end of the block.
+    """
+    async def __aenter__(self):
+        return GetDefault()
+
+    async def __aexit__(self, *exc):
+        await CloseDefault()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+#
+# cache.py
+#
+# On-disk cache for slow-changing reference endpoints (programs, releases, cities, etc.).
+# Entries are keyed by instance URL and endpoint, expire after a per-endpoint TTL, and keep the
+# ETag of the first page so an expired entry can be revalidated with If-None-Match instead of
+# being read in again.
+#
+# Run this file directly to clear the cache:  python cache.py [endpoint ...]
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import fastjson
+
+# Set to False to always read from Jira Align
+ENABLED = True
+
+# Where the cache files are kept
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".jiraaligntools", "cache")
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Time to live, in seconds, for each cacheable endpoint (lowercase).  Anything not listed
+# here is never cached.
+TTL = {
+    # The Jira Align version number, from the About page
+    '_version': DAY,
+    'programs': DAY,
+    'releases': DAY,
+    'releasevehicles': DAY,
+    'products': DAY,
+    'teams': DAY,
+    'iterations': 4 * HOUR,
+    'anchorsprints': DAY,
+    'regions': 7 * DAY,
+    'cities': 7 * DAY,
+    'costcenters': 7 * DAY,
+    'divisions': 7 * DAY,
+    'domains': 7 * DAY,
+    'customers': 7 * DAY,
+    'customhierarchies': 7 * DAY,
+    'workcodes': 7 * DAY,
+    'valuestreams': DAY,
+    'portfolios': DAY,
+    'snapshots': DAY,
+    'gridconfigurations/capability/columnconfigurations': 7 * DAY,
+    'gridconfigurations/dependency/columnconfigurations': 7 * DAY,
+    'gridconfigurations/epic/columnconfigurations': 7 * DAY,
+    'gridconfigurations/feature/columnconfigurations': 7 * DAY,
+    'gridconfigurations/theme/columnconfigurations': 7 * DAY,
+}
+
+def IsCacheable(which):
+    """ True if results for the given endpoint may be kept in the cache.
+    """
+    return ENABLED and (which.lower() in TTL)
+
+def _PathFor(instance, which):
+    key = hashlib.sha1((instance + "|" + which.lower()).encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, key + ".json")
+
+def Lookup(instance, which):
+    """ Return the cache entry for the given instance and endpoint, whether or not it
+        has expired, or None if there isn't one (or it can't be read).
+
+    Args:
+        instance: The instance URL the data was read from (cfg.instanceurl)
+        which: The endpoint, e.g. programs
+
+    Returns:
+        dict with the keys: instance, endpoint, savedAt, etag, complete, items
+    """
+    path = _PathFor(instance, which)
+    try:
+        with open(path, 'r', encoding='utf-8') as infile:
+            entry = fastjson.Load(infile)
+    except (OSError, ValueError):
+        return None
+    # Guard against a hash collision or a hand edited file
+    if (entry.get('instance') != instance) or (entry.get('endpoint') != which.lower()):
+        return None
+    return entry
+
+def IsFresh(entry):
+    """ True if the entry is still within the TTL for its endpoint.
+    """
+    ttl = TTL.get(entry['endpoint'], 0)
+    return (time.time() - entry['savedAt']) < ttl
+
+def Covers(entry, maxToRead):
+    """ True if the entry holds everything a caller asking for maxToRead items would get.
+    """
+    return entry['complete'] or (len(entry['items']) >= maxToRead)
+
+def Store(instance, which, items, etag=None, complete=True):
+    """ Save the items read from the given instance and endpoint.
+
+    Args:
+        instance: The instance URL the data was read from (cfg.instanceurl)
+        which: The endpoint, e.g. programs
+        items: The extracted items, as returned by ReadAllItems (or any JSON value)
+        etag: The ETag header of the first page, if the server sent one
+        complete: False if the read stopped at maxToRead before the last page
+    """
+    entry = {'instance': instance, 'endpoint': which.lower(), 'savedAt': time.time(),
+             'etag': etag, 'complete': complete, 'items': items}
+    _Write(_PathFor(instance, which), entry)
+
+def Touch(entry):
+    """ Restart the TTL of an entry, after the server has said it is still current.
+    """
+    entry['savedAt'] = time.time()
+    _Write(_PathFor(entry['instance'], entry['endpoint']), entry)
+
+def Invalidate(instance=None, which=None):
+    """ Remove entries from the cache.  With no arguments, everything is removed.
+
+    Args:
+        instance: Only remove entries for this instance URL
+        which: Only remove entries for this endpoint
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+    if (instance is not None) and (which is not None):
+        paths = [_PathFor(instance, which)]
+    else:
+        paths = [os.path.join(CACHE_DIR, f) for f in os.listdir(CACHE_DIR) if f.endswith(".json")]
+    for path in paths:
+        if (instance is not None) or (which is not None):
+            try:
+                with open(path, 'r', encoding='utf-8') as infile:
+                    entry = fastjson.Load(infile)
+            except (OSError, ValueError):
+                entry = {}
+            if (instance is not None) and (entry.get('instance') != instance):
+                continue
+            if (which is not None) and (entry.get('endpoint') != which.lower()):
+                continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _Write(path, entry):
+    # Write to a temp file and rename, so a reader never sees a partial entry
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as outfile:
+            fastjson.Dump(entry, outfile)
+        os.replace(tmpPath, path)
+    except OSError:
+        try:
+            os.remove(tmpPath)
+        except OSError:
+            pass
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for endpoint in sys.argv[1:]:
+            Invalidate(which=endpoint)
+    else:
+        Invalidate()
+    print("Cache cleared: " + CACHE_DIR)
@@ -4,6 +4,7 @@ I use this file to act as a shared area for functions as well as shared global v
 """
 
 import requests
+import sanitize
 
 def init():
     global apiendpoint
@@ -15,6 +16,14 @@ def init():
     global jaVersion
 
 
+# jaVersion is looked up lazily: until something assigns it, reading cfg.jaVersion asks
+# the default client, which detects the version the first time and caches it.
+def __getattr__(name):
+    if name == 'jaVersion':
+        import client
+        return client.GetDefault().GetVersion()
+    raise AttributeError("module 'cfg' has no attribute '" + name + "'")
+
 # Be sure to create a creds.py file in this same directory, defining jatoken and username
 # See readme for more details.
 
@@ -43,8 +52,7 @@ def ReplaceStrings(txt,remove,replace):
 def RemoveEOLChar(txteol):
     if txteol:
         #print(txteol)
-        txteol = txteol.replace('\r','')
-        txteol = txteol.replace('\n','')
+        txteol = sanitize.RemoveEOL(txteol)
         #print(txteol)
     return txteol
 #_______________________________________________________________________________
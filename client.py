@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+#
+# client.py
+#
+# JiraAlignClient owns everything needed to talk to one Jira Align instance: the base URLs,
+# the credentials, a pooled HTTP session, the reference data cache and request metrics.
+# Nothing in it is a module global, so several clients (e.g. test and prod) can be used at
+# once, from as many threads as needed.  The functions in common.py are thin wrappers over
+# the default client that CollectApiInfo sets up.
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import cache
+import cfg
+import common
+import creds
+import fastjson
+import requests
+
+# Number of items Jira Align returns per page
+PAGE_SIZE = 100
+# Number of IDs to ask for in each "id in (...)" query made by ReadManyItems
+IDS_PER_QUERY = 100
+# Statuses that mean an endpoint can't do "id in (...)" queries, so single reads are used instead
+NO_ID_FILTER_STATUSES = (400, 501)
+# Number of times to try an "id in (...)" query that fails with any other status
+ID_QUERY_ATTEMPTS = 3
+# Number of single item GETs to have in flight at once when an endpoint can't filter on id
+MAX_PARALLEL_READS = 8
+# Number of connectors to read from at once
+MAX_PARALLEL_CONNECTORS = 4
+# Maximum number of records to read in per connector endpoint
+MAX_CONNECTOR_ITEMS = 100000
+# Connector each endpoint was read from before the connectors were listed, used if the list
+# can't be read: TeamMappings came from connector 2, everything else from connector 1
+FALLBACK_CONNECTORS = {'TeamMappings': 2}
+FALLBACK_CONNECTOR = 1
+# Size of the HTTP connection pool, so that thread pools don't wait on connections
+POOL_SIZE = 32
+# Default limit on requests started per second, per client.  None means no limit.
+MAX_REQUESTS_PER_SECOND = None
+
+class RateLimiter:
+    """ Spaces requests out so that no more than the given number start each second,
+        across all the threads using it.  A limit of None (or 0) means no limit.
+    """
+    def __init__(self, perSecond=None):
+        self.interval = (1.0 / perSecond) if perSecond else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def Reserve(self):
+        """ Claim the next request slot, and return how many seconds to wait for it.
+        """
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        return start - now
+
+    def Wait(self):
+        delay = self.Reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+class Metrics:
+    """ Thread safe counters of the requests a client has made.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytesReceived = 0
+        self.seconds = 0.0
+        self.byMethod = {}
+
+    def Record(self, method, response, seconds):
+        with self._lock:
+            self.requests += 1
+            self.seconds += seconds
+            self.byMethod[method] = self.byMethod.get(method, 0) + 1
+            if response.status_code >= 400:
+                self.errors += 1
+            self.bytesReceived += len(response.content or b'')
+
+    def Summary(self):
+        with self._lock:
+            return (str(self.requests) + " requests (" +
+                    ", ".join(m + "=" + str(n) for m, n in sorted(self.byMethod.items())) + "), " +
+                    str(self.errors) + " errors, " + str(self.bytesReceived) + " bytes, " +
+                    "%.1f" % self.seconds + " seconds")
+
+class JiraAlignClient:
+    """ Client for one Jira Align instance.
+
+    Args:
+        baseUrl: The instance URL, e.g. https://foo.jiraalign.com
+        jatoken: The API 2 bearer token.  Defaults to creds.jatoken.
+        usernamev1: The API 1 user name.  Defaults to creds.usernamev1.
+        jatokenv1: The API 1 token.  Defaults to creds.jatokenv1.
+        name: A short name for the instance, used in messages (e.g. test or prod)
+        useCache: If False, the on-disk reference data cache is not used
+        maxRequestsPerSecond: Limit on requests started per second against this instance
+    """
+    def __init__(self, baseUrl, jatoken=None, usernamev1=None, jatokenv1=None, name=None, useCache=True,
+                 maxRequestsPerSecond=MAX_REQUESTS_PER_SECOND):
+        parsed = urlparse(baseUrl)
+        self.baseUrl = parsed.scheme + "://" + parsed.netloc
+        self.name = name or parsed.netloc
+        self.instanceurl = self.baseUrl + "/rest/align/api/2"
+        self.api1instance = self.baseUrl + "/api"
+        self.abouturl = self.baseUrl + "/About"
+        self.jatoken = jatoken if jatoken is not None else creds.jatoken
+        self.usernamev1 = usernamev1 if usernamev1 is not None else creds.usernamev1
+        self.jatokenv1 = jatokenv1 if jatokenv1 is not None else creds.jatokenv1
+        # Only used for PATCH/POST without the bearer token
+        self.username = getattr(creds, 'username', None)
+        self.useCache = useCache
+        self.metrics = Metrics()
+        self.limiter = RateLimiter(maxRequestsPerSecond)
+        # Jira Align version number, detected in the background when first needed
+        self._version = None
+        self._versionFuture = None
+        self._versionLock = threading.Lock()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Endpoints that have rejected an "id in (...)" filter, so ReadManyItems doesn't keep trying
+        self._noIdFilter = set()
+
+    #___________________________________________________________________________
+    # Requests
+
+    def _Request(self, method, url, use_bearer, v1auth, **kwargs):
+        if url is None:
+            # Use the default URL
+            url = self.instanceurl
+        if common.DEBUG == True:
+            print(method + " URL: " + url)
+        # If we need to use BearerAuth with Token
+        if use_bearer:
+            auth = cfg.BearerAuth(self.jatoken)
+        # Otherwise, use Username/Token auth
+        else:
+            auth = v1auth
+        self.limiter.Wait()
+        start = time.perf_counter()
+        result = self.session.request(method, url, auth=auth, **kwargs)
+        self.metrics.Record(method, result, time.perf_counter() - start)
+        return result
+
+    def Patch(self, header, paramData, verify_flag, use_bearer, url=None):
+        """ PATCH to the instance.  See common.PatchToJiraAlign.
+        """
+        response = self._Request('PATCH', url, use_bearer, (self.username, self.jatoken),
+                                 data=json.dumps(paramData), headers=header, verify=verify_flag)
+        self._NoteWrite()
+        return response
+
+    def Post(self, header, paramData, verify_flag, use_bearer, url=None):
+        """ POST to the instance.  See common.PostToJiraAlign.
+        """
+        response = self._Request('POST', url, use_bearer, (self.username, self.jatoken),
+                                 data=json.dumps(paramData), headers=header, verify=verify_flag)
+        self._NoteWrite()
+        return response
+
+    def _NoteWrite(self):
+        # A daemon serving this instance must not keep handing out items as they were
+        import daemon
+        daemon.NoteWrite(self.instanceurl)
+
+    def Get(self, use_bearer, url=None, header=None):
+        """ GET from the instance.  See common.GetFromJiraAlign.
+        """
+        return self._Request('GET', url, use_bearer, (self.usernamev1, self.jatokenv1),
+                             headers=header)
+
+    def DetectVersion(self):
+        """ Get the About page from Jira Align, and parse out the Jira Align version number from it.
+            The result is kept in the on-disk cache (see cache.TTL['_version']), so the page
+            is only read once a day per instance.
+
+        Returns:
+            The version string, or None if the page doesn't have it (e.g. an SSO login page)
+        """
+        if self.useCache and cache.IsCacheable('_version'):
+            entry = cache.Lookup(self.instanceurl, '_version')
+            if (entry is not None) and cache.IsFresh(entry):
+                return entry['items']
+        aboutInfo = self.Get(False, self.abouturl)
+        if common.DEBUG == True:
+            print(aboutInfo.text)
+        version = ParseVersion(aboutInfo.text)
+        if version is None:
+            print("Could not find the Jira Align version number on " + self.abouturl)
+        elif self.useCache and cache.IsCacheable('_version'):
+            cache.Store(self.instanceurl, '_version', version)
+        return version
+
+    def StartVersionDetection(self):
+        """ Start detecting the Jira Align version in a background thread, so that it runs
+            alongside the first data requests instead of before them.
+        """
+        with self._versionLock:
+            if (self._version is not None) or (self._versionFuture is not None):
+                return
+            future = Future()
+            self._versionFuture = future
+        def Run():
+            try:
+                future.set_result(self.DetectVersion())
+            except Exception as e:
+                future.set_exception(e)
+        threading.Thread(target=Run, daemon=True).start()
+
+    def GetVersion(self):
+        """ Return the Jira Align version number, detecting it the first time it is needed
+            (or waiting for the detection StartVersionDetection began).
+        """
+        self.StartVersionDetection()
+        with self._versionLock:
+            if self._version is not None:
+                return self._version
+            future = self._versionFuture
+        try:
+            version = future.result()
+        except Exception as e:
+            print("Could not read the Jira Align version number: " + str(e))
+            version = None
+        with self._versionLock:
+            self._version = version
+        return version
+
+    @property
+    def jaVersion(self):
+        return self.GetVersion()
+
+    #___________________________________________________________________________
+    # Paging
+
+    def ItemsUrl(self, which, filterOnProgramID=None, skip=0):
+        """ Build the URL for one page of the given endpoint.  See common.ItemsUrl.
+        """
+        if filterOnProgramID is None:
+            if skip == 0:
+                return self.instanceurl + "/" + which + "?expand=true"
+            return self.instanceurl + "/" + which + "?&$skip=" + str(skip)
+        # Optimize the call by having Jira Align do the filtering
+        fullUrl = self.instanceurl + "/" + which + "?expand=true&%24filter=programId%20eq%20" + str(filterOnProgramID)
+        if skip != 0:
+            fullUrl = fullUrl + "&$skip=" + str(skip)
+        return fullUrl
+
+    def ReadPages(self, which, filterOnProgramID=None, firstPage=None):
+        """ Generator yielding each page of the given endpoint.  See common.ReadPages.
+        """
+        Data = firstPage
+        if Data is None:
+            Data = fastjson.ResponseJson(self.Get(True, self.ItemsUrl(which, filterOnProgramID)))
+        # Starting point for skipping is to go to the next 100..
+        skip = PAGE_SIZE
+        while Data != None:
+            yield Data
+            # If we got all the items, then there is nothing more to get
+            if len(Data) < PAGE_SIZE:
+                return
+            # Otherwise, there are more items to get, so get the next 100
+            Data = fastjson.ResponseJson(self.Get(True, self.ItemsUrl(which, filterOnProgramID, skip)))
+            skip += PAGE_SIZE
+
+    #___________________________________________________________________________
+    # Work items
+
+    def ReadAllItems(self, which, maxToRead, filterOnProgramID=None):
+        """ Read in all items of the given type.  See common.ReadAllItems.
+        """
+        # Only unfiltered reads of reference endpoints are cached
+        useCache = self.useCache and (filterOnProgramID is None) and cache.IsCacheable(which)
+        entry = None
+        if useCache:
+            entry = cache.Lookup(self.instanceurl, which)
+            if (entry is not None) and not cache.Covers(entry, maxToRead):
+                entry = None
+            if (entry is not None) and cache.IsFresh(entry):
+                print('Loaded ' + str(len(entry['items'])) + " items of type " + which + " from the cache")
+                return entry['items']
+
+        print("Collecting up to " + str(maxToRead) + " items of type " + which + "...")
+        itemArr = []
+
+        # Get the first set of data, which may be everything or may not be.
+        # If we have an expired cache entry, ask the server whether it has changed.
+        header = None
+        if (entry is not None) and entry['etag']:
+            header = {'If-None-Match': entry['etag']}
+        items = self.Get(True, self.ItemsUrl(which, filterOnProgramID), header)
+        if (entry is not None) and (items.status_code == 304):
+            cache.Touch(entry)
+            print('Loaded ' + str(len(entry['items'])) + " items of type " + which + " from the cache (not modified)")
+            return entry['items']
+        etag = items.headers.get('ETag')
+        line_count = 0
+        pages = 0
+        complete = False
+
+        for Data in self.ReadPages(which, filterOnProgramID, fastjson.ResponseJson(items)):
+            pages += 1
+            for eachWorkItem in Data:
+                if not common.KeepItem(eachWorkItem, filterOnProgramID):
+                    continue
+                line_count += 1
+                thisItem = {}
+                common.ExtractItemData(which, eachWorkItem, thisItem)
+                itemArr.append(thisItem)
+
+            # If we got all the items, the return what we have
+            if len(Data) < PAGE_SIZE:
+                complete = True
+                break
+            # If we have read in as many as request (or more) then return
+            if len(itemArr) >= maxToRead:
+                break
+
+        print('Loaded ' + str(line_count) + " items of type " + which)
+        if useCache:
+            # The ETag only vouches for the first page, so it is only kept (and a 304 only
+            # trusted next time) when that page was everything; bigger endpoints are read
+            # again in full once their entry expires
+            if not (complete and pages == 1):
+                etag = None
+            cache.Store(self.instanceurl, which, itemArr, etag, complete)
+        return itemArr
+
+    def StreamItems(self, which, maxToRead=None, filterOnProgramID=None):
+        """ Generator yielding the extracted items of the given type as each page arrives.
+            See common.StreamItems.
+        """
+        count = 0
+        for Data in self.ReadPages(which, filterOnProgramID):
+            for eachWorkItem in Data:
+                if not common.KeepItem(eachWorkItem, filterOnProgramID):
+                    continue
+                count += 1
+                thisItem = {}
+                common.ExtractItemData(which, eachWorkItem, thisItem)
+                yield thisItem
+            # If we have read in as many as request (or more) then stop
+            if (maxToRead is not None) and (count >= maxToRead):
+                return
+
+    def ReadOneItem(self, which, idToFind):
+        """ Read in one item of the given type.  See common.ReadOneItem.
+        """
+        print("Reading item of type " + which + " with ID=" + str(idToFind) + "...")
+        itemArr = []
+        fullUrl = self.instanceurl + "/" + which + "/" + str(idToFind)
+        items = self.Get(True, fullUrl)
+        eachWorkItem = fastjson.ResponseJson(items)
+        thisItem = {}
+        common.ExtractItemData(which, eachWorkItem, thisItem)
+        itemArr.append(thisItem)
+
+        print('Loaded ' + which + "/" + str(idToFind))
+        return itemArr
+
+    def ReadManyItems(self, which, ids):
+        """ Read in the items of the given type with the given IDs.  See common.ReadManyItems.
+        """
+        # Remove duplicates but keep the caller's order
+        idList = list(dict.fromkeys(int(x) for x in ids))
+        print("Reading " + str(len(idList)) + " items of type " + which + "...")
+        itemDict = {}
+        # IDs an "id in (...)" query didn't return, to be read one at a time
+        missing = []
+
+        pos = 0
+        while (pos < len(idList)) and (which not in self._noIdFilter):
+            chunk = idList[pos:pos + IDS_PER_QUERY]
+            fullUrl = self.instanceurl + "/" + which + "?expand=true&%24filter=id%20in%20(" + \
+                      ",".join(str(x) for x in chunk) + ")"
+            for attempt in range(ID_QUERY_ATTEMPTS):
+                items = self.Get(True, fullUrl)
+                if (items.status_code == 200) or (items.status_code in NO_ID_FILTER_STATUSES):
+                    break
+                # Anything else (rate limiting, a server error) may pass, so wait and try again
+                if attempt + 1 < ID_QUERY_ATTEMPTS:
+                    time.sleep(2 ** attempt)
+            if items.status_code in NO_ID_FILTER_STATUSES:
+                # This endpoint can't do it, so fall back to single reads for the rest
+                if common.DEBUG == True:
+                    print("id filter not supported for " + which + ": " + str(items.status_code))
+                self._noIdFilter.add(which)
+                break
+            if items.status_code != 200:
+                raise RuntimeError("Could not read items of type " + which + ": " + str(items.status_code) +
+                                   " " + items.text)
+            Data = fastjson.ResponseJson(items)
+            if not isinstance(Data, list):
+                # The filter was ignored (a single item came back), so read them one at a time
+                self._noIdFilter.add(which)
+                break
+            # Only keep the items asked for; an ID that didn't come back is read on its own
+            wanted = set(chunk)
+            answered = set()
+            for eachWorkItem in Data:
+                if (not isinstance(eachWorkItem, dict)) or (eachWorkItem.get('id') not in wanted):
+                    continue
+                answered.add(eachWorkItem['id'])
+                if not common.KeepItem(eachWorkItem):
+                    continue
+                thisItem = {}
+                common.ExtractItemData(which, eachWorkItem, thisItem)
+                itemDict[thisItem['id']] = thisItem
+            pos += len(chunk)
+            missing.extend(id for id in chunk if id not in answered)
+            if Data and not answered:
+                # Items came back, but none of the ones asked for: the filter was ignored
+                if common.DEBUG == True:
+                    print("id filter ignored for " + which)
+                self._noIdFilter.add(which)
+
+        # Anything left over is read one at a time, in parallel
+        remaining = missing + idList[pos:]
+        if remaining:
+            def ReadSingle(idToFind):
+                fullUrl = self.instanceurl + "/" + which + "/" + str(idToFind)
+                response = self.Get(True, fullUrl)
+                if response.status_code != 200:
+                    return None
+                eachWorkItem = fastjson.ResponseJson(response)
+                if not common.KeepItem(eachWorkItem):
+                    return None
+                thisItem = {}
+                common.ExtractItemData(which, eachWorkItem, thisItem)
+                return thisItem
+            with ThreadPoolExecutor(max_workers=MAX_PARALLEL_READS) as pool:
+                for thisItem in pool.map(ReadSingle, remaining):
+                    if thisItem is not None:
+                        itemDict[thisItem['id']] = thisItem
+
+        print('Loaded ' + str(len(itemDict)) + " of " + str(len(idList)) + " items of type " + which)
+        return itemDict
+
+    #___________________________________________________________________________
+    # Connectors
+
+    def GetAllConnectorIds(self, fallbackId=FALLBACK_CONNECTOR):
+        """ Get the ID numbers of all the Jira connectors.  See common.GetAllConnectorIds.
+        """
+        connectors = self.Get(True, self.instanceurl + "/connectors")
+        if connectors.status_code != 200:
+            print("WARNING: Could not read the list of connectors (" + str(connectors.status_code) +
+                  "), using connector " + str(fallbackId) + " only")
+            return [fallbackId]
+        dataConnector = fastjson.ResponseJson(connectors)
+        if isinstance(dataConnector, dict):
+            dataConnector = [dataConnector]
+        return sorted(eachConnector['id'] for eachConnector in dataConnector)
+
+    def ReadAllConnectorItems(self, endpoint, extract, maxToRead=MAX_CONNECTOR_ITEMS):
+        """ Read the given endpoint from every connector.  See common.ReadAllConnectorItems.
+        """
+        def ReadConnector(connectorId):
+            itemArr = []
+            for Data in self.ReadPages("connectors/" + str(connectorId) + "/" + endpoint):
+                for eachItem in Data:
+                    itemArr.append(extract(eachItem))
+                if len(itemArr) >= maxToRead:
+                    break
+            return itemArr
+
+        connectorIds = self.GetAllConnectorIds(FALLBACK_CONNECTORS.get(endpoint, FALLBACK_CONNECTOR))
+        allItems = []
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_CONNECTORS) as pool:
+            for itemArr in pool.map(ReadConnector, connectorIds):
+                allItems.extend(itemArr)
+        return allItems
+
+def ParseVersion(aboutText):
+    """ Parse the Jira Align version number out of the About page HTML, which has it in a
+        data-version attribute, e.g. data-version="10.123.4.5678".
+
+    Returns:
+        The version string, or None if there isn't one.
+    """
+    match = re.search(r"""data-version\s*=\s*["']?([^"'\s>]+)""", aboutText or "")
+    if match is None:
+        return None
+    return match.group(1)
+
+def FromProfile(name):
+    """ Create a client for one of the instance profiles defined in creds.profiles.
+
+        Each profile is a dict with the key url, and optionally jatoken, usernamev1,
+        jatokenv1 and maxRequestsPerSecond.  Anything missing comes from creds/defaults.
+    """
+    profiles = getattr(creds, 'profiles', {})
+    if name not in profiles:
+        raise KeyError("No profile named " + name + " in creds.profiles")
+    profile = profiles[name]
+    return JiraAlignClient(profile['url'],
+                           jatoken=profile.get('jatoken'),
+                           usernamev1=profile.get('usernamev1'),
+                           jatokenv1=profile.get('jatokenv1'),
+                           name=name,
+                           maxRequestsPerSecond=profile.get('maxRequestsPerSecond', MAX_REQUESTS_PER_SECOND))
+
+# The client that the common.py wrappers use
+_default = None
+_defaultLock = threading.Lock()
+
+def GetDefault():
+    """ Return the default client.  If CollectApiInfo hasn't set one up yet, one is created
+        from cfg.instanceurl.
+    """
+    global _default
+    with _defaultLock:
+        if _default is None:
+            _default = JiraAlignClient(cfg.instanceurl)
+        return _default
+
+def SetDefault(aClient):
+    """ Make the given client the one the common.py wrappers use.
+    """
+    global _default
+    with _defaultLock:
+        _default = aClient
@@ -7,11 +7,14 @@
 import json
 import time
 import csv
-from urllib.parse import urlparse
 
 import cfg
-import creds
-import requests
+import asyncclient
+import client
+import daemon
+import fastjson
+import partition
+import sanitize
 
 # Set to True to see additional debug info on exact URLs used
 DEBUG = False
@@ -33,28 +36,7 @@ def PatchToJiraAlign(header, paramData, verify_flag, use_bearer, url = None):
     Returns:
         Response
     """
-    if url is None:
-        # Use the default URL
-        url_to_use = cfg.instanceurl
-    else:
-        # Use the given URL
-        url_to_use = url
-    if DEBUG == True:
-        print("Headers: " + header)
-        print("Data: " + paramData)
-        print("URL: " + url_to_use)
-    # If we need to use BearerAuth with Token
-    if use_bearer:
-        result = requests.patch(url = url_to_use, data=json.dumps(paramData),
-                               headers=header, 
-                               verify=verify_flag, 
-                               auth=cfg.BearerAuth(creds.jatoken))
-    # Otherwise, use Username/Token auth
-    else:
-        result = requests.patch(url = url_to_use, data=json.dumps(paramData),
-                               headers=header, verify=verify_flag, 
-                               auth=(creds.username, creds.jatoken))
-    return result
+    return client.GetDefault().Patch(header, paramData, verify_flag, use_bearer, url)
 
 def PostToJiraAlign(header, paramData, verify_flag, use_bearer, url = None):
     """Generic method to do a POST to the Jira Align instance, with the specified parameters, and return
@@ -70,55 +52,46 @@ def PostToJiraAlign(header, paramData, verify_flag, use_bearer, url = None):
     Returns:
         Response
     """
-    if url is None:
-        # Use the default URL
-        url_to_use = cfg.instanceurl
-    else:
-        # Use the given URL
-        url_to_use = url
-    if DEBUG == True:
-        print("URL: " + url_to_use)
-    # If we need to use BearerAuth with Token
-    if use_bearer:
-        result = requests.post(url = url_to_use, data=json.dumps(paramData), 
-                               headers=header, verify=verify_flag, 
-                               auth=cfg.BearerAuth(creds.jatoken))
-    # Otherwise, use Username/Token auth
-    else:
-        result = requests.post(url = url_to_use, data=json.dumps(paramData), 
-                               headers=header, verify=verify_flag, 
-                               auth=(creds.username, creds.jatoken))
-    return result
+    return client.GetDefault().Post(header, paramData, verify_flag, use_bearer, url)
 
-def GetFromJiraAlign(use_bearer, url = None):
+def GetFromJiraAlign(use_bearer, url = None, header = None):
     """Generic method to do a GET to the Jira Align instance, with the specified parameters, and return
         the result of the GET call.
 
     Args:
         use_bearer (bool): If True, use the BearerAuth token, else use username/token.
         url (string): The URL to use for the GET.  If None, use the default instance + API end point variables defined
+        header: Optional extra HTTP headers to send, e.g. If-None-Match
 
     Returns:
         Response
     """
-    if url is None:
-        # Use the default URL
-        url_to_use = cfg.instanceurl
-    else:
-        # Use the given URL
-        url_to_use = url
-    if DEBUG == True:
-        print("URL: " + url_to_use)
+    return client.GetDefault().Get(use_bearer, url, header)
 
-    # If we need to use BearerAuth with Token
-    if use_bearer:
-        result = requests.get(url = url_to_use, auth=cfg.BearerAuth(creds.jatoken))
-    # Otherwise, use Username/Token auth
-    else:
-        result = requests.get(url = url_to_use, auth=(creds.usernamev1, creds.jatokenv1))
-    return result
+# Async versions of the above, for use with asyncio.  They share the default client's
+# credentials, rate limit and metrics.  See asyncclient.py.
+
+async def PatchToJiraAlignAsync(header, paramData, verify_flag, use_bearer, url = None):
+    """ Same as PatchToJiraAlign, for use with await.
+    """
+    return await asyncclient.GetDefault().Patch(header, paramData, verify_flag, use_bearer, url)
+
+async def PostToJiraAlignAsync(header, paramData, verify_flag, use_bearer, url = None):
+    """ Same as PostToJiraAlign, for use with await.
+    """
+    return await asyncclient.GetDefault().Post(header, paramData, verify_flag, use_bearer, url)
+
+async def GetFromJiraAlignAsync(use_bearer, url = None, header = None):
+    """ Same as GetFromJiraAlign, for use with await.
+    """
+    return await asyncclient.GetDefault().Get(use_bearer, url, header)
+
+async def CloseAsync():
+    """ Close the connections the async versions above opened.  Call it before the event
+        loop ends, e.g. at the end of the coroutine passed to asyncio.run.
+    """
+    await asyncclient.CloseDefault()
 
-# This collects instance details like the url and the endpoint you want to target
 def CollectApiInfo():
     print("Instance URL is normally something like:  https://foo.jiraalign.com")
     print("API Endpoint is normally: /")
@@ -134,22 +107,18 @@ def CollectApiInfo():
         if (ChkInput == "N") or (ChkInput == "n"):
             CollectApiInfo()
 
-    cfg.abouturl = cfg.instanceurl + "/About"
-    cfg.instanceurl = cfg.instanceurl + "/rest/align/api/2" ##### Mess with these couple of lines, and break all of the other defs! 
+    # The client owns the URLs; the cfg copies are kept for scripts that still use them
+    aClient = client.JiraAlignClient(cfg.instanceurl)
+    client.SetDefault(aClient)
+    cfg.abouturl = aClient.abouturl
+    cfg.instanceurl = aClient.instanceurl
     cfg.apiendpoint = "/" + cfg.apiendpoint.lower()
-    cfg.api1instance = urlparse(cfg.instanceurl)
-    cfg.api1instance = cfg.api1instance.scheme + "://" + cfg.api1instance.netloc
-    cfg.api1instance = cfg.api1instance + "/api"
+    cfg.api1instance = aClient.api1instance
     print(cfg.instanceurl, cfg.api1instance)
 
-    # Get the About page from Jira Align, and parse out the Jira Align version number from it
-    aboutInfo = GetFromJiraAlign(False, cfg.abouturl)
-    if DEBUG == True:
-        print(aboutInfo.text)
-    # This assumes a specific format/length of the JA version and won't work for SSO in most cases
-    start = aboutInfo.text.find("data-version") + 14
-    end = start + 14
-    cfg.jaVersion = aboutInfo.text[start:end]
+    # The version number is only needed by some scripts, so don't wait for it here.
+    # cfg.jaVersion is filled in from the client the first time it is used.
+    aClient.StartVersionDetection()
     
     return cfg.instanceurl, cfg.apiendpoint, cfg.api1instance
 
@@ -161,8 +130,8 @@ def GetAllCountries():
     """
     countryArr = []
     print("Collecting all Country info...")
-    countries = GetFromJiraAlign(True, cfg.instanceurl + "/countries")
-    dataCountry = countries.json()
+    countries = GetFromJiraAlign(True, client.GetDefault().instanceurl + "/countries")
+    dataCountry = fastjson.ResponseJson(countries)
     for eachCountry in dataCountry:
         itemDict = {}
         itemDict['id'] = eachCountry['id']
@@ -173,95 +142,134 @@ def GetAllCountries():
         countryArr.append(itemDict)
     return countryArr
 
+def GetAllConnectorIds(fallbackId=1):
+    """ Get the ID numbers of all the Jira connectors defined in the instance.
+
+        Returns: List of connector IDs.  If the list can't be read, a warning is printed
+        and [fallbackId] is returned.  ReadAllConnectorItems passes the connector each
+        endpoint used to be read from (see client.FALLBACK_CONNECTORS).
+    """
+    return client.GetDefault().GetAllConnectorIds(fallbackId)
+
+def ReadAllConnectorItems(endpoint, extract, maxToRead=None):
+    """ Read the given endpoint from every connector, paging through each one, with the
+        connectors read in parallel.
+
+    Args:
+        endpoint: The endpoint under connectors/<id>/, e.g. boards or TeamMappings
+        extract: Function that takes a raw item and returns the dict to keep
+        maxToRead: Maximum number of entries to read in per connector.  If None, use
+                   client.MAX_CONNECTOR_ITEMS.
+
+    Returns:
+        List of the extracted items for all connectors, in connector ID order.
+    """
+    if maxToRead is None:
+        maxToRead = client.MAX_CONNECTOR_ITEMS
+    return client.GetDefault().ReadAllConnectorItems(endpoint, extract, maxToRead)
+
+def ExtractBoardData(eachBoard):
+    """ Return the fields to save from a raw connector board.
+    """
+    itemDict = {}
+    itemDict['id'] = eachBoard['id']
+    itemDict['areSprintsEnabled'] = eachBoard['areSprintsEnabled']
+    itemDict['boardId'] = eachBoard['boardId']
+    itemDict['boardName'] = eachBoard['boardName']
+    itemDict['connectorId'] = eachBoard['connectorId']
+    itemDict['createdBy'] = eachBoard['createdBy']
+    itemDict['createDate'] = eachBoard['createDate']
+    if eachBoard['errorMessage'] is not None:
+        itemDict['errorMessage'] = eachBoard['errorMessage']
+    itemDict['originSprints'] = eachBoard['originSprints']
+    itemDict['programId'] = eachBoard['programId']
+    itemDict['teamId'] = eachBoard['teamId']
+    itemDict['teamName'] = eachBoard['teamName']
+    if eachBoard['lastUpdatedBy'] is not None:
+        itemDict['lastUpdatedBy'] = eachBoard['lastUpdatedBy']
+    if eachBoard['lastUpdatedDate'] is not None:
+        itemDict['lastUpdatedDate'] = eachBoard['lastUpdatedDate']
+    # Don't save the self field, since it will be generated during creation
+    return itemDict
+
 def GetAllConnectorBoards():
-    """ Get all Connector Board information and return to the caller.
+    """ Get all Connector Board information, for every connector, and return to the caller.
 
         Returns: All the details for each connector board in a list of objects.
     """
-    boardArr = []
     print("Collecting all Connector Board info...")
-    boards = GetFromJiraAlign(True, cfg.instanceurl + "/connectors/1/boards")
-    dataBoard = boards.json()
-    for eachBoard in dataBoard:
-        itemDict = {}
-        itemDict['id'] = eachBoard['id']
-        itemDict['areSprintsEnabled'] = eachBoard['areSprintsEnabled']
-        itemDict['boardId'] = eachBoard['boardId']
-        itemDict['boardName'] = eachBoard['boardName']
-        itemDict['connectorId'] = eachBoard['connectorId']
-        itemDict['createdBy'] = eachBoard['createdBy']
-        itemDict['createDate'] = eachBoard['createDate']
-        if eachBoard['errorMessage'] is not None:
-            itemDict['errorMessage'] = eachBoard['errorMessage']
-        itemDict['originSprints'] = eachBoard['originSprints']
-        itemDict['programId'] = eachBoard['programId']
-        itemDict['teamId'] = eachBoard['teamId']
-        itemDict['teamName'] = eachBoard['teamName']
-        if eachBoard['lastUpdatedBy'] is not None:
-            itemDict['lastUpdatedBy'] = eachBoard['lastUpdatedBy']
-        if eachBoard['lastUpdatedDate'] is not None:
-            itemDict['lastUpdatedDate'] = eachBoard['lastUpdatedDate']
-        # Don't save the self field, since it will be generated during creation
-        boardArr.append(itemDict)
-    return boardArr
-    
+    return ReadAllConnectorItems("boards", ExtractBoardData)
+
+def ExtractPriorityData(eachPriority):
+    """ Return the fields to save from a raw connector priority.
+    """
+    itemDict = {}
+    itemDict['id'] = eachPriority['id']
+    itemDict['connectorId'] = eachPriority['connectorId']
+    if eachPriority['createdBy'] is not None:
+        itemDict['createdBy'] = eachPriority['createdBy']
+    if eachPriority['createDate'] is not None:
+        itemDict['createDate'] = eachPriority['createDate']
+    itemDict['itemTypeId'] = eachPriority['itemTypeId']
+    itemDict['jiraPriorityId'] = eachPriority['jiraPriorityId']
+    itemDict['jiraPriorityName'] = eachPriority['jiraPriorityName']
+    itemDict['priorityId'] = eachPriority['priorityId']
+    if eachPriority['lastUpdatedBy'] is not None:
+        itemDict['lastUpdatedBy'] = eachPriority['lastUpdatedBy']
+    if eachPriority['lastUpdatedDate'] is not None:
+        itemDict['lastUpdatedDate'] = eachPriority['lastUpdatedDate']
+    # Don't save the self field, since it will be generated during creation
+    return itemDict
+
 def GetAllConnectorPriorities():
-    """ Get all Connector Priority information and return to the caller.
+    """ Get all Connector Priority information, for every connector, and return to the caller.
 
         Returns: All the details for each connector priority in a list of objects.
     """
-    prioritiesArr = []
     print("Collecting all Connector Priority info...")
-    priorities = GetFromJiraAlign(True, cfg.instanceurl + "/connectors/1/priorities")
-    dataPriority = priorities.json()
-    for eachPriority in dataPriority:
-        itemDict = {}
-        itemDict['id'] = eachPriority['id']
-        itemDict['connectorId'] = eachPriority['connectorId']
-        if eachPriority['createdBy'] is not None:
-            itemDict['createdBy'] = eachPriority['createdBy']
-        if eachPriority['createDate'] is not None:
-            itemDict['createDate'] = eachPriority['createDate']
-        itemDict['itemTypeId'] = eachPriority['itemTypeId']
-        itemDict['jiraPriorityId'] = eachPriority['jiraPriorityId']
-        itemDict['jiraPriorityName'] = eachPriority['jiraPriorityName']
-        itemDict['priorityId'] = eachPriority['priorityId']
-        if eachPriority['lastUpdatedBy'] is not None:
-            itemDict['lastUpdatedBy'] = eachPriority['lastUpdatedBy']
-        if eachPriority['lastUpdatedDate'] is not None:
-            itemDict['lastUpdatedDate'] = eachPriority['lastUpdatedDate']
-        # Don't save the self field, since it will be generated during creation
-        prioritiesArr.append(itemDict)
-    return prioritiesArr
-    
+    return ReadAllConnectorItems("priorities", ExtractPriorityData)
+
+def ExtractProjectData(eachProject):
+    """ Return the fields to save from a raw connector project.
+    """
+    itemDict = {}
+    itemDict['id'] = eachProject['id']
+    if eachProject['errorMessage'] is not None:
+        itemDict['errorMessage'] = eachProject['errorMessage']
+    itemDict['connectorId'] = eachProject['connectorId']
+    itemDict['createdBy'] = eachProject['createdBy']
+    itemDict['createDate'] = eachProject['createDate']
+    itemDict['programId'] = eachProject['programId']
+    itemDict['projectId'] = eachProject['projectId']
+    itemDict['projectKey'] = eachProject['projectKey']
+    itemDict['projectName'] = eachProject['projectName']
+    if eachProject['lastUpdatedBy'] is not None:
+        itemDict['lastUpdatedBy'] = eachProject['lastUpdatedBy']
+    if eachProject['lastUpdatedDate'] is not None:
+        itemDict['lastUpdatedDate'] = eachProject['lastUpdatedDate']
+    # Don't save the self field, since it will be generated during creation
+    return itemDict
+
 def GetAllConnectorProjects():
-    """ Get all Connector Project information and return to the caller.
+    """ Get all Connector Project information, for every connector, and return to the caller.
 
         Returns: All the details for each connector project in a list of objects.
     """
-    projectsArr = []
     print("Collecting all Connector Project info...")
-    projects = GetFromJiraAlign(True, cfg.instanceurl + "/connectors/1/projects")
-    dataProject = projects.json()
-    for eachProject in dataProject:
+    return ReadAllConnectorItems("projects", ExtractProjectData)
+
+def GetAllConnectorTeamMappings():
+    """ Get all Connector External Team Mapping information, for every connector, and
+        return to the caller.
+
+        Returns: All the details for each team mapping in a list of objects.
+    """
+    print("Collecting all Connector External Team Mapping info...")
+    def ExtractMapping(eachMapping):
         itemDict = {}
-        itemDict['id'] = eachProject['id']
-        if eachProject['errorMessage'] is not None:
-            itemDict['errorMessage'] = eachProject['errorMessage']
-        itemDict['connectorId'] = eachProject['connectorId']
-        itemDict['createdBy'] = eachProject['createdBy']
-        itemDict['createDate'] = eachProject['createDate']
-        itemDict['programId'] = eachProject['programId']
-        itemDict['projectId'] = eachProject['projectId']
-        itemDict['projectKey'] = eachProject['projectKey']
-        itemDict['projectName'] = eachProject['projectName']
-        if eachProject['lastUpdatedBy'] is not None:
-            itemDict['lastUpdatedBy'] = eachProject['lastUpdatedBy']
-        if eachProject['lastUpdatedDate'] is not None:
-            itemDict['lastUpdatedDate'] = eachProject['lastUpdatedDate']
-        # Don't save the self field, since it will be generated during creation
-        projectsArr.append(itemDict)
-    return projectsArr
+        ExtractItemData('connectorExternalTeamMapping', eachMapping, itemDict)
+        return itemDict
+    return ReadAllConnectorItems("TeamMappings", ExtractMapping)
     
 def ExtractItemData(itemType, sourceItem, extractedData):
     """ Extract all applicable fields from the source item and add them to the extracted
@@ -324,6 +332,8 @@ def ExtractItemData(itemType, sourceItem, extractedData):
         extractedData['businessImpact'] = sourceItem['businessImpact']
     if ('businessValue' in sourceItem) and (sourceItem['businessValue'] is not None):
         extractedData['businessValue'] = sourceItem['businessValue']
+    if ('capabilityId' in sourceItem) and (sourceItem['capabilityId'] is not None):
+        extractedData['capabilityId'] = sourceItem['capabilityId']
     if ('capitalized' in sourceItem) and (sourceItem['capitalized'] is not None):
         extractedData['capitalized'] = sourceItem['capitalized']
     if ('caseDevelopmentId' in sourceItem) and (sourceItem['caseDevelopmentId'] is not None):
@@ -398,6 +408,14 @@ def ExtractItemData(itemType, sourceItem, extractedData):
         extractedData['dependency'] = sourceItem['dependency']
     if ('dependencyIds' in sourceItem) and (sourceItem['dependencyIds'] is not None):
         extractedData['dependencyIds'] = sourceItem['dependencyIds']
+    if ('dependsOnEpicId' in sourceItem) and (sourceItem['dependsOnEpicId'] is not None):
+        extractedData['dependsOnEpicId'] = sourceItem['dependsOnEpicId']
+    if ('dependsOnFeatureId' in sourceItem) and (sourceItem['dependsOnFeatureId'] is not None):
+        extractedData['dependsOnFeatureId'] = sourceItem['dependsOnFeatureId']
+    if ('dependsOnProgramId' in sourceItem) and (sourceItem['dependsOnProgramId'] is not None):
+        extractedData['dependsOnProgramId'] = sourceItem['dependsOnProgramId']
+    if ('dependsOnTeamId' in sourceItem) and (sourceItem['dependsOnTeamId'] is not None):
+        extractedData['dependsOnTeamId'] = sourceItem['dependsOnTeamId']
     if ('designStage' in sourceItem) and (sourceItem['designStage'] is not None):
         extractedData['designStage'] = sourceItem['designStage']
     if ('devCompleteBy' in sourceItem) and (sourceItem['devCompleteBy'] is not None):
@@ -440,6 +458,8 @@ def ExtractItemData(itemType, sourceItem, extractedData):
         extractedData['enterpriseHierarchy'] = sourceItem['enterpriseHierarchy']
     if ('enterpriseHierarchyId' in sourceItem) and (sourceItem['enterpriseHierarchyId'] is not None):
         extractedData['enterpriseHierarchyId'] = sourceItem['enterpriseHierarchyId']
+    if ('epicId' in sourceItem) and (sourceItem['epicId'] is not None):
+        extractedData['epicId'] = sourceItem['epicId']
     if ('epicObjectId' in sourceItem) and (sourceItem['epicObjectId'] is not None):
         extractedData['epicObjectId'] = sourceItem['epicObjectId']
     if ('estimateAtCompletion' in sourceItem) and (sourceItem['estimateAtCompletion'] is not None):
@@ -758,6 +778,10 @@ def ExtractItemData(itemType, sourceItem, extractedData):
         extractedData['reportColor'] = sourceItem['reportColor']
     if ('requesterId' in sourceItem) and (sourceItem['requesterId'] is not None):
         extractedData['requesterId'] = sourceItem['requesterId']
+    if ('requestingProgramId' in sourceItem) and (sourceItem['requestingProgramId'] is not None):
+        extractedData['requestingProgramId'] = sourceItem['requestingProgramId']
+    if ('requestingTeamId' in sourceItem) and (sourceItem['requestingTeamId'] is not None):
+        extractedData['requestingTeamId'] = sourceItem['requestingTeamId']
     if ('revenueAssurance' in sourceItem) and (sourceItem['revenueAssurance'] is not None):
         extractedData['revenueAssurance'] = sourceItem['revenueAssurance']
     if ('revenueGrowth' in sourceItem) and (sourceItem['revenueGrowth'] is not None):
@@ -925,6 +949,61 @@ def ExtractItemData(itemType, sourceItem, extractedData):
     if ('yearlyCashFlow1' in sourceItem) and (sourceItem['yearlyCashFlow1'] is not None):
         extractedData['yearlyCashFlow1'] = sourceItem['yearlyCashFlow1']
                 
+def ItemsUrl(which, filterOnProgramID=None, skip=0):
+    """ Build the URL for one page of the given endpoint.
+
+    Args:
+        which: The endpoint, e.g. features or connectors/1/boards
+        filterOnProgramID: If not None, have Jira Align only return items in this Program
+        skip: Number of items to skip, i.e. which page to get
+    """
+    return client.GetDefault().ItemsUrl(which, filterOnProgramID, skip)
+
+def ReadPages(which, filterOnProgramID=None, firstPage=None):
+    """ Generator that GETs the given endpoint one page at a time and yields each page
+        (the list of raw items in it), until a short page says there are no more.
+        The caller stops early by not asking for the next page.
+
+    Args:
+        which: The endpoint, e.g. features or connectors/1/boards
+        filterOnProgramID: If not None, have Jira Align only return items in this Program
+        firstPage: The already decoded first page, if the caller had to GET it itself
+    """
+    return client.GetDefault().ReadPages(which, filterOnProgramID, firstPage)
+
+def KeepItem(eachWorkItem, filterOnProgramID=None):
+    """ True if a raw item read from Jira Align should be processed: it is not in the
+        recycle bin, and it is in the given Program (if there is one).
+    """
+    if 'isRecycled' in eachWorkItem:
+        itemIsDel = eachWorkItem['isRecycled']
+    else:
+        itemIsDel = False
+    # ONLY Take items that are not in the recycle bin/deleted
+    if itemIsDel is True:
+        return False
+
+    # If we want to filter on Program ID, then make sure it matches
+    # before processing it.  If it's not processed, then it won't be
+    # in the output.
+    if (filterOnProgramID is not None):
+        # Make sure that we don't have a case where the Program ID 
+        # is specified multiple times.
+        if ('programId' in eachWorkItem) and ('primaryProgramId' in eachWorkItem):
+            print("CONFLICT")
+            pass
+
+        # Check to see if the Program we are looking at matches what we
+        # are looking for.  There are two different fields that this info
+        # could be in, depending on the type of item we are looking at,
+        # so we have to check both.
+        if ('programId' in eachWorkItem) and (eachWorkItem['programId'] != filterOnProgramID):
+            return False
+        if ('primaryProgramId' in eachWorkItem) and (eachWorkItem['primaryProgramId'] != filterOnProgramID):
+            return False
+    # If we get here, then the item is wanted
+    return True
+
 def ReadAllItems(which, maxToRead, filterOnProgramID=None):
     """ Read in all work items of the given type (Epic, Feature, Story, etc.) and 
         return selected fields of them to the caller.  This is NOT a complete dump of all data.
@@ -935,80 +1014,46 @@ def ReadAllItems(which, maxToRead, filterOnProgramID=None):
         maxToRead: Maximum number of entries to read in.
         filterOnProgramID: If not None, then check the read in item with the given
         Program ID, and skip processing it if it does not match.
-    """
-    print("Collecting up to " + str(maxToRead) + " items of type " + which + "...")
-    itemArr = []
-
-    # Get the first set of data, which may be everything or may not be
-    if filterOnProgramID is None:
-        fullUrl = cfg.instanceurl + "/" + which + "?expand=true"
-    else:
-        # Optimize the call by having Jira Align do the filtering
-        fullUrl = cfg.instanceurl + "/" + which + "?expand=true&%24filter=programId%20eq%20" + str(filterOnProgramID)
-    #print(fullUrl)
-
-    items = GetFromJiraAlign(True, fullUrl)
-    Data = items.json()
-    line_count = 0
-    # Starting point for skipping is to go to the next 100..
-    skip = 100
-
-    while Data != None:
-        for eachWorkItem in Data:
-            if 'isRecycled' in eachWorkItem:
-                itemIsDel = eachWorkItem['isRecycled']
-            else:
-                itemIsDel = False
-            # ONLY Take items that are not in the recycle bin/deleted
-            if itemIsDel is True:
-                continue;
-            
-            # If we want to filter on Program ID, then make sure it matches
-            # before processing it.  If it's not processed, then it won't be
-            # in the output.
-            if (filterOnProgramID is not None):
-                # Make sure that we don't have a case where the Program ID 
-                # is specified multiple times.
-                if ('programId' in eachWorkItem) and ('primaryProgramId' in eachWorkItem):
-                    print("CONFLICT")
-                    pass
 
-                # Check to see if the Program we are looking at matches what we
-                # are looking for.  There are two different fields that this info
-                # could be in, depending on the type of item we are looking at,
-                # so we have to check both.
-                if ('programId' in eachWorkItem) and (eachWorkItem['programId'] != filterOnProgramID):
-                    continue
-                if ('primaryProgramId' in eachWorkItem) and (eachWorkItem['primaryProgramId'] != filterOnProgramID):
-                    continue
-                # If we get here, then the Program for this item matches what we want
-                # and we should extract all the data for the item and add to the
-                # result array.
-
-            line_count += 1
-            thisItem = {}
-            ExtractItemData(which, eachWorkItem, thisItem)
-            itemArr.append(thisItem)
+    Slow-changing reference endpoints (see cache.TTL) are served from the on-disk cache
+    while it is fresh, and revalidated with the saved ETag once it has expired.
+    If the daemon (JADaemon.py) is running, the read is done by it instead.
+    """
+    if daemon.Available():
+        try:
+            return daemon.Call('readall', which=which, maxToRead=maxToRead, filterOnProgramID=filterOnProgramID)
+        except daemon.DaemonUnavailable:
+            pass
+    return client.GetDefault().ReadAllItems(which, maxToRead, filterOnProgramID)
 
-        # If we got all the items, the return what we have
-        if len(Data) < 100:
-            break
-        # If we have read in as many as request (or more) then return
-        if len(itemArr) >= maxToRead:
-            break
+async def ReadAllItemsAsync(which, maxToRead, filterOnProgramID=None):
+    """ Same as ReadAllItems, for use with await.  Several pages are read at once.
+    """
+    return await asyncclient.GetDefault().ReadAllItems(which, maxToRead, filterOnProgramID)
 
-        # Otherwise, there are more items to get, so get the next 100
-        if filterOnProgramID is None:
-            fullUrl = cfg.instanceurl + "/" + which + "?&$skip=" + str(skip)
-        else:
-            fullUrl = cfg.instanceurl + "/" + which + \
-                      "?expand=true&%24filter=programId%20eq%20" + str(filterOnProgramID) + "&$skip=" + str(skip)
-        moreItems = GetFromJiraAlign(True, fullUrl)
-        Data = moreItems.json()
-        skip += 100
+def StreamItems(which, maxToRead=None, filterOnProgramID=None):
+    """ Same as ReadAllItems, but a generator that yields each item as its page arrives,
+        so the whole list is never held in memory.  Nothing is cached.
+    Args:
+        which: Which type of work items to retrieve.  
+               Valid values are: epics, capabilities, features, stories, defects, tasks
+        maxToRead: If not None, stop after the page that reaches this many items.
+        filterOnProgramID: If not None, then check the read in item with the given
+        Program ID, and skip processing it if it does not match.
+    """
+    return client.GetDefault().StreamItems(which, maxToRead, filterOnProgramID)
 
-    print('Loaded ' + str(line_count) + " items of type " + which)
-    return itemArr
+def ReadAllItemsPartitioned(which, filterOnProgramID=None, field='createDate', low=None, high=None):
+    """ Same as ReadAllItems, but for very large endpoints: the items are read in several
+        createDate (or id) ranges at once, ranges that are too big are split in half, and
+        the results are merged, each ID once, sorted by id.  See partition.py.
+    Args:
+        which: Which type of work items to retrieve, e.g. stories
+        filterOnProgramID: If not None, only items in this Program
+        field: 'createDate', or 'id' to split on ID numbers
+        low, high: The range to read; required for id
+    """
+    return partition.ReadAllItemsPartitioned(client.GetDefault(), which, filterOnProgramID, field, low, high)
 
 def ReadOneItem(which, idToFind):
     """ Read in one work items of the given type (Epic, Feature, Story, etc.) with
@@ -1019,17 +1064,35 @@ def ReadOneItem(which, idToFind):
                Valid values are: epics, capabilities, features, stories, defects, tasks
         idToFind: Search for a specific Jira Align ID number of the given type
     """
-    print("Reading item of type " + which + " with ID=" + str(idToFind) + "...")
-    itemArr = []
-    fullUrl = cfg.instanceurl + "/" + which + "/" + str(idToFind)
-    items = GetFromJiraAlign(True, fullUrl)
-    eachWorkItem = items.json()
-    thisItem = {}
-    ExtractItemData(which, eachWorkItem, thisItem)
-    itemArr.append(thisItem)
+    if daemon.Available():
+        try:
+            return daemon.Call('readone', which=which, idToFind=idToFind)
+        except daemon.DaemonUnavailable:
+            pass
+    return client.GetDefault().ReadOneItem(which, idToFind)
+
+def ReadManyItems(which, ids):
+    """ Read in the work items of the given type (Epic, Feature, Story, etc.) with the
+        given ID numbers, and return all fields of them to the caller.  IDs are asked
+        for in chunks using an "id in (...)" filter, so that N items take about N/100
+        requests instead of N.  If the endpoint doesn't support the filter, the items
+        are read one at a time, several in parallel.
+    Args:
+        which: Which type of work items to retrieve.  
+               Valid values are: epics, capabilities, features, stories, defects, tasks
+        ids: The Jira Align ID numbers to read
 
-    print('Loaded ' + which + "/" + str(idToFind))
-    return itemArr
+    Returns:
+        dict of ID -> extracted item.  IDs that could not be read are not in it.
+    """
+    if daemon.Available():
+        try:
+            itemDict = daemon.Call('readmany', which=which, ids=list(ids))
+            # JSON object keys are always strings
+            return {int(id): item for id, item in itemDict.items()}
+        except daemon.DaemonUnavailable:
+            pass
+    return client.GetDefault().ReadManyItems(which, ids)
 
 def replace_non_ascii_with_spaces(text):
     """
@@ -1041,7 +1104,7 @@ def replace_non_ascii_with_spaces(text):
     Returns:
     str: The processed string with non-ASCII characters replaced by spaces.
     """
-    return ''.join([char if ord(char) < 128 else ' ' for char in text])
+    return sanitize.NonAsciiToSpaces(text)
 
 def replace_non_ascii_and_newlines_with_spaces(text):
     """
@@ -1054,7 +1117,16 @@ def replace_non_ascii_and_newlines_with_spaces(text):
     Returns:
     str: The processed string with non-ASCII characters, carriage returns, and new line characters replaced by spaces.
     """
-    return ''.join([' ' if ord(char) >= 128 or char in ['\r', '\n'] else char for char in text])
+    return sanitize.NonAsciiAndNewlinesToSpaces(text)
+
+def SanitizeItems(items, fields, nonAscii=True, newlines='space', commaReplacement=None):
+    """ Clean the given text fields of every item in place, so each value fits on one
+        line of a CSV file.  See sanitize.SanitizeItems.
+
+    Returns:
+        The number of values that were changed
+    """
+    return sanitize.SanitizeItems(items, fields, nonAscii, newlines, commaReplacement)
 
 def get_key_info(dataArray, id):
     """
@@ -1062,7 +1134,8 @@ def get_key_info(dataArray, id):
     key information about it.
     
     Parameters:
-    dataArray: Array of objects to scan
+    dataArray: Array of objects to scan, or a dictionary of id -> object (such as an index
+               from registry.Registry.GetIndex), in which case no scan is needed
     id: ID number to look for
     
     Returns:
@@ -1072,9 +1145,16 @@ def get_key_info(dataArray, id):
     This function assumes that the given array has a field called 'id' in it.
     """
     tmpStr = ""
-    for item in dataArray:
-        if (item['id'] == id):
-            tmpStr = str(item['id'])
-            if 'title' in item:
-                tmpStr = tmpStr + "/" + item['title']
+    if isinstance(dataArray, dict):
+        found = dataArray.get(id)
+    else:
+        found = None
+        for item in dataArray:
+            if (item['id'] == id):
+                found = item
+                break
+    if found is not None:
+        tmpStr = str(found['id'])
+        if 'title' in found:
+            tmpStr = tmpStr + "/" + found['title']
     return tmpStr
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+#
+# compact.py
+#
+# Smaller in-memory form of extracted work items.  Every page the API returns is decoded into
+# new objects, so the same itemtype, user ID, date, state name and jiraProjectKey, and the same
+# nested 'users' and 'themes' structures, are stored again for every item that has them.
+#
+# ValuePool / InternItems make equal values share one object.  The items are still plain dicts
+# and are written out exactly as before; just don't change a shared nested list or dict in
+# place (give the item a new one instead).
+#
+# Only values that repeat are worth pooling, and everything pooled is kept alive until the pool
+# goes, so ids, free-text fields (title, description, ...) and long strings are left alone, as
+# is any list or dict that holds one.
+#
+# python compact.py [count] measures the memory this saves on a synthetic export.
+
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+# Fields whose values are nearly all different (ids and free text), and so never pooled
+SKIP_FIELDS = {'id', 'title', 'description', 'name', 'notes', 'benefitHypothesis', 'acceptanceCriteria',
+                    'summary', 'externalKey', 'link', 'self'}
+# Strings longer than this are not pooled
+MAX_POOLED_LENGTH = 64
+
+class ValuePool:
+    """ Equal values share one object: short strings, numbers, and (if shareNested) lists
+        and dicts of such values that are equal to one seen before.  Use one pool for all
+        the sections of an extraction, since user IDs and dates repeat across them.
+    """
+    def __init__(self, shareNested=True, maxLength=MAX_POOLED_LENGTH):
+        self.shareNested = shareNested
+        self.maxLength = maxLength
+        # Separate pools, so that 1 and 1.0 stay distinct.  Floats are keyed with their sign,
+        # since -0.0 == 0.0 but they are written differently.
+        self._strs = {}
+        self._ints = {}
+        self._floats = {}
+        self._nested = {}
+
+    def Intern(self, value):
+        """ Return the pooled object equal to value (value itself the first time, or if it
+            isn't pooled).
+        """
+        return self._Intern(value)[0]
+
+    def _Intern(self, value):
+        # (value, True if it is pooled or is True/False/None)
+        kind = type(value)
+        if kind is str:
+            if len(value) > self.maxLength:
+                return value, False
+            return self._strs.setdefault(value, value), True
+        if kind is int:
+            return self._ints.setdefault(value, value), True
+        if kind is float:
+            return self._floats.setdefault((value, math.copysign(1.0, value)), value), True
+        if kind is list:
+            pairs = [self._Intern(v) for v in value]
+            value = [v for v, _ in pairs]
+            # The contents are pooled, so equal lists hold the same objects
+            key = (list, tuple(map(id, value)))
+        elif kind is dict:
+            pairs = [self._Intern(v) for v in value.values()]
+            keys = [self._Intern(k) for k in value]
+            value = {k: v for (k, _), (v, _) in zip(keys, pairs)}
+            pairs = pairs + keys
+            key = (dict, tuple(map(id, value)), tuple(map(id, value.values())))
+        else:
+            return value, (value is None) or (kind is bool)
+        # A container holding anything unpooled can't be equal to another by id, so pooling
+        # it would only keep it alive
+        if (not self.shareNested) or not all(pooled for _, pooled in pairs):
+            return value, False
+        return self._nested.setdefault(key, value), True
+
+    def Count(self):
+        return len(self._strs) + len(self._ints) + len(self._floats) + len(self._nested)
+
+def InternItems(items, pool=None, skipFields=SKIP_FIELDS):
+    """ Make the values of each item share objects with equal values in other items.  The
+        items are changed in place; the list is returned for convenience.  Fields in
+        skipFields are left as they are.
+    """
+    if pool is None:
+        pool = ValuePool()
+    intern = pool.Intern
+    for item in items:
+        for field, value in item.items():
+            if field not in skipFields:
+                item[field] = intern(value)
+    return items
+
+def SyntheticPages(count, seed=1):
+    """ Make up count stories shaped like ReadAllItems output, as 100-item pages of JSON
+        text, so that decoding them gives separate objects the way the API's pages do.
+    """
+    rng = random.Random(seed)
+    userIds = [rng.randrange(1000, 90000) for _ in range(300)]
+    themes = [{'id': t, 'title': "Theme " + str(t)} for t in range(1, 25)]
+    stateNames = ["Pending Approval", "Ready to Start", "In Progress", "Dev Complete", "Test Complete", "Accepted"]
+    pages = []
+    page = []
+    for i in range(count):
+        createdBy = rng.choice(userIds)
+        createDate = "%04d-%02d-%02dT00:00:00Z" % (rng.randrange(2019, 2025), rng.randrange(1, 13), rng.randrange(1, 29))
+        story = {'id': i + 1, 'itemtype': 'stories', 'title': "Story number " + str(i + 1),
+                 'description': "As a user I want story " + str(i + 1) + " so that it is done",
+                 'programId': rng.randrange(1, 40), 'teamId': rng.randrange(1, 200), 'featureId': rng.randrange(1, 20000),
+                 'releaseId': rng.randrange(1, 60), 'state': rng.randrange(1, 7), 'effortPoints': rng.choice([0, 1, 2, 3, 5, 8, 13]),
+                 'createDate': createDate, 'createdBy': createdBy, 'lastUpdatedDate': createDate, 'lastUpdatedBy': createdBy,
+                 'ownerId': rng.choice(userIds), 'jiraProjectKey': "PRJ" + str(rng.randrange(1, 30)),
+                 'isRecycled': False, 'isBlocked': rng.random() < 0.1,
+                 'stateName': rng.choice(stateNames), 'tags': rng.sample(["ui", "api", "db", "infra", "docs"], 2),
+                 'users': [{'userId': createdBy, 'role': "Owner"}],
+                 'themes': [rng.choice(themes)]}
+        page.append(story)
+        if len(page) == 100:
+            pages.append(json.dumps(page))
+            page = []
+    if page:
+        pages.append(json.dumps(page))
+    return pages
+
+def Benchmark(count=200000):
+    """ Measure the memory taken by count decoded stories as they are and after InternItems,
+        and check that the data is unchanged.  Tracing memory slows everything down, so the
+        time comes from a separate run without it.
+    """
+    pages = SyntheticPages(count)
+    print("Measuring " + str(count) + " stories...")
+
+    items = [item for page in pages for item in json.loads(page)]
+    start = time.time()
+    pool = ValuePool()
+    InternItems(items, pool)
+    internTime = time.time() - start
+    # Kept from the untraced run, so it isn't counted
+    expected = items
+    del pool
+
+    tracemalloc.start()
+    items = [item for page in pages for item in json.loads(page)]
+    plainSize = tracemalloc.get_traced_memory()[0]
+    print("  as decoded:  " + str(plainSize // (1024 * 1024)) + " MB")
+
+    pool = ValuePool()
+    InternItems(items, pool)
+    internSize = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("  interned:    " + str(internSize // (1024 * 1024)) + " MB (" + str(round(internTime, 2)) + "s, " +
+          str(pool.Count()) + " values pooled), " + ("data matches" if items == expected else "DATA DIFFERS"))
+
+if __name__ == "__main__":
+    Benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+#
+# compare.py
+#
+# Compares the data extracted from several instances (e.g. test and prod), one endpoint at a
+# time.  Each extraction thread hands its results to Comparison.Add as it gets them, and each
+# endpoint is compared and reported as soon as every instance has delivered it, so the report
+# is streamed while the slower endpoints are still being read.
+
+import threading
+
+import spill
+
+# Fields that are expected to differ between instances and are not reported as changes
+IGNORE_FIELDS = {'self', 'lastUpdatedDate', 'lastUpdatedBy'}
+
+# Maximum number of IDs to list for each kind of difference in the report
+MAX_IDS_LISTED = 100
+
+def _IsItemList(value):
+    return isinstance(value, (list, spill.SpillList))
+
+def CompareSection(itemsByProfile, baseline, ignoreFields=IGNORE_FIELDS):
+    """ Compare one endpoint's items across instances.  The items are read one at a time,
+        so sections held in a spill.SpillList are never loaded whole.
+
+    Args:
+        itemsByProfile: dict of profile name -> list (or spill.SpillList) of extracted
+                        items, or a plain value, such as the version string
+        baseline: The profile the others are compared against
+
+    Returns:
+        dict with counts (per profile), missingCount and missingIds (per profile, the number
+        of IDs the baseline has that it doesn't, and the first MAX_IDS_LISTED of them),
+        extraCount and extraIds (per profile, IDs it has that the baseline doesn't),
+        changedFields (field -> number of items whose value differs from the baseline) and
+        changedCount and changedIds (per profile, items that differ)
+    """
+    result = {'counts': {}, 'missingCount': {}, 'missingIds': {}, 'extraCount': {}, 'extraIds': {},
+              'changedFields': {}, 'changedCount': {}, 'changedIds': {}}
+    base = itemsByProfile[baseline]
+    if not _IsItemList(base):
+        result['values'] = dict(itemsByProfile)
+        result['changed'] = len(set(str(v) for v in itemsByProfile.values())) > 1
+        return result
+
+    # Where each baseline item is, rather than the item itself
+    baseRowById = {}
+    for row, item in enumerate(base):
+        if 'id' in item:
+            baseRowById[item['id']] = row
+    for profile, items in itemsByProfile.items():
+        result['counts'][profile] = len(items)
+        if profile == baseline:
+            continue
+        seenIds = set()
+        extraIds = []
+        changedIds = []
+        for item in items:
+            if 'id' not in item:
+                continue
+            id = item['id']
+            if id in seenIds:
+                continue
+            seenIds.add(id)
+            baseRow = baseRowById.get(id)
+            if baseRow is None:
+                extraIds.append(id)
+                continue
+            baseItem = base[baseRow]
+            changed = False
+            for field in set(item) | set(baseItem):
+                if field in ignoreFields:
+                    continue
+                if item.get(field) != baseItem.get(field):
+                    result['changedFields'][field] = result['changedFields'].get(field, 0) + 1
+                    changed = True
+            if changed:
+                changedIds.append(id)
+        missingIds = set(baseRowById) - seenIds
+        result['missingCount'][profile] = len(missingIds)
+        result['missingIds'][profile] = sorted(missingIds)[:MAX_IDS_LISTED]
+        result['extraCount'][profile] = len(extraIds)
+        result['extraIds'][profile] = sorted(extraIds)[:MAX_IDS_LISTED]
+        result['changedCount'][profile] = len(changedIds)
+        result['changedIds'][profile] = sorted(changedIds)[:MAX_IDS_LISTED]
+    return result
+
+def Describe(key, result):
+    """ One line summary of a CompareSection result, for printing.
+    """
+    if 'values' in result:
+        return key + ": " + ("DIFFERENT " if result['changed'] else "same ") + str(result['values'])
+    tmpStr = key + ": counts " + str(result['counts'])
+    for profile in result['missingCount']:
+        tmpStr = tmpStr + " | " + profile + " missing " + str(result['missingCount'][profile]) + \
+                 ", extra " + str(result['extraCount'][profile]) + \
+                 ", changed " + str(result['changedCount'][profile])
+    if result['changedFields']:
+        top = sorted(result['changedFields'].items(), key=lambda kv: -kv[1])[:5]
+        tmpStr = tmpStr + " | most changed: " + ", ".join(f + "=" + str(n) for f, n in top)
+    return tmpStr
+
+class Comparison:
+    """ Collects extracted sections from several instances and compares each one as soon as
+        all the instances have delivered it.  Safe to call Add from several threads.
+
+    Args:
+        profileNames: The instances being compared; the first one is the baseline
+    """
+    def __init__(self, profileNames):
+        self.profileNames = list(profileNames)
+        self.baseline = self.profileNames[0]
+        self.pending = {}
+        self.results = {}
+        self._lock = threading.Lock()
+
+    def Add(self, profileName, key, items):
+        """ Record that the given instance has delivered the given section.  If it was the
+            last instance to do so, the section is compared and the result printed.
+        """
+        with self._lock:
+            section = self.pending.setdefault(key, {})
+            section[profileName] = items
+            if len(section) < len(self.profileNames):
+                return
+            del self.pending[key]
+        result = CompareSection(section, self.baseline)
+        with self._lock:
+            self.results[key] = result
+        print("COMPARE " + Describe(key, result))
+
+    def Report(self):
+        """ Return all the results so far, plus the sections not every instance delivered.
+        """
+        with self._lock:
+            report = dict(self.results)
+            for key, section in self.pending.items():
+                report[key] = {'incomplete': sorted(section)}
+            return report
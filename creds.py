@@ -9,4 +9,16 @@ jatoken = "user:0|\Ht{q}#x2*_8%tPO;)0(~cj>GsaQ"
 
 # For V1 Jira Align APIs
 jatokenv1 = "t5BZn"
-usernamev1 = "foo@acme.com"
\ No newline at end of file
+usernamev1 = "foo@acme.com"
+
+# Instance profiles, for tools that work with more than one instance at once,
+# e.g.  python JADataExtractor.py test prod
+# Any credential left out of a profile falls back to the values above.
+profiles = {
+    'test': {'url': "https://foo-test.jiraalign.com",
+             'jatoken': "user:0|\Ht{q}#x2*_8%tPO;)0(~cj>GsaQ",
+             'maxRequestsPerSecond': 10},
+    'prod': {'url': "https://foo.jiraalign.com",
+             'jatoken': "user:0|Uw&+}ouNgDr$+XG.HXLoko%",
+             'maxRequestsPerSecond': 5},
+}
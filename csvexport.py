@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# csvexport.py
+#
+# Streams work items to a CSV file as the pages arrive from Jira Align, one row per item, with
+# a chosen list of columns for each item type.  Text is cleaned on the way out (see sanitize.py)
+# so every row stays on one line and can be re-imported.  Only the current page is held in
+# memory, so 100k+ items can be exported without building the full list first.
+
+import csv
+import json
+
+import common
+import sanitize
+
+# Columns written for each item type, unless the caller gives its own list
+COLUMNS = {
+    'epics': ['id', 'externalKey', 'title', 'description', 'state', 'primaryProgramId', 'programIds',
+              'releaseIds', 'themeId', 'ownerId', 'createDate', 'acceptedDate'],
+    'capabilities': ['id', 'externalKey', 'title', 'description', 'state', 'parentId', 'primaryProgramId',
+                     'releaseIds', 'ownerId', 'createDate', 'acceptedDate'],
+    'features': ['id', 'externalKey', 'jiraProjectKey', 'title', 'description', 'state', 'parentId',
+                 'primaryProgramId', 'releaseId', 'ownerId', 'createDate', 'acceptedDate'],
+    'stories': ['id', 'externalKey', 'jiraProjectKey', 'title', 'description', 'state', 'featureId',
+                'programId', 'releaseId', 'teamId', 'effortPoints', 'createDate', 'acceptedDate'],
+    'defects': ['id', 'externalKey', 'title', 'description', 'state', 'featureId', 'programId',
+                'releaseId', 'teamId', 'createDate'],
+    'tasks': ['id', 'externalKey', 'title', 'description', 'state', 'storyId', 'teamId', 'ownerId',
+              'createDate'],
+}
+# Columns for any other endpoint
+DEFAULT_COLUMNS = ['id', 'title', 'description', 'state', 'programId']
+
+# Separator used when a value is a list, e.g. releaseIds
+LIST_SEPARATOR = ';'
+
+def CellValue(value, commaReplacement=None):
+    """ Turn an extracted value into the text for one CSV cell, on one line.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        text = sanitize.NonAsciiAndNewlinesToSpaces(value)
+    elif isinstance(value, list) and all(not isinstance(v, (dict, list)) for v in value):
+        text = LIST_SEPARATOR.join(str(v) for v in value)
+    elif isinstance(value, (dict, list)):
+        text = sanitize.NonAsciiAndNewlinesToSpaces(json.dumps(value, sort_keys=True))
+    else:
+        return value
+    if (commaReplacement is not None) and (',' in text):
+        text = text.replace(',', commaReplacement)
+    return text
+
+def WriteCsv(fileName, items, columns, commaReplacement=None):
+    """ Write the items to a CSV file, one row each as they come, with a header row.
+
+    Args:
+        fileName: The CSV file to write
+        items: Any iterable of extracted items, e.g. common.StreamItems(...)
+        columns: The fields to write, in order; an item without one gets an empty cell
+        commaReplacement: If not None, commas in text are replaced with it (as
+                          cfg.ReplaceStrings does), for tools that don't handle quoting
+
+    Returns:
+        The number of rows written
+    """
+    count = 0
+    with open(fileName, 'w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(columns)
+        for item in items:
+            writer.writerow([CellValue(item.get(column), commaReplacement) for column in columns])
+            count += 1
+    return count
+
+def ExportCsv(which, fileName, columns=None, maxToRead=None, filterOnProgramID=None, commaReplacement=None):
+    """ Stream all the items of the given type from Jira Align to a CSV file.
+
+    Args:
+        which: Which type of work items to export, e.g. stories
+        fileName: The CSV file to write
+        columns: The fields to write; defaults to COLUMNS for the item type
+        maxToRead: If not None, stop after the page that reaches this many items
+        filterOnProgramID: If not None, only export items in this Program
+        commaReplacement: See WriteCsv
+
+    Returns:
+        The number of rows written
+    """
+    if columns is None:
+        columns = COLUMNS.get(which.lower(), DEFAULT_COLUMNS)
+    print("Exporting items of type " + which + " to: " + fileName)
+    count = WriteCsv(fileName, common.StreamItems(which, maxToRead, filterOnProgramID), columns, commaReplacement)
+    print("A total of " + str(count) + " items of type " + which + " were written to " + fileName)
+    return count
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+#
+# daemon.py
+#
+# Local service mode.  JADaemon.py runs a small HTTP server on localhost that keeps a warm
+# JiraAlignClient (authenticated connection pool), the reference data registry, and recent
+# query results in memory, and runs jobs for the other scripts.  When the daemon is running,
+# the common.py read functions and the registry send their work to it instead of going to
+# Jira Align themselves, so the scripts start up and respond in well under a second.
+#
+# The server only listens on 127.0.0.1, and every request must carry the random token that
+# the daemon writes (readable only by the current user) to STATE_FILE when it starts.
+
+import http.client
+import json
+import os
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import client
+
+# Port the daemon listens on
+PORT = 8765
+# Where the daemon records its port and token for the scripts to find
+STATE_FILE = os.path.join(os.path.expanduser("~"), ".jiraaligntools", "daemon.json")
+# How long, in seconds, the daemon keeps the results of a query.  Any PATCH or POST made by the
+# daemon or by a script using it for the same instance clears them (see NoteWrite).
+RESULT_TTL = 5 * 60
+# How long, in seconds, a script waits for the daemon before giving up on a job
+CALL_TIMEOUT = 30 * 60
+# Reference data read in as soon as the daemon starts
+WARM_ENDPOINTS = ['programs', 'releases']
+
+# Jobs that change Jira Align.  If one of these fails after it was sent, it may have run, so
+# the caller is not told to do the work itself.
+MUTATING_JOBS = {'fixproject'}
+
+# Set in the daemon process itself, so that it never tries to call itself
+SERVING = False
+# The daemon's warm state, in the daemon process
+_service = None
+
+#_______________________________________________________________________________
+# Client side
+
+# None until the first check, then the daemon's state (port, token, instance) or False
+_state = None
+_stateLock = threading.Lock()
+
+def _GetState():
+    global _state
+    with _stateLock:
+        if _state is None:
+            _state = False
+            try:
+                with open(STATE_FILE, 'r') as infile:
+                    state = json.load(infile)
+                # Only use a daemon that is serving the instance we are working with
+                if state.get('instance') == client.GetDefault().instanceurl:
+                    _state = state
+            except (OSError, ValueError):
+                pass
+        return _state
+
+def Available():
+    """ True if a daemon for the current instance is running and should be used.
+    """
+    if SERVING:
+        return False
+    return bool(_GetState())
+
+def _NotRunning(e):
+    """ True if the error means the request never reached a daemon (nothing listening),
+        as opposed to a failure after it was sent.
+    """
+    reason = e.reason if isinstance(e, urllib.error.URLError) else e
+    return isinstance(reason, (ConnectionRefusedError, FileNotFoundError))
+
+def Call(job, **args):
+    """ Run a job in the daemon and return its result.  If the daemon isn't running,
+        it is not tried again by this process, and DaemonUnavailable is raised so the
+        caller can do the work itself.  That is also done for a read that fails part way,
+        but not for a job in MUTATING_JOBS: once that has been sent it may have run, so
+        DaemonCallFailed is raised instead and the work must not be repeated blindly.
+    """
+    global _state
+    state = _GetState()
+    if not state:
+        raise DaemonUnavailable("no daemon")
+    body = json.dumps({'job': job, 'args': args}).encode('utf-8')
+    request = urllib.request.Request("http://127.0.0.1:" + str(state['port']) + "/job", data=body,
+                                     headers={'Content-Type': 'application/json',
+                                              'X-Daemon-Token': state['token']})
+    try:
+        with urllib.request.urlopen(request, timeout=CALL_TIMEOUT) as response:
+            reply = json.loads(response.read().decode('utf-8'))
+    except (urllib.error.URLError, OSError, ValueError, http.client.HTTPException) as e:
+        notRunning = _NotRunning(e)
+        if notRunning:
+            with _stateLock:
+                _state = False
+        if notRunning or (job not in MUTATING_JOBS):
+            raise DaemonUnavailable(str(e))
+        raise DaemonCallFailed("Daemon job " + job + " was sent but did not complete (" + str(e) +
+                               "); it may have run, so check the result before running it again")
+    if 'error' in reply:
+        raise RuntimeError("Daemon job " + job + " failed: " + reply['error'])
+    return reply['result']
+
+def NoteWrite(instanceurl):
+    """ Called after every PATCH or POST this process makes.  A daemon serving that
+        instance forgets its recent results, so nothing reads items as they were before
+        the write.
+    """
+    if SERVING:
+        if _service is not None:
+            _service.Invalidate()
+        return
+    state = _GetState()
+    if (not state) or (state.get('instance') != instanceurl):
+        return
+    try:
+        Call('invalidate')
+    except DaemonUnavailable:
+        pass
+
+class DaemonUnavailable(Exception):
+    """ Raised by Call when the daemon can't be reached, or a read in it failed part way.
+    """
+    pass
+
+class DaemonCallFailed(RuntimeError):
+    """ Raised by Call when a job that changes Jira Align was sent but its result was
+        never received.
+    """
+    pass
+
+#_______________________________________________________________________________
+# Server side
+
+class _Service:
+    """ The warm state the daemon keeps between jobs.
+    """
+    def __init__(self, aClient):
+        import registry
+        self.client = aClient
+        self.registry = registry.Registry(aClient=aClient)
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def Recent(self, key, compute):
+        """ Return a recent result for the key, or compute and remember it.
+        """
+        now = time.time()
+        with self.lock:
+            hit = self.results.get(key)
+            if (hit is not None) and (now - hit[0] < RESULT_TTL):
+                return hit[1]
+        result = compute()
+        with self.lock:
+            self.results[key] = (now, result)
+        return result
+
+    def Invalidate(self):
+        with self.lock:
+            self.results.clear()
+        self.registry = type(self.registry)(aClient=self.client)
+
+    def Run(self, job, args):
+        import projfix
+        aClient = self.client
+        if job == 'status':
+            return {'instance': aClient.instanceurl, 'metrics': aClient.metrics.Summary(),
+                    'recentResults': len(self.results), 'refdata': sorted(self.registry.items)}
+        if job == 'readall':
+            key = ('readall', args['which'], args['maxToRead'], args.get('filterOnProgramID'))
+            return self.Recent(key, lambda: aClient.ReadAllItems(args['which'], args['maxToRead'],
+                                                                 args.get('filterOnProgramID')))
+        if job == 'readone':
+            return aClient.ReadOneItem(args['which'], args['idToFind'])
+        if job == 'readmany':
+            return aClient.ReadManyItems(args['which'], args['ids'])
+        if job == 'refdata':
+            return self.registry.GetItems(args['which'])
+        if job == 'fixproject':
+            return projfix.RunBatch(args['which'], args['endpoint'], args['entries'],
+                                    args['mappingFileName'], args['reportFileName'])
+        if job == 'invalidate':
+            self.Invalidate()
+            return True
+        raise ValueError("Unknown job: " + job)
+
+def Serve(aClient, port=PORT):
+    """ Run the daemon for the given client until interrupted.
+    """
+    global SERVING, _service
+    SERVING = True
+    service = _service = _Service(aClient)
+    token = secrets.token_hex(16)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if (self.path != "/job") or (self.headers.get('X-Daemon-Token') != token):
+                self.send_error(403)
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            start = time.time()
+            job = None
+            try:
+                request = json.loads(self.rfile.read(length).decode('utf-8'))
+                job = request['job']
+                reply = {'result': service.Run(job, request.get('args', {}))}
+            except Exception as e:
+                reply = {'error': type(e).__name__ + ": " + str(e)}
+            print("Job " + str(job) + (" FAILED" if 'error' in reply else "") +
+                  " in " + str(round(time.time() - start, 3)) + "s")
+            body = json.dumps(reply).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep the console for our own progress messages
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    # Record where we are, readable only by this user
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    fd = os.open(STATE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as outfile:
+        json.dump({'port': server.server_address[1], 'token': token, 'pid': os.getpid(),
+                   'instance': aClient.instanceurl}, outfile)
+    print("Jira Align daemon for " + aClient.instanceurl + " listening on 127.0.0.1:" + str(server.server_address[1]))
+    def Warm():
+        for which in WARM_ENDPOINTS:
+            try:
+                print("Warmed " + which + ": " + str(len(service.registry.GetItems(which))) + " items")
+            except Exception as e:
+                print("Could not warm " + which + ": " + str(e))
+    threading.Thread(target=Warm, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.remove(STATE_FILE)
+        except OSError:
+            pass
+        print("Jira Align daemon stopped: " + aClient.metrics.Summary())
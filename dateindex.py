@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+#
+# dateindex.py
+#
+# Sorted index over one date field (acceptedDate, createDate, etc.) of a list of extracted items.
+# Each date string is parsed once into a day number, and the rows are kept sorted by it, so that
+# "accepted between X and Y" is two binary searches plus the k matching rows, and "is row n in
+# the range" is a single comparison, instead of substring tests on the date strings:
+#
+#   accepted = dateindex.DateIndex(featureArray, 'acceptedDate')
+#   for row in accepted.Rows('2019-01-01', '2024-01-01'): ...
+#   if accepted.InYears(row, 2019, 2023): ...
+
+from bisect import bisect_left
+
+from itemtable import EpochDay, MISSING, YearRange
+
+class DateIndex:
+    """ Dates of one field of the items, as days since 1970-01-01, plus the rows sorted
+        by date.  Bounds can be given as days or as ISO date strings.
+
+    Args:
+        items: Extracted items, as returned by ReadAllItems
+        field: The date field to index, e.g. acceptedDate
+    """
+    def __init__(self, items, field):
+        self.items = items
+        self.field = field
+        # Day of each row, MISSING if the item has no date
+        self.days = [EpochDay(item.get(field)) for item in items]
+        # Rows that have a date, sorted by date (and by row within a date), and their days
+        self.sortedRows = sorted((row for row, day in enumerate(self.days) if day != MISSING),
+                                 key=self.days.__getitem__)
+        self.sortedDays = [self.days[row] for row in self.sortedRows]
+
+    def __len__(self):
+        return len(self.sortedRows)
+
+    def _Bounds(self, low, high):
+        if isinstance(low, str):
+            low = EpochDay(low)
+        if isinstance(high, str):
+            high = EpochDay(high)
+        return (bisect_left(self.sortedDays, low), bisect_left(self.sortedDays, high))
+
+    def Rows(self, low, high):
+        """ Return the rows dated from low up to (but not including) high, in date order.
+        """
+        start, end = self._Bounds(low, high)
+        return self.sortedRows[start:end]
+
+    def Items(self, low, high):
+        """ Return the items dated from low up to (but not including) high, in date order.
+        """
+        return [self.items[row] for row in self.Rows(low, high)]
+
+    def Count(self, low, high):
+        """ Return the number of items dated from low up to (but not including) high.
+        """
+        start, end = self._Bounds(low, high)
+        return end - start
+
+    def RowsInYears(self, firstYear, lastYear):
+        """ Return the rows dated in the given years (inclusive), in date order.
+        """
+        return self.Rows(*YearRange(firstYear, lastYear))
+
+    def InYears(self, row, firstYear, lastYear):
+        """ True if the given row is dated in the given years (inclusive).
+        """
+        low, high = YearRange(firstYear, lastYear)
+        return low <= self.days[row] < high
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+#
+# depgraph.py
+#
+# Directed graph of the dependencies between work items, built from the dependencies export
+# joined to the features and epics.  An edge goes from the item that needs something to the
+# item it depends on.  The graph is kept as CSR arrays (see hierarchy.py), and everything is
+# linear in the size of the graph:
+#   - cycles are the strongly connected components with more than one item (Tarjan), and a
+#     loop through each is found with a breadth first search inside it
+#   - the longest chains are the longest paths through the DAG of those components
+#   - fan-in hot spots are the items the most others depend on
+#   - cross-program edges join items whose Programs differ
+
+from array import array
+from collections import deque
+
+# Where a dependency names its two ends.  Each end is tried in order: (field in the dependency,
+# endpoint the ID is for).  Change these to match the fields the instance returns.
+FROM_FIELDS = [('featureId', 'features'), ('epicId', 'epics')]
+TO_FIELDS = [('dependsOnFeatureId', 'features'), ('dependsOnEpicId', 'epics')]
+# Fields of the dependency giving the Program of each end, used when the item isn't known
+FROM_PROGRAM_FIELDS = ['requestingProgramId']
+TO_PROGRAM_FIELDS = ['dependsOnProgramId']
+# Fields of a work item giving its Program
+ITEM_PROGRAM_FIELDS = ['primaryProgramId', 'programId']
+
+# Number of entries to list in each part of the report
+TOP = 20
+
+def _First(item, fields):
+    for field in fields:
+        if item.get(field) is not None:
+            return item[field]
+    return None
+
+class DependencyGraph:
+    """ Graph of the dependencies between work items, identified by (which, id).
+
+    Args:
+        dependencies: The dependencies, as returned by ReadAllItems('dependencies', ...)
+        itemsByType: dict of endpoint -> items, e.g. {'features': [...], 'epics': [...]}.
+                     Used for the Programs of the items, and for the requesting side of
+                     dependencies that only appear in an item's dependencyIds.
+    """
+    def __init__(self, dependencies, itemsByType, fromFields=FROM_FIELDS, toFields=TO_FIELDS):
+        self.keys = []
+        self.nodeOf = {}
+        self.program = []
+        itemIndex = {}
+        requesterOf = {}
+        for which, items in itemsByType.items():
+            for item in items:
+                if 'id' not in item:
+                    continue
+                itemIndex[(which, item['id'])] = item
+                for dependencyId in item.get('dependencyIds') or []:
+                    requesterOf.setdefault(dependencyId, (which, item['id']))
+
+        edgeFrom = array('q')
+        edgeTo = array('q')
+        # Dependency ID of each edge
+        self.edgeDependency = array('q')
+        # Dependencies where one end couldn't be found
+        self.unresolved = []
+        for dependency in dependencies:
+            fromKey = self._End(dependency, fromFields)
+            if fromKey is None:
+                fromKey = requesterOf.get(dependency.get('id'))
+            toKey = self._End(dependency, toFields)
+            if (fromKey is None) or (toKey is None):
+                self.unresolved.append(dependency.get('id'))
+                continue
+            fromProgram = _First(itemIndex.get(fromKey, {}), ITEM_PROGRAM_FIELDS)
+            if fromProgram is None:
+                fromProgram = _First(dependency, FROM_PROGRAM_FIELDS)
+            toProgram = _First(itemIndex.get(toKey, {}), ITEM_PROGRAM_FIELDS)
+            if toProgram is None:
+                toProgram = _First(dependency, TO_PROGRAM_FIELDS)
+            edgeFrom.append(self._Node(fromKey, fromProgram))
+            edgeTo.append(self._Node(toKey, toProgram))
+            self.edgeDependency.append(dependency.get('id', -1))
+
+        # CSR out-edges, plus the in-degree of each node
+        count = len(self.keys)
+        self.inDegree = array('q', [0]) * count
+        self.edgeStart = array('q', [0]) * (count + 1)
+        for i in range(len(edgeFrom)):
+            self.edgeStart[edgeFrom[i] + 1] += 1
+            self.inDegree[edgeTo[i]] += 1
+        for node in range(count):
+            self.edgeStart[node + 1] += self.edgeStart[node]
+        self.edgeTarget = array('q', [0]) * len(edgeFrom)
+        self.edgeIndex = array('q', [0]) * len(edgeFrom)
+        fill = array('q', self.edgeStart[:count])
+        for i in range(len(edgeFrom)):
+            slot = fill[edgeFrom[i]]
+            self.edgeTarget[slot] = edgeTo[i]
+            self.edgeIndex[slot] = i
+            fill[edgeFrom[i]] += 1
+        self._components = None
+
+    def _End(self, dependency, fields):
+        for field, which in fields:
+            if dependency.get(field) is not None:
+                return (which, dependency[field])
+        return None
+
+    def _Node(self, key, program):
+        node = self.nodeOf.get(key)
+        if node is None:
+            node = len(self.keys)
+            self.nodeOf[key] = node
+            self.keys.append(key)
+            self.program.append(program)
+        elif self.program[node] is None:
+            self.program[node] = program
+        return node
+
+    def Components(self):
+        """ Return the strongly connected components, as a list of lists of nodes, in
+            reverse topological order (a component comes before the ones that depend on it).
+            Iterative Tarjan, so deep chains don't hit the recursion limit.
+        """
+        if self._components is not None:
+            return self._components
+        count = len(self.keys)
+        index = array('q', [-1]) * count
+        low = array('q', [0]) * count
+        onStack = bytearray(count)
+        stack = []
+        components = []
+        nextIndex = 0
+        edgeStart = self.edgeStart
+        edgeTarget = self.edgeTarget
+        for root in range(count):
+            if index[root] >= 0:
+                continue
+            # Each frame is (node, position of the next edge to look at)
+            work = [(root, edgeStart[root])]
+            index[root] = low[root] = nextIndex
+            nextIndex += 1
+            stack.append(root)
+            onStack[root] = 1
+            while work:
+                node, position = work[-1]
+                if position < edgeStart[node + 1]:
+                    work[-1] = (node, position + 1)
+                    target = edgeTarget[position]
+                    if index[target] < 0:
+                        index[target] = low[target] = nextIndex
+                        nextIndex += 1
+                        stack.append(target)
+                        onStack[target] = 1
+                        work.append((target, edgeStart[target]))
+                    elif onStack[target] and index[target] < low[node]:
+                        low[node] = index[target]
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        onStack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+        self._components = components
+        return components
+
+    def _CycleComponents(self):
+        # The components that are cycles, largest first
+        cycles = []
+        for component in self.Components():
+            if len(component) == 1:
+                node = component[0]
+                targets = self.edgeTarget[self.edgeStart[node]:self.edgeStart[node + 1]]
+                if node not in targets:
+                    continue
+            cycles.append(component)
+        cycles.sort(key=lambda component: -len(component))
+        return cycles
+
+    def Cycles(self):
+        """ Return the items in each dependency cycle, as a sorted list of (which, id),
+            largest first.  Items that depend on themselves are included as cycles of one.
+            A cycle of more than two items may be several loops through the same items;
+            see CyclePaths for one loop in dependency order.
+        """
+        return [sorted(self.keys[node] for node in component) for component in self._CycleComponents()]
+
+    def CyclePaths(self):
+        """ Return one loop through each cycle, in the same order as Cycles, as a list of
+            (which, id) where each item depends on the next and the last depends on the
+            first.  It is the shortest loop through one of the cycle's items.
+        """
+        paths = []
+        for component in self._CycleComponents():
+            members = set(component)
+            start = min(component)
+            # Breadth first from start, within the cycle, until an edge leads back to it
+            parent = {}
+            queue = deque([start])
+            path = None
+            while queue and (path is None):
+                node = queue.popleft()
+                for position in range(self.edgeStart[node], self.edgeStart[node + 1]):
+                    target = self.edgeTarget[position]
+                    if target == start:
+                        path = [node]
+                        while path[-1] != start:
+                            path.append(parent[path[-1]])
+                        path.reverse()
+                        break
+                    if (target in members) and (target not in parent):
+                        parent[target] = node
+                        queue.append(target)
+            paths.append([self.keys[node] for node in path])
+        return paths
+
+    def LongestChains(self, count=TOP):
+        """ Return up to count of the longest dependency chains, as lists of (which, id)
+            from the first item that needs something to the last thing needed.  A cycle on
+            the way counts as all of its items, and is listed as its first item.
+        """
+        components = self.Components()
+        componentOf = array('q', [0]) * len(self.keys)
+        for c, component in enumerate(components):
+            for node in component:
+                componentOf[node] = c
+        # Components come out with each one after everything it depends on, so the
+        # longest chain starting at each one can be worked out in a single pass
+        length = array('q', [0]) * len(components)
+        nextComponent = array('q', [-1]) * len(components)
+        for c, component in enumerate(components):
+            best = 0
+            for node in component:
+                for position in range(self.edgeStart[node], self.edgeStart[node + 1]):
+                    target = componentOf[self.edgeTarget[position]]
+                    if (target != c) and (length[target] > best):
+                        best = length[target]
+                        nextComponent[c] = target
+            length[c] = best + len(component)
+        starts = sorted(range(len(components)), key=lambda c: -length[c])
+        chains = []
+        used = set()
+        for c in starts:
+            if len(chains) >= count or length[c] < 2:
+                break
+            if c in used:
+                continue
+            chain = []
+            while c >= 0:
+                used.add(c)
+                chain.append(self.keys[min(components[c])])
+                c = nextComponent[c]
+            chains.append(chain)
+        return chains
+
+    def ChainLength(self, chain):
+        """ Number of items in a chain from LongestChains, counting every item in its cycles.
+        """
+        components = self.Components()
+        sizes = {}
+        for component in components:
+            for node in component:
+                sizes[node] = len(component)
+        return sum(sizes[self.nodeOf[key]] for key in chain)
+
+    def FanIn(self, count=TOP):
+        """ Return up to count (which, id, number of items depending on it), most first.
+        """
+        nodes = sorted((node for node in range(len(self.keys)) if self.inDegree[node] > 0),
+                       key=lambda node: -self.inDegree[node])[:count]
+        return [(self.keys[node][0], self.keys[node][1], self.inDegree[node]) for node in nodes]
+
+    def CrossProgramEdges(self):
+        """ Return (dependency id, from (which, id), to (which, id), from Program, to Program)
+            for each dependency between items in different Programs.
+        """
+        edges = []
+        for node in range(len(self.keys)):
+            for position in range(self.edgeStart[node], self.edgeStart[node + 1]):
+                target = self.edgeTarget[position]
+                fromProgram = self.program[node]
+                toProgram = self.program[target]
+                if (fromProgram is not None) and (toProgram is not None) and (fromProgram != toProgram):
+                    edges.append((self.edgeDependency[self.edgeIndex[position]], self.keys[node],
+                                  self.keys[target], fromProgram, toProgram))
+        return edges
+
+    def Report(self, count=TOP):
+        """ Return everything above as one dict that can be saved as JSON.
+        """
+        crossEdges = self.CrossProgramEdges()
+        programPairs = {}
+        for edge in crossEdges:
+            pair = str(edge[3]) + " -> " + str(edge[4])
+            programPairs[pair] = programPairs.get(pair, 0) + 1
+        chains = self.LongestChains(count)
+        return {
+            'items': len(self.keys),
+            'dependencies': len(self.edgeTarget),
+            'unresolvedDependencyIds': self.unresolved,
+            'cycles': [[list(key) for key in cycle] for cycle in self.Cycles()],
+            'cyclePaths': [[list(key) for key in path] for path in self.CyclePaths()],
+            'longestChains': [{'length': self.ChainLength(chain), 'chain': [list(key) for key in chain]}
+                              for chain in chains],
+            'fanIn': [{'which': which, 'id': id, 'dependents': n} for which, id, n in self.FanIn(count)],
+            'crossProgramDependencies': len(crossEdges),
+            'crossProgramPairs': programPairs,
+            'crossProgramEdges': [{'dependencyId': e[0], 'from': list(e[1]), 'to': list(e[2]),
+                                   'fromProgramId': e[3], 'toProgramId': e[4]} for e in crossEdges],
+        }
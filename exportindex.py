@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+#
+# exportindex.py
+#
+# Fast lookups in the JADataExtractor output files without loading them.  The files are written
+# with indent=4 and sort_keys, so every section starts on a line '    "<key>": [', every item
+# of a section starts on a line of 8 spaces and '{' and ends on one of 8 spaces and '}', and an
+# item's own fields are indented 12 spaces.  One scan of the file finds where each item starts
+# and ends and what its id is.  That index is saved beside the file (<file>.idx) and used
+# until the file changes; the file itself is memory mapped, and only the items asked for are
+# decoded:
+#
+#   with exportindex.ExportReader('JiraAlign_item_data.json') as reader:
+#       story = reader.Get('stories', 1234)
+#       for feature in reader.Items('features'): ...
+#
+# A file that isn't laid out that way (e.g. written by something else) is loaded whole instead.
+
+import bisect
+import mmap
+import os
+import re
+import sys
+import time
+from array import array
+
+import fastjson
+
+INDEX_VERSION = 1
+
+# id stored for an item that doesn't have one
+NO_ID = -2 ** 63
+
+# Section header, item start, item end, and an item's own id field
+_LAYOUT = re.compile(rb'\n    ("(?:[^"\\\n]|\\.)*"): \['
+                     rb'|\n        (\{)(?=\n)'
+                     rb'|\n        (\})'
+                     rb'|\n            "id": (-?[0-9]+)')
+
+class _Section:
+    """ Where the items of one section are: in file order, their ids, start and end
+        offsets; and the ids in sorted order with the row each one is at.
+    """
+    def __init__(self, ids=None, starts=None, ends=None, sortedIds=None, sortedRows=None):
+        self.ids = ids if ids is not None else array('q')
+        self.starts = starts if starts is not None else array('q')
+        self.ends = ends if ends is not None else array('q')
+        self.sortedIds = sortedIds
+        self.sortedRows = sortedRows
+
+    def Sort(self):
+        rows = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+        self.sortedRows = array('q', rows)
+        self.sortedIds = array('q', [self.ids[row] for row in rows])
+
+    def Arrays(self):
+        return [self.ids, self.starts, self.ends, self.sortedIds, self.sortedRows]
+
+def ScanLayout(data):
+    """ Find the sections and items in the text of an export file (bytes or mmap).
+
+    Returns:
+        dict of section key -> _Section, or None if the file isn't laid out as expected
+    """
+    if data[:2] == b"{}":
+        return {}
+    if data[:2] != b"{\n":
+        return None
+    sections = {}
+    section = None
+    start = None
+    itemId = NO_ID
+    for match in _LAYOUT.finditer(data):
+        key, itemStart, itemEnd, idText = match.groups()
+        if key is not None:
+            section = sections[fastjson.Loads(key)] = _Section()
+            start = None
+        elif section is None:
+            continue
+        elif itemStart is not None:
+            start = match.start(2)
+            itemId = NO_ID
+        elif (itemEnd is not None) and (start is not None):
+            section.ids.append(itemId)
+            section.starts.append(start)
+            section.ends.append(match.end(3))
+            start = None
+        elif (idText is not None) and (start is not None):
+            itemId = int(idText)
+    if not sections:
+        # Not even one section found: a file with other line endings or indentation
+        return None
+    for section in sections.values():
+        section.Sort()
+    return sections
+
+def IndexFileName(fileName):
+    return fileName + ".idx"
+
+def _ReadIndex(indexFileName, stat):
+    """ Load a saved index, or None if there isn't one for this version of the file.
+    """
+    try:
+        with open(indexFileName, 'rb') as infile:
+            header = fastjson.Loads(infile.readline())
+            if (header.get('version') != INDEX_VERSION) or (header.get('size') != stat.st_size) or \
+               (header.get('mtime') != stat.st_mtime_ns) or (header.get('byteorder') != sys.byteorder):
+                return None
+            sections = {}
+            for key, count in header['sections']:
+                arrays = []
+                for _ in range(5):
+                    arr = array('q')
+                    arr.frombytes(infile.read(count * arr.itemsize))
+                    if len(arr) != count:
+                        return None
+                    arrays.append(arr)
+                sections[key] = _Section(*arrays)
+            return sections
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+def _WriteIndex(indexFileName, stat, sections):
+    header = {'version': INDEX_VERSION, 'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'byteorder': sys.byteorder,
+              'sections': [[key, len(section.ids)] for key, section in sections.items()]}
+    try:
+        # Write to a temp file and rename, so a reader never sees a partial index
+        with open(indexFileName + ".tmp", 'wb') as outfile:
+            outfile.write(fastjson.Dumps(header).encode('utf-8') + b"\n")
+            for section in sections.values():
+                for arr in section.Arrays():
+                    outfile.write(arr.tobytes())
+        os.replace(indexFileName + ".tmp", indexFileName)
+    except OSError:
+        # A read-only directory: the index just isn't kept
+        pass
+
+class ExportReader:
+    """ Reads items from a JADataExtractor output file by section and id, decoding only
+        the items asked for.
+    """
+    def __init__(self, fileName, saveIndex=True):
+        self.fileName = fileName
+        self._file = open(fileName, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._map = None
+        self._data = None
+        self.sections = None
+        if stat.st_size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.sections = _ReadIndex(IndexFileName(fileName), stat)
+            if self.sections is None:
+                self.sections = ScanLayout(self._map)
+                if (self.sections is not None) and saveIndex:
+                    _WriteIndex(IndexFileName(fileName), stat, self.sections)
+        if self.sections is None:
+            # Not a layout the index understands: load the whole file
+            print("Loading all of " + fileName + " (it isn't in the export layout)")
+            self._data = fastjson.Loads(self._map[:] if self._map is not None else b"")
+            self.sections = {key: None for key, value in self._data.items() if isinstance(value, list)}
+
+    def Sections(self):
+        return list(self.sections)
+
+    def Count(self, section):
+        if self._data is not None:
+            return len(self._data.get(section) or [])
+        return len(self.sections[section].ids) if section in self.sections else 0
+
+    def Ids(self, section):
+        """ The ids of the items in a section, in file order (NO_ID for an item without one).
+        """
+        if self._data is not None:
+            return [item.get('id', NO_ID) if isinstance(item, dict) else NO_ID for item in self._data.get(section) or []]
+        return list(self.sections[section].ids) if section in self.sections else []
+
+    def _Decode(self, section, row):
+        return fastjson.Loads(self._map[section.starts[row]:section.ends[row]])
+
+    def Get(self, section, id, default=None):
+        """ Return the item of the section with the given id (the first in the file, if
+            there are several), or default if there isn't one.
+        """
+        if self._data is not None:
+            for item in self._data.get(section) or []:
+                if isinstance(item, dict) and item.get('id') == id:
+                    return item
+            return default
+        where = self.sections.get(section)
+        if where is None:
+            return default
+        pos = bisect.bisect_left(where.sortedIds, id)
+        if (pos == len(where.sortedIds)) or (where.sortedIds[pos] != id):
+            return default
+        return self._Decode(where, where.sortedRows[pos])
+
+    def Items(self, section):
+        """ Generator yielding the items of a section in file order, one at a time.
+        """
+        if self._data is not None:
+            for item in self._data.get(section) or []:
+                yield item
+            return
+        where = self.sections.get(section)
+        if where is None:
+            return
+        for row in range(len(where.ids)):
+            yield self._Decode(where, row)
+
+    def Close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+def Benchmark(fileName, section, id):
+    """ Time a full load of an export file against opening it with ExportReader (with and
+        without a saved index) and looking up one item, and check they agree.
+    """
+    start = time.time()
+    with open(fileName, 'rb') as infile:
+        data = fastjson.Loads(infile.read())
+    expected = next((item for item in data.get(section, []) if item.get('id') == id), None)
+    loadTime = time.time() - start
+    print("  full load:            " + str(round(loadTime * 1000, 1)) + "ms")
+    del data
+
+    if os.path.exists(IndexFileName(fileName)):
+        os.remove(IndexFileName(fileName))
+    for name in ("building the index", "with the saved index"):
+        start = time.time()
+        with ExportReader(fileName) as reader:
+            item = reader.Get(section, id)
+        lookupTime = time.time() - start
+        print("  " + (name + ":").ljust(22) + str(round(lookupTime * 1000, 1)) + "ms (" +
+              ("same item" if item == expected else "DIFFERENT ITEM") + ")")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python exportindex.py <export file> <section> <id>")
+    else:
+        Benchmark(sys.argv[1], sys.argv[2], int(sys.argv[3]))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+#
+# fastjson.py
+#
+# JSON decode and encode through the fastest library that is installed: orjson, simdjson
+# (pysimdjson) or ujson, falling back to the standard json module.  None of them is required.
+#
+#   Loads / Load / ResponseJson   decode; any value a fast library can't read exactly the
+#                                 way json.loads would (integers wider than 64 bits, NaN,
+#                                 lone surrogates) is decoded with json instead
+#   Dumps / Dump                  compact encoding (spill files, caches, request bodies); the
+#                                 text may differ from json.dumps but decodes to the same value
+#                                 (except NaN and infinity, which the API never returns, and
+#                                 which orjson writes as null)
+#   DumpsPretty / DumpPretty      the export format, indent=4 and sort_keys; always the same
+#                                 text as json.dumps(value, indent=4, sort_keys=True)
+#
+# python fastjson.py [items] compares the backends on 100-item pages and a whole export.
+
+import gc
+import json
+import re
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Runs of digits this long may be integers that orjson would turn into floats.  Found by
+# turning every digit into '0' and everything else into ' ', which is much quicker than a regex.
+_DIGITS_ONLY = bytes(ord('0') if chr(i).isdigit() and i < 128 else ord(' ') for i in range(256))
+_LONG_NUMBER = b'0' * 19
+# Floats with an exponent, which ujson writes differently (1.5e-7 rather than 1.5e-07)
+_EXPONENT = re.compile(r'[0-9][eE][-+]?[0-9]')
+
+def _OrjsonLoads(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    if _LONG_NUMBER in data.translate(_DIGITS_ONLY):
+        return json.loads(data)
+    return orjson.loads(data)
+
+def _UjsonPretty(value):
+    # Check the compact text first: floats with exponents (or anything that looks like one
+    # inside a string) go to json, so the output never differs
+    if _EXPONENT.search(ujson.dumps(value, ensure_ascii=True)):
+        return json.dumps(value, indent=4, sort_keys=True)
+    return ujson.dumps(value, indent=4, sort_keys=True, ensure_ascii=True, escape_forward_slashes=False)
+
+def _UjsonPrettyWorks():
+    """ True if this version of ujson writes the export format exactly as json does.
+    """
+    sample = {'b': [1, 2.5, 0.1, -0.0, True, False, None, "é/ \x01\"\\ ", [], {}, 2 ** 70],
+              'a': {'x': [{'y': 1, 'z': "text"}], 'empty': ""}}
+    try:
+        return _UjsonPretty(sample) == json.dumps(sample, indent=4, sort_keys=True)
+    except Exception:
+        return False
+
+def _Backends():
+    """ (name, loads) for decoding, (name, dumps) for compact and pretty encoding, of each
+        installed library, fastest first.
+    """
+    decoders = []
+    encoders = []
+    pretty = []
+    if orjson is not None:
+        decoders.append(('orjson', _OrjsonLoads))
+        encoders.append(('orjson', lambda value: orjson.dumps(value).decode('utf-8')))
+    if simdjson is not None:
+        decoders.append(('simdjson', simdjson.loads))
+    if ujson is not None:
+        decoders.append(('ujson', ujson.loads))
+        encoders.append(('ujson', lambda value: ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False)))
+        if _UjsonPrettyWorks():
+            pretty.append(('ujson', _UjsonPretty))
+    decoders.append(('json', json.loads))
+    encoders.append(('json', json.dumps))
+    pretty.append(('json', lambda value: json.dumps(value, indent=4, sort_keys=True)))
+    return decoders, encoders, pretty
+
+DECODERS, ENCODERS, PRETTY_ENCODERS = _Backends()
+_decoder = DECODERS[0]
+_encoder = ENCODERS[0]
+_prettyEncoder = PRETTY_ENCODERS[0]
+
+def _Pick(backends, name):
+    for backend in backends:
+        if backend[0] == name:
+            return backend
+    return backends[-1]
+
+def Use(name):
+    """ Use the named library ('orjson', 'simdjson', 'ujson' or 'json') wherever it is
+        available, and json for the rest.
+    """
+    global _decoder, _encoder, _prettyEncoder
+    _decoder = _Pick(DECODERS, name)
+    _encoder = _Pick(ENCODERS, name)
+    _prettyEncoder = _Pick(PRETTY_ENCODERS, name)
+
+def Backend():
+    """ The names of the libraries in use: (decode, encode, pretty encode).
+    """
+    return (_decoder[0], _encoder[0], _prettyEncoder[0])
+
+def Loads(data):
+    """ Decode JSON text (str or bytes).
+    """
+    try:
+        return _decoder[1](data)
+    except Exception:
+        # Let json decide, and raise its usual error if the text really is bad
+        return json.loads(data)
+
+def Load(infile):
+    return Loads(infile.read())
+
+def ResponseJson(response):
+    """ Same as response.json() for a requests response, but through Loads.
+    """
+    return Loads(response.content)
+
+def Dumps(value):
+    """ Encode a value as compact JSON text.
+    """
+    try:
+        return _encoder[1](value)
+    except Exception:
+        return json.dumps(value)
+
+def Dump(value, outfile):
+    outfile.write(Dumps(value))
+
+def DumpsPretty(value):
+    """ Same text as json.dumps(value, indent=4, sort_keys=True).
+    """
+    try:
+        return _prettyEncoder[1](value)
+    except Exception:
+        return json.dumps(value, indent=4, sort_keys=True)
+
+def DumpPretty(value, outfile):
+    outfile.write(DumpsPretty(value))
+
+def Benchmark(count=100000):
+    """ Time decoding 100-item pages and encoding a whole export in the export format with
+        each installed library, and check that each one gives the same result as json.
+    """
+    import compact
+    pages = compact.SyntheticPages(count)
+    pageBytes = [page.encode('utf-8') for page in pages]
+    expectedItems = [json.loads(page) for page in pages]
+    export = {'_version': "10.123.4", 'stories': [item for page in expectedItems for item in page]}
+    print("Decoding " + str(len(pages)) + " pages of 100 stories, and encoding them as one export...")
+
+    expectedText = None
+    for name in [name for name, _ in DECODERS][::-1]:
+        Use(name)
+        # Keep the collector from charging one library for the objects made by another
+        gc.collect()
+        gc.disable()
+        start = time.time()
+        decoded = [Loads(page) for page in pageBytes]
+        decodeTime = time.time() - start
+        start = time.time()
+        text = DumpsPretty(export)
+        encodeTime = time.time() - start
+        gc.enable()
+        if expectedText is None:
+            expectedText = text
+        print("  " + name.ljust(9) + " decode " + str(round(decodeTime, 3)) + "s (" + ("same" if decoded == expectedItems else "DIFFERENT") +
+              "), export " + str(round(encodeTime, 3)) + "s with " + Backend()[2] + " (" +
+              ("same text" if text == expectedText else "DIFFERENT TEXT") + ")")
+    Use(DECODERS[0][0])
+
+if __name__ == "__main__":
+    Benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+#
+# hierarchy.py
+#
+# Parent/child index over the work hierarchy: epics -> capabilities -> features -> stories ->
+# tasks.  The items are numbered as nodes, and the links are kept in flat arrays: the parent
+# node of each node, and a CSR (compressed sparse row) child list, where the children of node
+# n are childList[childStart[n]:childStart[n + 1]].  Children-of and parent-of are a slice and
+# an array lookup, ancestors-of is at most one step per level, and a whole tree walk touches
+# each node once, so 10^6 items can be indexed and walked in a few seconds.
+#
+# Works on anything shaped like ReadAllItems output, including the "items" file written by
+# JADataExtractor:  hierarchy.Hierarchy(json.load(open('JiraAlign_item_data.json')))
+
+from array import array
+
+import common
+
+# The levels of the hierarchy, top down
+LEVELS = ['epics', 'capabilities', 'features', 'stories', 'tasks']
+
+# For each level below the top: (field holding a parent's ID, level that ID is on) pairs, in
+# the order they are tried.  Each field only ever names items of one level, since IDs are only
+# unique within one item type.  A feature's parent is its capability (capabilityId), or its
+# epic (parentId) if it isn't in a capability.
+PARENT_FIELDS = {
+    'capabilities': [('parentId', 'epics')],
+    'features': [('capabilityId', 'capabilities'), ('parentId', 'epics')],
+    'stories': [('featureId', 'features')],
+    'tasks': [('storyId', 'stories')],
+}
+
+# Maximum number of records to read in for each level by FromJiraAlign
+MAX = 1000000
+
+class Hierarchy:
+    """ Parent/child index over the work items.  Items are identified by (which, id), e.g.
+        ('features', 1234), since IDs are only unique within one item type.
+
+    Args:
+        itemsByType: dict of endpoint -> list of items, e.g. {'epics': [...], 'features': [...]}.
+                     Keys other than the ones in levels are ignored.
+        levels: The item types to index, top down
+        parentFields: For each level, the (parent ID field, parent level) pairs to try
+    """
+    def __init__(self, itemsByType, levels=LEVELS, parentFields=PARENT_FIELDS):
+        self.levels = [which for which in levels if which in itemsByType]
+        # Per node: its level (index into self.levels), its ID and its item
+        self.levelOf = array('b')
+        self.ids = array('q')
+        self.items = []
+        # (which, id) -> node
+        self.nodeOf = {}
+        for level, which in enumerate(self.levels):
+            for item in itemsByType[which]:
+                if 'id' not in item:
+                    continue
+                key = (which, item['id'])
+                if key in self.nodeOf:
+                    continue
+                self.nodeOf[key] = len(self.items)
+                self.levelOf.append(level)
+                self.ids.append(item['id'])
+                self.items.append(item)
+        count = len(self.items)
+
+        # Parent of each node, or -1 for a root (or an item whose parent wasn't read in)
+        self.parent = array('q', [-1]) * count
+        # Number of items that name a parent that isn't in the index
+        self.orphans = 0
+        nodeOf = self.nodeOf
+        for node in range(count):
+            which = self.levels[self.levelOf[node]]
+            if which not in parentFields:
+                continue
+            item = self.items[node]
+            namesParent = False
+            for field, parentWhich in parentFields[which]:
+                parentId = item.get(field)
+                if parentId is None:
+                    continue
+                namesParent = True
+                parentNode = nodeOf.get((parentWhich, parentId))
+                if parentNode is not None:
+                    self.parent[node] = parentNode
+                    break
+            else:
+                if namesParent:
+                    self.orphans += 1
+
+        # CSR child lists: count the children of each node, turn the counts into start
+        # offsets, then drop each child into its parent's slot
+        self.childStart = array('q', [0]) * (count + 1)
+        for node in range(count):
+            parentNode = self.parent[node]
+            if parentNode >= 0:
+                self.childStart[parentNode + 1] += 1
+        for node in range(count):
+            self.childStart[node + 1] += self.childStart[node]
+        self.childList = array('q', [0]) * self.childStart[count]
+        fill = array('q', self.childStart[:count])
+        for node in range(count):
+            parentNode = self.parent[node]
+            if parentNode >= 0:
+                self.childList[fill[parentNode]] = node
+                fill[parentNode] += 1
+
+    def __len__(self):
+        return len(self.items)
+
+    def Node(self, which, id):
+        """ Return the node number of the given item, or None if it isn't in the index.
+        """
+        return self.nodeOf.get((which, id))
+
+    def Key(self, node):
+        """ Return (which, id) for the given node number.
+        """
+        return (self.levels[self.levelOf[node]], self.ids[node])
+
+    def Item(self, which, id):
+        """ Return the item with the given type and ID, or None if it isn't in the index.
+        """
+        node = self.Node(which, id)
+        if node is None:
+            return None
+        return self.items[node]
+
+    def Parent(self, which, id):
+        """ Return (which, id) of the item's parent, or None if it is a root.
+        """
+        node = self.Node(which, id)
+        if (node is None) or (self.parent[node] < 0):
+            return None
+        return self.Key(self.parent[node])
+
+    def Children(self, which, id):
+        """ Return (which, id) of each of the item's direct children.
+        """
+        node = self.Node(which, id)
+        if node is None:
+            return []
+        return [self.Key(child) for child in self.childList[self.childStart[node]:self.childStart[node + 1]]]
+
+    def Ancestors(self, which, id):
+        """ Return (which, id) of the item's parent, grandparent, etc., nearest first.
+        """
+        node = self.Node(which, id)
+        ancestors = []
+        if node is None:
+            return ancestors
+        node = self.parent[node]
+        while node >= 0:
+            ancestors.append(self.Key(node))
+            node = self.parent[node]
+        return ancestors
+
+    def Roots(self):
+        """ Return (which, id) of each item that has no parent in the index.
+        """
+        return [self.Key(node) for node in range(len(self.items)) if self.parent[node] < 0]
+
+    def WalkNodes(self, node=None):
+        """ Generate (depth, node) for the given node and everything under it, parents
+            before their children.  With no node, every tree in the index is walked.
+        """
+        if node is None:
+            starts = [n for n in range(len(self.items)) if self.parent[n] < 0]
+        else:
+            starts = [node]
+        childStart = self.childStart
+        childList = self.childList
+        for start in starts:
+            stack = [(0, start)]
+            while stack:
+                depth, current = stack.pop()
+                yield depth, current
+                # Pushed in reverse so they come off the stack in their original order
+                for i in range(childStart[current + 1] - 1, childStart[current] - 1, -1):
+                    stack.append((depth + 1, childList[i]))
+
+    def Descendants(self, which, id):
+        """ Generate (depth, (which, id)) for everything under the given item, parents
+            before their children.  The item itself is not included.
+        """
+        node = self.Node(which, id)
+        if node is None:
+            return
+        for depth, descendant in self.WalkNodes(node):
+            if descendant != node:
+                yield depth, self.Key(descendant)
+
+    def Walk(self):
+        """ Generate (depth, (which, id)) for every item in the index, one tree at a time,
+            parents before their children.
+        """
+        for depth, node in self.WalkNodes():
+            yield depth, self.Key(node)
+
+def FromJiraAlign(maxToRead=MAX, levels=LEVELS):
+    """ Read every level of the hierarchy from Jira Align and index it.
+    """
+    itemsByType = {}
+    for which in levels:
+        itemsByType[which] = common.ReadAllItems(which, maxToRead)
+    return Hierarchy(itemsByType, levels)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+#
+# importer.py
+#
+# Loads a JADataExtractor snapshot into another instance.  Items are created tier by tier in
+# dependency order (regions, cities, programs, teams, releases, epics, capabilities, features,
+# stories, tasks), with the POSTs in each tier made in parallel.  Before an item is POSTed, its
+# references to items created earlier (programId, releaseIds, featureId, parentId, ...) are
+# changed from the old instance's IDs to the new ones.
+#
+# Every old -> new ID is appended to a journal file as soon as the item is created, so an
+# interrupted import can simply be run again: items already in the journal are skipped.
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of POSTs to have in flight at once within a tier
+MAX_PARALLEL_POSTS = 8
+
+HEADER = {'Content-Type': 'application/json;odata.metadata=minimal;odata.streaming=true'}
+
+# The order items are created in: (key in the export, export file, endpoint to POST to).
+# Each tier only refers to tiers before it.
+TIERS = [
+    ('regions', 'config', 'regions'),
+    ('cities', 'config', 'cities'),
+    ('programs', 'config', 'programs'),
+    ('teams', 'config', 'teams'),
+    ('releases', 'config', 'releases'),
+    ('epics', 'items', 'epics'),
+    ('capabilities', 'items', 'capabilities'),
+    ('features', 'items', 'features'),
+    ('stories', 'items', 'stories'),
+    ('tasks', 'items', 'tasks'),
+]
+
+# Fields holding the ID (or list of IDs) of another imported item, and the export key of
+# the item they refer to.  Each field refers to exactly one item type, since IDs are only
+# unique within a type: a capability's or feature's parentId is its epic, and a feature's
+# capability is in capabilityId.  Any other field named ...Id or ...Ids refers to something that isn't imported (users,
+# iterations, themes, goals, ...), so it is left out rather than sent with an ID that means
+# something else in the new instance.
+REFERENCES = {
+    'regionId': 'regions',
+    'regionIds': 'regions',
+    'cityId': 'cities',
+    'programId': 'programs',
+    'primaryProgramId': 'programs',
+    'programIds': 'programs',
+    'additionalProgramIds': 'programs',
+    'teamId': 'teams',
+    'teamIds': 'teams',
+    'releaseId': 'releases',
+    'releaseIds': 'releases',
+    'parentId': 'epics',
+    'epicId': 'epics',
+    'epicIds': 'epics',
+    'capabilityId': 'capabilities',
+    'capabilityIds': 'capabilities',
+    'featureId': 'features',
+    'featureIds': 'features',
+    'storyId': 'stories',
+    'storyIds': 'stories',
+}
+
+# Item types whose parentId is an epic; any other parentId isn't imported
+PARENT_ID_TYPES = {'capabilities', 'features'}
+
+# Fields that belong to the old item and are never sent
+DROP_FIELDS = {'id', 'self', 'itemtype', 'createDate', 'createdBy', 'lastUpdatedDate', 'lastUpdatedBy',
+               'isRecycled', 'externalKey', 'externalId', 'itemToSyncDate'}
+
+def NewIdFrom(response):
+    """ Return the ID of the item a successful POST created, or None if it can't be found.
+    """
+    text = response.text.strip().strip('"')
+    if text.isdigit():
+        return int(text)
+    try:
+        body = json.loads(response.text)
+    except ValueError:
+        return None
+    if isinstance(body, dict) and isinstance(body.get('id'), int):
+        return body['id']
+    return None
+
+class IdMap:
+    """ The old -> new ID of every item created so far, per export key, backed by an
+        append-only journal file (one JSON object per line).  The new ID is None for an
+        item that was created but whose ID wasn't in the response.  Safe to use from
+        several threads.
+    """
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.ids = {}
+        self._lock = threading.Lock()
+        if os.path.exists(fileName):
+            with open(fileName, 'r') as infile:
+                for line in infile:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short when the last run was interrupted
+                        continue
+                    self.ids.setdefault(entry['which'], {})[entry['old']] = entry['new']
+        self._journal = open(fileName, 'a')
+
+    def Get(self, which, oldId):
+        return self.ids.get(which, {}).get(oldId)
+
+    def Has(self, which, oldId):
+        """ True if the item has been created, even if its new ID isn't known.
+        """
+        return oldId in self.ids.get(which, {})
+
+    def Add(self, which, oldId, newId):
+        with self._lock:
+            self.ids.setdefault(which, {})[oldId] = newId
+            self._journal.write(json.dumps({'which': which, 'old': oldId, 'new': newId}) + "\n")
+            self._journal.flush()
+
+    def Count(self, which=None):
+        if which is not None:
+            return len(self.ids.get(which, {}))
+        return sum(len(ids) for ids in self.ids.values())
+
+    def Close(self):
+        self._journal.close()
+
+def RemapItem(which, item, idMap, dropFields=DROP_FIELDS):
+    """ Return the body to POST for an exported item: its own fields dropped, and its
+        references changed to the new instance's IDs.  A reference to an item that
+        wasn't created is left out, as is any other ...Id / ...Ids field.
+
+    Returns:
+        (body, list of the fields that were left out)
+    """
+    body = {}
+    missing = []
+    for field, value in item.items():
+        if field in dropFields:
+            continue
+        if (field in REFERENCES) and ((field != 'parentId') or (which in PARENT_ID_TYPES)):
+            target = REFERENCES[field]
+        elif field.endswith('Id') or field.endswith('Ids'):
+            missing.append(field + " (not imported)")
+            continue
+        else:
+            body[field] = value
+            continue
+        if isinstance(value, list):
+            newIds = []
+            for oldId in value:
+                newId = idMap.Get(target, oldId)
+                if newId is None:
+                    missing.append(field + "=" + str(oldId))
+                else:
+                    newIds.append(newId)
+            body[field] = newIds
+        else:
+            newId = idMap.Get(target, value)
+            if newId is None:
+                missing.append(field + "=" + str(value))
+            else:
+                body[field] = newId
+    return body, missing
+
+def ImportSnapshot(aClient, configData, itemData, idMapFileName, reportFileName, tiers=TIERS, dryRun=False):
+    """ Create every item of the snapshot in the client's instance, tier by tier.
+
+    Args:
+        aClient: The JiraAlignClient for the instance to load into
+        configData: The configuration export (JiraAlign_config_data.json)
+        itemData: The item export (JiraAlign_item_data.json)
+        idMapFileName: The old -> new ID journal; items already in it are skipped
+        reportFileName: Where to write the outcome of every item that was tried
+        tiers: The tiers to load, in order
+        dryRun: If True, nothing is POSTed; the report shows what would be sent
+
+    Returns:
+        dict of export key -> {'created', 'skipped', 'failed'} counts
+    """
+    data = {'config': configData, 'items': itemData}
+    idMap = IdMap(idMapFileName)
+    report = []
+    summary = {}
+    try:
+        for key, fileKey, endpoint in tiers:
+            items = data[fileKey].get(key) or []
+            todo = [item for item in items if ('id' in item) and not idMap.Has(key, item['id'])]
+            counts = {'created': 0, 'skipped': len(items) - len(todo), 'failed': 0}
+            summary[key] = counts
+            print("Importing " + str(len(todo)) + " " + key + " (" + str(counts['skipped']) + " already done)...")
+            url = aClient.instanceurl + "/" + endpoint
+
+            def CreateOne(item):
+                body, missing = RemapItem(key, item, idMap)
+                result = {'which': key, 'oldId': item['id'], 'newId': None, 'outcome': None,
+                          'detail': ("left out " + ", ".join(missing)) if missing else ""}
+                if dryRun:
+                    result['outcome'] = 'dry run'
+                    return result
+                try:
+                    response = aClient.Post(HEADER, body, True, True, url)
+                except Exception as e:
+                    result['outcome'] = 'failed'
+                    result['detail'] = str(e)
+                    return result
+                if response.status_code not in (200, 201):
+                    result['outcome'] = 'failed'
+                    result['detail'] = (str(response.status_code) + " " + response.text + " " + result['detail']).strip()
+                    return result
+                # The item was created even if its new ID can't be found in the response, so
+                # it is journaled either way and a re-run doesn't create it again; items that
+                # refer to it will leave that reference out
+                newId = NewIdFrom(response)
+                if newId is None:
+                    result['detail'] = ("new ID unknown: " + response.text + " " + result['detail']).strip()
+                idMap.Add(key, item['id'], newId)
+                result['newId'] = newId
+                result['outcome'] = 'created'
+                return result
+
+            with ThreadPoolExecutor(max_workers=MAX_PARALLEL_POSTS) as pool:
+                for result in pool.map(CreateOne, todo):
+                    report.append(result)
+                    if result['outcome'] == 'created':
+                        counts['created'] += 1
+                    elif result['outcome'] == 'failed':
+                        counts['failed'] += 1
+            print("  " + key + ": " + str(counts['created']) + " created, " + str(counts['failed']) + " failed")
+    finally:
+        idMap.Close()
+        with open(reportFileName, 'w') as outfile:
+            json.dump(report, outfile, indent=4, sort_keys=True)
+    return summary
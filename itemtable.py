@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+#
+# itemtable.py
+#
+# Columnar table of the fields the scripts select work items on (id, programId, state,
+# releaseId, acceptedDate, effortPoints), with predicates that are evaluated over a whole
+# column at once and combined as masks:
+#
+#   table = itemtable.ItemTable(storyArray)
+#   mask = ~table.Has('releaseId') & table.Eq('programId', 12) & table.Eq('state', 5)
+#   for row in mask.Rows(): ... table.items[row] ...
+#
+# The columns are NumPy arrays if NumPy is installed, otherwise array module arrays.  Without
+# NumPy a mask is a Python int holding one byte per row, so &, | and ~ are still single
+# operations over the whole table.
+
+import datetime
+import operator
+from array import array
+from itertools import compress, repeat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Value stored in an int column when the item doesn't have the field
+MISSING = -1
+
+# Day 0 of the date columns
+EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+# The columns in a table: field -> array typecode.  Dates are stored as days since 1970-01-01.
+COLUMNS = {
+    'id': 'q',
+    'programId': 'q',
+    'state': 'q',
+    'releaseId': 'q',
+    'acceptedDate': 'q',
+    'effortPoints': 'd',
+}
+DATE_COLUMNS = {'acceptedDate'}
+
+def EpochDay(dateStr):
+    """ Turn an ISO date string (e.g. 2023-05-01 or 2023-05-01T12:00:00Z) into days
+        since 1970-01-01.  MISSING if there is no date.
+    """
+    if not dateStr:
+        return MISSING
+    return datetime.date(int(dateStr[0:4]), int(dateStr[5:7]), int(dateStr[8:10])).toordinal() - EPOCH
+
+def YearRange(firstYear, lastYear):
+    """ Return (first day, day after the last day) of the given years, as epoch days,
+        for use with Between.
+    """
+    return (datetime.date(firstYear, 1, 1).toordinal() - EPOCH,
+            datetime.date(lastYear + 1, 1, 1).toordinal() - EPOCH)
+
+class Mask:
+    """ The rows of an ItemTable that a predicate is true for.  Combine masks with
+        & (and), | (or) and ~ (not).
+    """
+    def __init__(self, table, data):
+        self.table = table
+        # A NumPy bool array, or an int with byte i set to 1 if row i is selected
+        self.data = data
+
+    def __and__(self, other):
+        return Mask(self.table, self.data & other.data)
+
+    def __or__(self, other):
+        return Mask(self.table, self.data | other.data)
+
+    def __invert__(self):
+        if numpy is not None:
+            return Mask(self.table, ~self.data)
+        return Mask(self.table, self.data ^ self.table._allRows)
+
+    def _Flags(self):
+        if numpy is not None:
+            return self.data
+        return self.data.to_bytes(len(self.table), 'little')
+
+    def Rows(self):
+        """ Return the selected row numbers, in order.
+        """
+        if numpy is not None:
+            return numpy.flatnonzero(self.data).tolist()
+        return list(compress(range(len(self.table)), self._Flags()))
+
+    def Count(self):
+        """ Return the number of selected rows.
+        """
+        if numpy is not None:
+            return int(numpy.count_nonzero(self.data))
+        return self._Flags().count(1)
+
+    def Items(self):
+        """ Return the selected items, in order.
+        """
+        items = self.table.items
+        return [items[row] for row in self.Rows()]
+
+class ItemTable:
+    """ Typed columns over a list of extracted items (as returned by ReadAllItems).  The
+        items themselves are kept in self.items, so row n of every column is self.items[n].
+    """
+    def __init__(self, items):
+        self.items = items
+        self.columns = {}
+        for field, typecode in COLUMNS.items():
+            if field in DATE_COLUMNS:
+                column = array(typecode, [EpochDay(item.get(field)) for item in items])
+            elif typecode == 'd':
+                column = array(typecode, [item.get(field) or 0 for item in items])
+            else:
+                column = array(typecode, [item.get(field, MISSING) for item in items])
+            if numpy is not None:
+                column = numpy.frombuffer(column, dtype=numpy.int64 if typecode == 'q' else numpy.float64)
+            self.columns[field] = column
+        if numpy is None:
+            self._allRows = int.from_bytes(b'\x01' * len(items), 'little')
+
+    def __len__(self):
+        return len(self.items)
+
+    def _Mask(self, field, compare, operand):
+        # compare is an operator module function, so that both paths run it in C: once over
+        # the whole NumPy column, or once per row via map
+        column = self.columns[field]
+        if numpy is not None:
+            return Mask(self, compare(column, operand))
+        return Mask(self, int.from_bytes(bytes(map(compare, column, repeat(operand))), 'little'))
+
+    def All(self):
+        """ Mask selecting every row.
+        """
+        if numpy is not None:
+            return Mask(self, numpy.ones(len(self.items), dtype=bool))
+        return Mask(self, self._allRows)
+
+    def Eq(self, field, value):
+        """ Mask of the rows where the field equals the value.
+        """
+        return self._Mask(field, operator.eq, value)
+
+    def In(self, field, values):
+        """ Mask of the rows where the field is one of the values.
+        """
+        column = self.columns[field]
+        if numpy is not None:
+            return Mask(self, numpy.isin(column, list(values)))
+        return Mask(self, int.from_bytes(bytes(map(set(values).__contains__, column)), 'little'))
+
+    def Has(self, field):
+        """ Mask of the rows whose item has the field.  Not meaningful for effortPoints,
+            where a missing value is stored as 0.
+        """
+        return self._Mask(field, operator.ne, MISSING)
+
+    def Between(self, field, low, high):
+        """ Mask of the rows where low <= field < high.  For dates, low and high are
+            epoch days (see EpochDay and YearRange).
+        """
+        return self._Mask(field, operator.ge, low) & self._Mask(field, operator.lt, high)
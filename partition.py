@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+#
+# partition.py
+#
+# Parallel crawl of one very large endpoint (or one very large Program), by splitting it into
+# createDate ranges (or id ranges) and reading the ranges at the same time, each with its own
+# "$filter=createDate ge X and createDate lt Y" paging.  A range that turns out to hold more than
+# SPLIT_PAGES pages is split in half, and the halves are crawled instead, so the work evens out
+# however the items are spread over time.  The results are merged and de-duplicated by id.
+#
+# With the default createDate range, the items dated outside it and the items with no createDate
+# are read as well, so the result holds every item ReadAllItems would return.
+# JADataExtractor --partition reads the item sections this way.
+
+import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import client
+import common
+import fastjson
+
+# Number of ranges to start with
+PARTITIONS = 8
+# Number of ranges to read at once
+MAX_PARALLEL_PARTITIONS = 8
+# A range that needs more pages than this is split in half (unless it can't be split)
+SPLIT_PAGES = 20
+# Default createDate range to crawl: from this date to tomorrow
+FIRST_DATE = datetime.datetime(2010, 1, 1, tzinfo=datetime.timezone.utc)
+
+def _Literal(field, value):
+    if field == 'id':
+        return str(value)
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _Split(field, low, high):
+    """ Return the midpoint of [low, high), or None if the range can't be split.
+    """
+    if field == 'id':
+        middle = (low + high) // 2
+    else:
+        middle = low + (high - low) / 2
+        middle = middle.replace(microsecond=0)
+    if (middle <= low) or (middle >= high):
+        return None
+    return middle
+
+def FilterUrl(aClient, which, filterText, filterOnProgramID=None, skip=0):
+    """ Build the URL for one page of the items matching the given $filter text (with
+        spaces written as %20).
+    """
+    fullUrl = aClient.instanceurl + "/" + which + "?expand=true&%24filter=" + filterText
+    if filterOnProgramID is not None:
+        fullUrl = fullUrl + "%20and%20programId%20eq%20" + str(filterOnProgramID)
+    if skip != 0:
+        fullUrl = fullUrl + "&$skip=" + str(skip)
+    return fullUrl
+
+def RangeUrl(aClient, which, field, low, high, filterOnProgramID=None, skip=0):
+    """ Build the URL for one page of the items whose field is in [low, high).
+    """
+    return FilterUrl(aClient, which, field + "%20ge%20" + _Literal(field, low) + "%20and%20" +
+                     field + "%20lt%20" + _Literal(field, high), filterOnProgramID, skip)
+
+def ReadFiltered(aClient, which, filterText, filterOnProgramID=None):
+    """ Read all the items matching the given $filter text, page by page.
+    """
+    itemArr = []
+    skip = 0
+    while True:
+        Data = fastjson.ResponseJson(aClient.Get(True, FilterUrl(aClient, which, filterText, filterOnProgramID, skip)))
+        if Data is None:
+            break
+        for eachWorkItem in Data:
+            if not common.KeepItem(eachWorkItem, filterOnProgramID):
+                continue
+            thisItem = {}
+            common.ExtractItemData(which, eachWorkItem, thisItem)
+            itemArr.append(thisItem)
+        # If we got all the items, then there is nothing more to get
+        if len(Data) < client.PAGE_SIZE:
+            break
+        skip += client.PAGE_SIZE
+    return itemArr
+
+def ReadRange(aClient, which, field, low, high, filterOnProgramID=None, splitPages=SPLIT_PAGES):
+    """ Read the items whose field is in [low, high).
+
+    Returns:
+        (items, None) if the whole range was read, or (items read so far, midpoint) if it
+        needs more than splitPages pages and should be split at the midpoint instead
+    """
+    middle = _Split(field, low, high)
+    itemArr = []
+    skip = 0
+    pages = 0
+    while True:
+        Data = fastjson.ResponseJson(aClient.Get(True, RangeUrl(aClient, which, field, low, high, filterOnProgramID, skip)))
+        if Data is None:
+            break
+        for eachWorkItem in Data:
+            if not common.KeepItem(eachWorkItem, filterOnProgramID):
+                continue
+            thisItem = {}
+            common.ExtractItemData(which, eachWorkItem, thisItem)
+            itemArr.append(thisItem)
+        pages += 1
+        # If we got all the items, then there is nothing more to get
+        if len(Data) < client.PAGE_SIZE:
+            break
+        if (pages >= splitPages) and (middle is not None):
+            return itemArr, middle
+        skip += client.PAGE_SIZE
+    return itemArr, None
+
+def ReadAllItemsPartitioned(aClient, which, filterOnProgramID=None, field='createDate', low=None, high=None,
+                            partitions=PARTITIONS, maxWorkers=MAX_PARALLEL_PARTITIONS, splitPages=SPLIT_PAGES,
+                            maxToRead=None):
+    """ Read in all items of the given type, several ranges of createDate (or id) at once.
+        With the default createDate range, the items dated before or after it and the
+        items with no createDate are read too, so no item is missed.
+
+    Args:
+        aClient: The JiraAlignClient for the instance
+        which: Which type of work items to retrieve, e.g. stories
+        filterOnProgramID: If not None, only items in this Program
+        field: 'createDate', or 'id' to split on ID numbers
+        low, high: The range to crawl.  For createDate they default to FIRST_DATE and
+                   tomorrow; for id they must be given (high is one past the largest ID).
+        partitions: Number of equal ranges to start with
+        maxWorkers: Number of ranges to read at once
+        splitPages: Ranges that need more pages than this are split in half
+        maxToRead: If not None, only the items with the lowest maxToRead IDs are returned
+
+    Returns:
+        The extracted items, each ID once, sorted by id
+    """
+    # $filter texts for the items the ranges don't cover
+    outside = []
+    if field != 'id':
+        if (low is None) and (high is None):
+            low = FIRST_DATE
+            high = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)).replace(microsecond=0)
+            outside = [field + "%20eq%20null", field + "%20lt%20" + _Literal(field, low),
+                       field + "%20ge%20" + _Literal(field, high)]
+        low = low or FIRST_DATE
+        high = high or (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)).replace(microsecond=0)
+    elif (low is None) or (high is None):
+        raise ValueError("An id range needs low and high")
+
+    # Start with equal ranges
+    bounds = [low]
+    for n in range(1, partitions):
+        if field == 'id':
+            bounds.append(low + (high - low) * n // partitions)
+        else:
+            bounds.append((low + (high - low) * n / partitions).replace(microsecond=0))
+    bounds.append(high)
+    ranges = [(bounds[i], bounds[i + 1]) for i in range(partitions) if bounds[i] < bounds[i + 1]]
+
+    print("Collecting items of type " + which + " in " + str(len(ranges)) + " " + field + " ranges...")
+    byId = {}
+    splits = 0
+    with ThreadPoolExecutor(max_workers=maxWorkers) as pool:
+        outsideReads = [pool.submit(ReadFiltered, aClient, which, filterText, filterOnProgramID) for filterText in outside]
+        running = {pool.submit(ReadRange, aClient, which, field, rangeLow, rangeHigh, filterOnProgramID, splitPages):
+                   (rangeLow, rangeHigh) for rangeLow, rangeHigh in ranges}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                rangeLow, rangeHigh = running.pop(future)
+                itemArr, middle = future.result()
+                # Keep what was read either way; the halves will read it again, and
+                # duplicates are dropped by id
+                for item in itemArr:
+                    byId.setdefault(item['id'], item)
+                if middle is not None:
+                    splits += 1
+                    for newLow, newHigh in ((rangeLow, middle), (middle, rangeHigh)):
+                        running[pool.submit(ReadRange, aClient, which, field, newLow, newHigh,
+                                            filterOnProgramID, splitPages)] = (newLow, newHigh)
+        outsideCount = 0
+        for future in outsideReads:
+            for item in future.result():
+                outsideCount += 1
+                byId.setdefault(item['id'], item)
+
+    print('Loaded ' + str(len(byId)) + " items of type " + which + " (" + str(splits) + " ranges split, " +
+          str(outsideCount) + " outside the ranges)")
+    ids = sorted(byId)
+    if maxToRead is not None:
+        ids = ids[:maxToRead]
+    return [byId[id] for id in ids]
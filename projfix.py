@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+#
+# projfix.py
+#
+# Shared code for JAFeatureJiraProjFixer and JAStoryJiraProjFixer.  A work item created under
+# the wrong Jira Project is fixed by POSTing a copy of it with the right jiraProjectKey.
+# Batch mode reads a list of (itemId, programId, jiraProjectKey) entries, reads all the items
+# with ReadManyItems, and POSTs the copies in parallel.  FindProjectMismatches produces those
+# lists, by joining the items against the connector's Program -> Jira Project mappings.
+#
+# Each copy made is appended to a journal (<mapping file>.journal) as soon as it is created, so
+# an interrupted batch can simply be run again: items already in the journal aren't copied twice.
+
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cfg
+import common
+import daemon
+import importer
+
+# Number of copy POSTs to have in flight at once in batch mode
+MAX_PARALLEL_POSTS = 8
+
+HEADER = {'Content-Type': 'application/json;odata.metadata=minimal;odata.streaming=true'}
+
+def ReadBatchFile(fileName):
+    """ Read the list of items to fix from a CSV or JSON file.
+
+        A CSV file must have a header row with the columns itemId, programId and
+        jiraProjectKey.  A JSON file must hold a list of objects with the same keys.
+
+    Returns:
+        list of dicts with the keys itemId (int), programId (int) and jiraProjectKey
+    """
+    if fileName.lower().endswith(".json"):
+        with open(fileName, 'r') as infile:
+            rows = json.load(infile)
+    else:
+        with open(fileName, 'r', newline='') as infile:
+            rows = list(csv.DictReader(infile))
+    entries = []
+    for row in rows:
+        entries.append({'itemId': int(row['itemId']),
+                        'programId': int(row['programId']),
+                        'jiraProjectKey': row['jiraProjectKey'].strip()})
+    return entries
+
+def ProgramOf(item):
+    """ Return the Program ID of an extracted item.  Features keep it in primaryProgramId,
+        stories in programId.
+    """
+    if 'primaryProgramId' in item:
+        return item['primaryProgramId']
+    return item.get('programId')
+
+def ProjectOf(item):
+    """ Return the Jira Project key of an extracted item, or None if it isn't synced to Jira.
+        Uses jiraProjectKey if set, otherwise the prefix of the Jira issue key (externalKey).
+    """
+    if item.get('jiraProjectKey'):
+        return item['jiraProjectKey']
+    externalKey = item.get('externalKey')
+    if externalKey and ('-' in externalKey):
+        return externalKey.rsplit('-', 1)[0]
+    return None
+
+def FindProjectMismatches(connectorProjects, itemArr, noProgram=None):
+    """ Find every item whose Jira Project is not mapped to its Program by the connector.
+        This is a hash join: the connector projects are grouped by Program once, then each
+        item is checked with a single set lookup, so it is one pass over the items.
+
+    Args:
+        connectorProjects: The connector projects, as returned by common.GetAllConnectorProjects
+        itemArr: The features and/or stories, as returned by ReadAllItems
+        noProgram: If not None, a list that items synced to Jira but not in any Program are
+                   appended to (itemId, itemtype, currentProject).  They can't be fixed in
+                   batch mode, so they are never in the list returned.
+
+    Returns:
+        list of dicts in the ReadBatchFile format (itemId, programId, jiraProjectKey), plus
+        itemtype, currentProject and candidates.  jiraProjectKey is filled in only when the
+        Program maps to exactly one Jira Project; otherwise it is left for the user to pick
+        from the candidates.
+    """
+    projectsByProgram = {}
+    for project in connectorProjects:
+        projectsByProgram.setdefault(project['programId'], set()).add(project['projectKey'])
+
+    mismatches = []
+    for item in itemArr:
+        currentProject = ProjectOf(item)
+        if currentProject is None:
+            continue
+        programId = ProgramOf(item)
+        if programId is None:
+            if noProgram is not None:
+                noProgram.append({'itemId': item['id'],
+                                  'itemtype': item.get('itemtype', ''),
+                                  'currentProject': currentProject})
+            continue
+        mapped = projectsByProgram.get(programId, ())
+        if currentProject in mapped:
+            continue
+        candidates = sorted(mapped)
+        mismatches.append({'itemId': item['id'],
+                           'programId': programId,
+                           'jiraProjectKey': candidates[0] if len(candidates) == 1 else '',
+                           'itemtype': item.get('itemtype', ''),
+                           'currentProject': currentProject,
+                           'candidates': " ".join(candidates)})
+    return mismatches
+
+def WriteBatchFile(fileName, entries):
+    """ Write entries (e.g. from FindProjectMismatches) as a CSV that ReadBatchFile can read.
+        The file is read back with ReadBatchFile, and ValueError is raised if it doesn't
+        give the same itemId, programId and jiraProjectKey values.
+    """
+    fieldNames = ['itemId', 'programId', 'jiraProjectKey']
+    if entries:
+        fieldNames = fieldNames + [k for k in entries[0] if k not in fieldNames]
+    with open(fileName, 'w', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldNames)
+        writer.writeheader()
+        for entry in entries:
+            writer.writerow(entry)
+
+    expected = [{'itemId': e['itemId'], 'programId': e['programId'], 'jiraProjectKey': e['jiraProjectKey']}
+                for e in entries]
+    try:
+        readBack = ReadBatchFile(fileName)
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(fileName + " can't be read back as a batch file: " + str(e))
+    if readBack != expected:
+        raise ValueError(fileName + " doesn't read back as the entries written to it")
+
+def WriteNoProgramFile(fileName, entries):
+    """ Write the items FindProjectMismatches found without a Program as a CSV report.
+    """
+    with open(fileName, 'w', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=['itemId', 'itemtype', 'currentProject'])
+        writer.writeheader()
+        for entry in entries:
+            writer.writerow(entry)
+
+def CopyToJiraProject(endpoint, item, jiraProjectKey):
+    """ POST a copy of the given item, with its Jira Project changed.
+
+    Args:
+        endpoint: The endpoint to POST to, e.g. Features or Stories
+        item: The extracted item, as returned by ReadOneItem/ReadManyItems.  It is not changed.
+        jiraProjectKey: The Jira Project to use for the copy
+
+    Returns:
+        Response
+    """
+    # Create the POST data
+    body = dict(item)
+    # Clear some fields
+    body.pop('id', None)
+    body.pop('createDate', None)
+    body.pop('self', None)
+    body['jiraProjectKey'] = jiraProjectKey
+    return common.PostToJiraAlign(HEADER, body, True, True, cfg.instanceurl + "/" + endpoint)
+
+def RunBatch(which, endpoint, entries, mappingFileName, reportFileName):
+    """ Fix the Jira Project for every entry read in by ReadBatchFile.
+
+        Writes a JSON mapping of old item ID -> new item ID for the copies that were
+        made, and a CSV report with the outcome for every entry.  Every copy is journaled
+        as soon as it is made, and items in the journal from an earlier run are skipped.
+        An item listed more than once is only copied for its first entry.
+
+    Args:
+        which: The endpoint to read the items from, e.g. features or stories
+        endpoint: The endpoint to POST the copies to, e.g. Features or Stories
+        entries: The entries from ReadBatchFile
+        mappingFileName: Where to write the old -> new ID mapping
+        reportFileName: Where to write the per item report
+
+    Returns:
+        list of dicts, one per entry, with the keys of the entry plus outcome,
+        newId and detail
+    """
+    # Let the daemon do the work if it is running; the files are written where asked
+    if daemon.Available():
+        try:
+            return daemon.Call('fixproject', which=which, endpoint=endpoint, entries=entries,
+                               mappingFileName=os.path.abspath(mappingFileName),
+                               reportFileName=os.path.abspath(reportFileName))
+        except daemon.DaemonUnavailable:
+            pass
+    idMap = importer.IdMap(mappingFileName + ".journal")
+    # Each item once, in the order listed, leaving out the ones already copied
+    itemIds = [itemId for itemId in dict.fromkeys(entry['itemId'] for entry in entries)
+               if not idMap.Has(which, itemId)]
+    itemDict = common.ReadManyItems(which, itemIds)
+
+    results = []
+    toCopy = []
+    seen = set()
+    for entry in entries:
+        result = dict(entry)
+        result['newId'] = ''
+        result['detail'] = ''
+        item = itemDict.get(entry['itemId'])
+        if entry['itemId'] in seen:
+            result['outcome'] = 'duplicate'
+            result['detail'] = "item is listed more than once"
+        elif idMap.Has(which, entry['itemId']):
+            result['outcome'] = 'copied earlier'
+            result['newId'] = idMap.Get(which, entry['itemId'])
+        elif item is None:
+            result['outcome'] = 'not found'
+        elif not entry['jiraProjectKey']:
+            result['outcome'] = 'no project given'
+        elif ProgramOf(item) != entry['programId']:
+            result['outcome'] = 'program mismatch'
+            result['detail'] = "item is in Program " + str(ProgramOf(item))
+        elif item.get('jiraProjectKey') == entry['jiraProjectKey']:
+            result['outcome'] = 'already correct'
+        else:
+            result['outcome'] = 'pending'
+            toCopy.append((result, item))
+        seen.add(entry['itemId'])
+        results.append(result)
+
+    print("Copying " + str(len(toCopy)) + " items to their new Jira Project...")
+    def CopyOne(job):
+        result, item = job
+        try:
+            response = CopyToJiraProject(endpoint, item, result['jiraProjectKey'])
+        except Exception as e:
+            result['outcome'] = 'failed'
+            result['detail'] = str(e)
+            return result
+        if (response.status_code == 201):
+            result['outcome'] = 'copied'
+            result['newId'] = response.text.strip().strip('"')
+            idMap.Add(which, result['itemId'], result['newId'])
+        else:
+            result['outcome'] = 'failed'
+            result['detail'] = str(response.status_code) + " " + response.text
+        return result
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_POSTS) as pool:
+            for result in pool.map(CopyOne, toCopy):
+                print("  " + str(result['itemId']) + ": " + result['outcome'] + " " + str(result['newId']))
+    finally:
+        idMap.Close()
+
+    # The mapping covers this run and any earlier ones journaled to the same file
+    mapping = {}
+    for oldId, newId in idMap.ids.get(which, {}).items():
+        mapping[str(oldId)] = newId
+    with open(mappingFileName, 'w') as outfile:
+        json.dump(mapping, outfile, indent=4, sort_keys=True)
+
+    with open(reportFileName, 'w', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=['itemId', 'programId', 'jiraProjectKey',
+                                                     'outcome', 'newId', 'detail'])
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+
+    # Output operation summary
+    counts = {}
+    for result in results:
+        counts[result['outcome']] = counts.get(result['outcome'], 0) + 1
+    print("")
+    for outcome in sorted(counts):
+        print(str(counts[outcome]) + " items: " + outcome)
+    print("Old -> new ID mapping written to: " + mappingFileName)
+    print("Per item report written to: " + reportFileName)
+    return results
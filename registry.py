@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+#
+# registry.py
+#
+# Indexed reference data (programs, releases, connector projects, etc.) shared by the scripts.
+# Each endpoint is read once, and hash indexes are built over it on first use, so that name
+# resolution in reports and validation is a dictionary lookup instead of a scan of the array.
+
+import client
+import common
+import daemon
+
+# Maximum number of records to read in for a reference data endpoint
+MAX = 20000
+
+# Endpoints that are read from the connectors instead of with ReadAllItems, mapped to the
+# connector endpoint and the function that extracts each item
+CONNECTOR_ENDPOINTS = {
+    'connectorJiraBoards': ('boards', common.ExtractBoardData),
+    'connectorPriorities': ('priorities', common.ExtractPriorityData),
+    'connectorJiraProjects': ('projects', common.ExtractProjectData),
+}
+
+class Registry:
+    """ Holds the items for each reference endpoint, plus the indexes built over them.
+
+        Items are read through the given client (the default client if None), so each
+        instance gets its own registry.  Indexes are keyed by (endpoint, field) and map each
+        value of the field to the first item that has it.  Groups are the same, but map each
+        value to the list of all items that have it, for fields that are not unique (e.g.
+        programId).
+    """
+    def __init__(self, maxToRead=MAX, aClient=None):
+        self.maxToRead = maxToRead
+        # The instance to read from; None means the default client
+        self.client = aClient
+        self.items = {}
+        self.indexes = {}
+        self.groups = {}
+
+    def Load(self, which, itemArr):
+        """ Seed the registry with items that the caller already has for an endpoint.
+            Any indexes previously built for the endpoint are dropped.
+
+        Args:
+            which: The endpoint the items came from, e.g. programs
+            itemArr: The items, as returned by ReadAllItems
+        """
+        self.items[which] = itemArr
+        for key in [k for k in self.indexes if k[0] == which]:
+            del self.indexes[key]
+        for key in [k for k in self.groups if k[0] == which]:
+            del self.groups[key]
+
+    def GetItems(self, which):
+        """ Return all the items for the given endpoint, reading them from Jira Align
+            the first time they are asked for.
+        """
+        if which not in self.items:
+            # The default registry uses the daemon's copy, if the daemon is running
+            if (self.client is None) and daemon.Available():
+                try:
+                    self.items[which] = daemon.Call('refdata', which=which)
+                    return self.items[which]
+                except daemon.DaemonUnavailable:
+                    pass
+            aClient = self.client if self.client is not None else client.GetDefault()
+            if which in CONNECTOR_ENDPOINTS:
+                endpoint, extract = CONNECTOR_ENDPOINTS[which]
+                self.items[which] = aClient.ReadAllConnectorItems(endpoint, extract)
+            else:
+                self.items[which] = aClient.ReadAllItems(which, self.maxToRead)
+        return self.items[which]
+
+    def GetIndex(self, which, field='id'):
+        """ Return a dictionary of field value -> item for the given endpoint.
+            Items that do not have the field are left out.  If more than one item
+            has the same value, the first one read in wins.
+        """
+        key = (which, field)
+        if key not in self.indexes:
+            index = {}
+            for item in self.GetItems(which):
+                if field in item:
+                    index.setdefault(item[field], item)
+            self.indexes[key] = index
+        return self.indexes[key]
+
+    def GetGroups(self, which, field):
+        """ Return a dictionary of field value -> list of items for the given endpoint.
+        """
+        key = (which, field)
+        if key not in self.groups:
+            groups = {}
+            for item in self.GetItems(which):
+                if field in item:
+                    groups.setdefault(item[field], []).append(item)
+            self.groups[key] = groups
+        return self.groups[key]
+
+    def Lookup(self, which, id):
+        """ Return the item with the given id, or None if there isn't one.
+        """
+        return self.GetIndex(which).get(id)
+
+    def LookupId(self, which, field, value):
+        """ Return the id of the item whose field has the given value (for example the
+            id of the feature with externalKey FOO-123), or None if there isn't one.
+        """
+        item = self.GetIndex(which, field).get(value)
+        if item is None:
+            return None
+        return item['id']
+
+    def GetKeyInfo(self, which, id):
+        """ Same as common.get_key_info, but against the indexed endpoint.
+        """
+        return common.get_key_info(self.GetIndex(which), id)
+
+# Shared registry for the scripts in this process
+_default = None
+
+def GetRegistry():
+    """ Return the registry shared by all callers in this process, creating it if needed.
+    """
+    global _default
+    if _default is None:
+        _default = Registry()
+    return _default
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+#
+# rollup.py
+#
+# Group-by counts and sums over extracted work items, e.g. "effortPoints of accepted stories per
+# program per PI".  The items are loaded once into typed columns, and the group-by is done in
+# one pass over the columns: with NumPy (if it is installed) as a unique/bincount over the key
+# columns, otherwise as a single loop over array module columns.
+#
+# Run this file directly to compare it against the equivalent dict loop on synthetic data:
+#   python rollup.py [number of items]
+
+import random
+import sys
+import time
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Value stored in a key column when the item doesn't have the field
+MISSING = -1
+
+# Fields that can be grouped on.  The accepted* fields are buckets of acceptedDate.
+GROUP_FIELDS = ['programId', 'releaseId', 'state', 'acceptedYear', 'acceptedQuarter', 'acceptedMonth']
+
+def DateBucket(dateStr, bucket):
+    """ Turn an ISO date string (e.g. 2023-05-01T12:00:00Z) into a bucket number:
+        2023 for a year, 20232 for a quarter, 202305 for a month.  MISSING if there
+        is no date.
+    """
+    if not dateStr:
+        return MISSING
+    year = int(dateStr[0:4])
+    if bucket == 'acceptedYear':
+        return year
+    month = int(dateStr[5:7])
+    if bucket == 'acceptedQuarter':
+        return year * 10 + (month - 1) // 3 + 1
+    return year * 100 + month
+
+def KeyColumn(items, field):
+    """ Return the values of one group-by field for all the items, as an array of ints.
+    """
+    if field.startswith('accepted'):
+        return array('q', [DateBucket(item.get('acceptedDate'), field) for item in items])
+    return array('q', [item.get(field, MISSING) for item in items])
+
+def ValueColumn(items, field):
+    """ Return the values of the field being summed for all the items, as an array of
+        floats.  Items without the field count as 0.
+    """
+    return array('d', [item.get(field) or 0 for item in items])
+
+def RollUp(items, groupBy, sumField='effortPoints', where=None):
+    """ Count the items, and sum one of their fields, for each combination of values
+        of the group-by fields.
+
+    Args:
+        items: Extracted items, as returned by ReadAllItems
+        groupBy: List of fields from GROUP_FIELDS, e.g. ['programId', 'releaseId']
+        sumField: The numeric field to sum
+        where: If not None, dict of group-by field -> value (or set of values); only
+               items that match all of them are counted
+
+    Returns:
+        dict of tuple of group-by values -> {'count': n, 'sum': total}.  A group-by value
+        is None for items that don't have the field.
+    """
+    fields = list(groupBy)
+    for field in (where or {}):
+        if field not in fields:
+            fields.append(field)
+    keyColumns = [KeyColumn(items, field) for field in fields]
+    values = ValueColumn(items, sumField)
+    return RollUpColumns(fields, keyColumns, values, groupBy, where)
+
+def RollUpColumns(fields, keyColumns, values, groupBy, where=None):
+    """ Same as RollUp, but over columns that have already been built.
+
+    Args:
+        fields: The field each of keyColumns holds
+        keyColumns: One int column per field, all the same length
+        values: The column to sum
+        groupBy: The fields to group on (a subset of fields)
+        where: As for RollUp, over any of fields
+    """
+    groupPositions = [fields.index(field) for field in groupBy]
+    if numpy is not None:
+        return _RollUpNumPy(fields, keyColumns, values, groupPositions, where)
+
+    # One pass over the columns, filtering and accumulating as we go
+    tests = []
+    for field, wanted in (where or {}).items():
+        wantedSet = wanted if isinstance(wanted, (set, frozenset, list, tuple)) else {wanted}
+        tests.append((fields.index(field), set(wantedSet)))
+    counts = {}
+    sums = {}
+    for row in zip(values, *keyColumns):
+        if tests and not all(row[position + 1] in wantedSet for position, wantedSet in tests):
+            continue
+        key = tuple(row[position + 1] for position in groupPositions)
+        counts[key] = counts.get(key, 0) + 1
+        sums[key] = sums.get(key, 0.0) + row[0]
+    return {_Key(key): {'count': counts[key], 'sum': sums[key]} for key in counts}
+
+def _RollUpNumPy(fields, keyColumns, values, groupPositions, where):
+    keys = numpy.stack([numpy.frombuffer(column, dtype=numpy.int64) for column in keyColumns], axis=1)
+    sumValues = numpy.frombuffer(values, dtype=numpy.float64)
+    if where:
+        mask = numpy.ones(len(sumValues), dtype=bool)
+        for field, wanted in where.items():
+            wantedList = list(wanted) if isinstance(wanted, (set, frozenset, list, tuple)) else [wanted]
+            mask &= numpy.isin(keys[:, fields.index(field)], wantedList)
+        keys = keys[mask]
+        sumValues = sumValues[mask]
+    if len(sumValues) == 0:
+        return {}
+    # Encode each row's group-by values as one int (mixed radix over each column's distinct
+    # values), so the grouping is a 1-D unique instead of a much slower row-wise one
+    distincts = []
+    combined = numpy.zeros(len(sumValues), dtype=numpy.int64)
+    for position in groupPositions:
+        distinct, codes = numpy.unique(keys[:, position], return_inverse=True)
+        distincts.append(distinct)
+        combined = combined * len(distinct) + codes.reshape(-1)
+    groups, inverse = numpy.unique(combined, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = numpy.bincount(inverse, minlength=len(groups))
+    sums = numpy.bincount(inverse, weights=sumValues, minlength=len(groups))
+    # Decode each group back into its group-by values
+    groupValues = []
+    for distinct in reversed(distincts):
+        groupValues.append(distinct[groups % len(distinct)].tolist())
+        groups = groups // len(distinct)
+    groupValues.reverse()
+    counts = counts.tolist()
+    sums = sums.tolist()
+    groupKeys = list(zip(*groupValues)) if groupValues else [()]
+    return {_Key(key): {'count': counts[i], 'sum': sums[i]} for i, key in enumerate(groupKeys)}
+
+def _Key(key):
+    return tuple(None if v == MISSING else v for v in key)
+
+def DictLoopRollUp(items, groupBy, sumField='effortPoints', where=None):
+    """ The same result as RollUp, the way the scripts have always done it: a loop over
+        the items with dict lookups.  Kept as the reference for Benchmark.
+    """
+    result = {}
+    for item in items:
+        skip = False
+        for field, wanted in (where or {}).items():
+            value = DateBucket(item.get('acceptedDate'), field) if field.startswith('accepted') else item.get(field, MISSING)
+            wantedSet = wanted if isinstance(wanted, (set, frozenset, list, tuple)) else {wanted}
+            if value not in wantedSet:
+                skip = True
+                break
+        if skip:
+            continue
+        key = []
+        for field in groupBy:
+            if field.startswith('accepted'):
+                key.append(DateBucket(item.get('acceptedDate'), field))
+            else:
+                key.append(item.get(field, MISSING))
+        key = _Key(tuple(key))
+        if key not in result:
+            result[key] = {'count': 0, 'sum': 0.0}
+        result[key]['count'] += 1
+        result[key]['sum'] += item.get(sumField) or 0
+    return result
+
+def SyntheticStories(count, seed=1):
+    """ Make up count stories shaped like ReadAllItems output, for benchmarking.
+    """
+    rng = random.Random(seed)
+    stories = []
+    for i in range(count):
+        story = {'id': i + 1, 'itemtype': 'stories', 'programId': rng.randrange(1, 40),
+                 'state': rng.randrange(1, 6), 'title': "Story " + str(i + 1)}
+        if rng.random() < 0.7:
+            story['releaseId'] = rng.randrange(1, 60)
+        if rng.random() < 0.9:
+            story['effortPoints'] = rng.choice([0, 1, 2, 3, 5, 8, 13])
+        if story['state'] == 5:
+            story['acceptedDate'] = "%04d-%02d-%02dT00:00:00Z" % (rng.randrange(2019, 2025), rng.randrange(1, 13), rng.randrange(1, 29))
+        stories.append(story)
+    return stories
+
+def Benchmark(count=500000):
+    """ Time RollUp against DictLoopRollUp for accepted story points per program, PI
+        and quarter, and check that they agree.
+    """
+    stories = SyntheticStories(count)
+    groupBy = ['programId', 'releaseId', 'acceptedQuarter']
+    where = {'state': 5}
+    print("Rolling up " + str(count) + " stories (" + ("NumPy" if numpy is not None else "array module") + ")...")
+
+    start = time.time()
+    expected = DictLoopRollUp(stories, groupBy, where=where)
+    loopTime = time.time() - start
+    print("  dict loop:          " + str(round(loopTime, 3)) + "s")
+
+    start = time.time()
+    fields = groupBy + ['state']
+    keyColumns = [KeyColumn(stories, field) for field in fields]
+    values = ValueColumn(stories, 'effortPoints')
+    loadTime = time.time() - start
+    start = time.time()
+    result = RollUpColumns(fields, keyColumns, values, groupBy, where)
+    rollupTime = time.time() - start
+    print("  columns load:       " + str(round(loadTime, 3)) + "s")
+    print("  columnar roll-up:   " + str(round(rollupTime, 3)) + "s")
+    print("  " + str(len(result)) + " groups, " + ("results match" if result == expected else "RESULTS DIFFER"))
+
+if __name__ == "__main__":
+    Benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#
+# shard.py
+#
+# Sharded extraction of the biggest endpoints (stories, defects).  Once the requests are
+# parallel, one process is held back by JSON decoding and ExtractItemData, so each endpoint is
+# split by programId (the programId filter of ReadAllItems) and the shards are read by a pool
+# of worker processes.  Each worker has its own client and writes its shard to its own file;
+# the shards are then merged into the list the standard export expects.
+#
+# Each endpoint also gets one shard for the items that are in no Program, so a sharded export
+# holds the same items as an unsharded one.  Tasks have no programId to filter on, so they are
+# read the usual way.
+#
+# The shard directory holds a manifest naming the instance and when the extraction started.
+# Shard files left by an interrupted run are reused if the manifest matches this run's
+# instance and cap and is less than MAX_RESUME_AGE old; otherwise they are all removed first.
+# They are removed once they have been merged.
+#
+# MAX caps each shard, i.e. each Program, not the whole endpoint, so a sharded export can hold
+# far more items than an unsharded one (which JADataExtractor caps at its own MAX in total).
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import client
+import common
+import fastjson
+
+# Endpoints that are worth sharding: (key in the item export, endpoint)
+SECTIONS = [
+    ('stories', 'stories'),
+    ('defects', 'defects'),
+]
+
+# Maximum number of records to read in for each shard (each Program), not for the endpoint
+MAX = 100000
+
+# Shards older than this many seconds are never reused
+MAX_RESUME_AGE = 24 * 60 * 60
+
+# Where the shard files are written
+SHARD_DIR = 'JiraAlign_shards'
+
+# programId of the shard holding the items that are in no Program
+NO_PROGRAM = None
+
+def ManifestFileName(shardDir):
+    return os.path.join(shardDir, "manifest.json")
+
+def PrepareShardDir(aClient, shardDir, maxToRead):
+    """ Keep the shards in shardDir if they were written by a recent run against the same
+        instance with the same cap, so that run can be resumed; otherwise remove them and
+        write a new manifest for this run.
+    """
+    os.makedirs(shardDir, exist_ok=True)
+    manifest = None
+    try:
+        with open(ManifestFileName(shardDir), 'r', encoding='utf-8') as infile:
+            manifest = fastjson.Load(infile)
+    except (OSError, ValueError):
+        pass
+    now = time.time()
+    if isinstance(manifest, dict) and (manifest.get('instance') == aClient.instanceurl) and \
+       (manifest.get('maxToRead') == maxToRead) and (0 <= now - manifest.get('started', 0) < MAX_RESUME_AGE):
+        print("Resuming the sharded extraction started at " + time.ctime(manifest['started']))
+        return
+    for fileName in glob.glob(os.path.join(shardDir, "*.json")) + glob.glob(os.path.join(shardDir, "*.tmp")):
+        os.remove(fileName)
+    with open(ManifestFileName(shardDir), 'w', encoding='utf-8') as outfile:
+        fastjson.Dump({'instance': aClient.instanceurl, 'started': now, 'maxToRead': maxToRead}, outfile)
+
+def ShardFileName(shardDir, key, programId):
+    if programId is NO_PROGRAM:
+        return os.path.join(shardDir, key + "_noprogram.json")
+    return os.path.join(shardDir, key + "_" + str(programId) + ".json")
+
+def ReadNoProgram(aClient, endpoint, maxToRead):
+    """ Read the items of the given endpoint that are in no Program, by having Jira Align
+        filter on "programId eq null".
+    """
+    itemArr = []
+    for Data in aClient.ReadPages(endpoint, 'null'):
+        for eachWorkItem in Data:
+            if (not common.KeepItem(eachWorkItem)) or (eachWorkItem.get('programId') is not None):
+                continue
+            thisItem = {}
+            common.ExtractItemData(endpoint, eachWorkItem, thisItem)
+            itemArr.append(thisItem)
+        if len(itemArr) >= maxToRead:
+            break
+    return itemArr
+
+def ReadShard(job):
+    """ Worker: read one endpoint for one Program (or for no Program) and write it to
+        its shard file.  Runs in its own process, so it makes its own client from the job.
+
+    Returns:
+        (key, programId, number of items)
+    """
+    clientArgs, key, endpoint, programId, maxToRead, shardDir = job
+    fileName = ShardFileName(shardDir, key, programId)
+    if os.path.exists(fileName):
+        with open(fileName, 'r', encoding='utf-8') as infile:
+            return (key, programId, len(fastjson.Load(infile)))
+    aClient = client.JiraAlignClient(**clientArgs)
+    if programId is NO_PROGRAM:
+        itemArr = ReadNoProgram(aClient, endpoint, maxToRead)
+    else:
+        itemArr = aClient.ReadAllItems(endpoint, maxToRead, programId)
+    # Write to a temp file and rename, so a shard file is only ever complete
+    with open(fileName + ".tmp", 'w', encoding='utf-8') as outfile:
+        fastjson.Dump(itemArr, outfile)
+    os.replace(fileName + ".tmp", fileName)
+    return (key, programId, len(itemArr))
+
+def MergeShards(shardDir, key):
+    """ Read all the shard files for one export key and merge them into one list, sorted
+        by id, with any item that turned up in two shards only listed once.
+    """
+    byId = {}
+    for fileName in sorted(glob.glob(os.path.join(shardDir, key + "_*.json"))):
+        with open(fileName, 'r', encoding='utf-8') as infile:
+            for item in fastjson.Load(infile):
+                byId.setdefault(item['id'], item)
+    return [byId[id] for id in sorted(byId)]
+
+def ExtractSharded(aClient, programIds, sections=SECTIONS, processes=None, shardDir=SHARD_DIR, maxToRead=MAX):
+    """ Read the given endpoints one Program at a time across a pool of processes, plus
+        the items that are in no Program, and merge the results.
+
+    Args:
+        aClient: The JiraAlignClient whose instance and credentials the workers use
+        programIds: The Programs to shard on
+        sections: The (export key, endpoint) pairs to read
+        processes: Number of worker processes; defaults to the number of CPUs
+        shardDir: Where to write the shard files
+        maxToRead: Maximum number of items to read in for each shard
+
+    Returns:
+        dict of export key -> merged list of items
+    """
+    PrepareShardDir(aClient, shardDir, maxToRead)
+    processes = processes or os.cpu_count() or 1
+    # Each worker gets an equal share of the client's request rate
+    perSecond = None
+    if aClient.limiter.interval:
+        perSecond = (1.0 / aClient.limiter.interval) / processes
+    clientArgs = {'baseUrl': aClient.baseUrl, 'jatoken': aClient.jatoken, 'usernamev1': aClient.usernamev1,
+                  'jatokenv1': aClient.jatokenv1, 'name': aClient.name, 'useCache': aClient.useCache,
+                  'maxRequestsPerSecond': perSecond}
+    shardIds = list(programIds) + [NO_PROGRAM]
+    jobs = [(clientArgs, key, endpoint, programId, maxToRead, shardDir)
+            for key, endpoint in sections for programId in shardIds]
+    print("Reading " + str(len(jobs)) + " shards with " + str(processes) + " processes...")
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for key, programId, count in pool.map(ReadShard, jobs):
+            where = "no Program" if programId is NO_PROGRAM else "Program " + str(programId)
+            print("  " + key + " for " + where + ": " + str(count) + " items")
+
+    merged = {}
+    for key, endpoint in sections:
+        merged[key] = MergeShards(shardDir, key)
+        print("A total of " + str(len(merged[key])) + " " + key + " were merged from the shards")
+    # Everything is merged, so the next extraction starts afresh
+    for key, endpoint in sections:
+        for programId in shardIds:
+            try:
+                os.remove(ShardFileName(shardDir, key, programId))
+            except OSError:
+                pass
+    try:
+        os.remove(ManifestFileName(shardDir))
+    except OSError:
+        pass
+    return merged
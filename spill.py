@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+#
+# spill.py
+#
+# Bounded-memory list of extracted items.  A SpillList keeps the first maxInMemory items in
+# memory and appends the rest, one JSON object per line, to a temporary file, remembering
+# where each one starts.  Items can be read back in order or by id, so a caller that needs
+# the whole of a very large endpoint (e.g. JADataExtractor) uses the same memory however
+# big the instance is.
+#
+# WriteJson writes a dict of sections (lists, SpillLists or plain values) item by item in the
+# same layout as json.dump(data, outfile, indent=4, sort_keys=True), so a SpillList never has
+# to be loaded to be saved.
+
+import json
+import tempfile
+import threading
+from array import array
+
+import fastjson
+
+# Default number of items a SpillList keeps in memory.  Well under the 10000 items per section
+# that JADataExtractor reads, so that --spill does cap its memory; at a few KB per extracted
+# item this is around 10 MB per section.
+MAX_IN_MEMORY = 2000
+
+class SpillList:
+    """ A list of items (dicts with an 'id') of which only the first maxInMemory are held
+        in memory; the others are read back from a temporary file when needed.
+        Items can be appended, iterated, indexed and looked up by id.  Don't change an
+        item read back from the file and expect the change to stick.
+    """
+    def __init__(self, maxInMemory=MAX_IN_MEMORY, tempDir=None):
+        self.maxInMemory = maxInMemory
+        self.tempDir = tempDir
+        self._inMemory = []
+        self._offsets = array('q')
+        self._rowById = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def From(cls, items, maxInMemory=MAX_IN_MEMORY, tempDir=None):
+        spillList = cls(maxInMemory, tempDir)
+        spillList.extend(items)
+        return spillList
+
+    def append(self, item):
+        row = len(self)
+        if 'id' in item:
+            self._rowById.setdefault(item['id'], row)
+        if len(self._inMemory) < self.maxInMemory:
+            self._inMemory.append(item)
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(dir=self.tempDir)
+            # Reads move the position, so always write at the end
+            self._offsets.append(self._file.seek(0, 2))
+            self._file.write(fastjson.Dumps(item).encode('utf-8') + b"\n")
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __len__(self):
+        return len(self._inMemory) + len(self._offsets)
+
+    def _ReadSpilled(self, spilledRow):
+        with self._lock:
+            self._file.seek(self._offsets[spilledRow])
+            line = self._file.readline()
+        return fastjson.Loads(line)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        if row < len(self._inMemory):
+            return self._inMemory[row]
+        return self._ReadSpilled(row - len(self._inMemory))
+
+    def __iter__(self):
+        for item in self._inMemory:
+            yield item
+        for spilledRow in range(len(self._offsets)):
+            yield self._ReadSpilled(spilledRow)
+
+    def Get(self, id, default=None):
+        """ Return the item with the given id (the first, if there are several).
+        """
+        row = self._rowById.get(id)
+        if row is None:
+            return default
+        return self[row]
+
+    def Spilled(self):
+        """ Number of items that are in the temporary file rather than in memory.
+        """
+        return len(self._offsets)
+
+    def Close(self):
+        """ Remove the temporary file; the spilled items can't be read after this.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._offsets = array('q')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+def _Indented(text, indent):
+    return text.replace("\n", "\n" + indent)
+
+def WriteJson(outfile, data):
+    """ Write a dict of sections to outfile exactly as json.dump(data, outfile, indent=4,
+        sort_keys=True) would, one item at a time.  A section may be a list, a SpillList
+        or any value json.dump can write.
+    """
+    if not data:
+        outfile.write("{}")
+        return
+    outfile.write("{")
+    first = True
+    for key in sorted(data):
+        value = data[key]
+        outfile.write(("\n" if first else ",\n") + "    " + json.dumps(key) + ": ")
+        first = False
+        if isinstance(value, (list, SpillList)):
+            if len(value) == 0:
+                outfile.write("[]")
+                continue
+            outfile.write("[")
+            firstItem = True
+            for item in value:
+                outfile.write(("\n" if firstItem else ",\n") + "        " +
+                              _Indented(fastjson.DumpsPretty(item), "        "))
+                firstItem = False
+            outfile.write("\n    ]")
+        else:
+            outfile.write(_Indented(fastjson.DumpsPretty(value), "    "))
+    outfile.write("\n}")